@@ -0,0 +1,62 @@
+"""
+Число SQL-запросов и время ответа страниц заметок с сессиями
+и пользователями из базы и из кеша.
+
+    python -m benchmarks.auth_cache --notes 1000 --repeat 50
+"""
+import argparse
+
+from benchmarks.base import report, setup_django, test_database
+from benchmarks.routes import ROUTES, make_context, measure
+
+MODES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': [
+            'django.contrib.auth.backends.ModelBackend'
+        ],
+    },
+    'cache': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'SESSION_CACHE_ALIAS': 'sessions',
+        'AUTHENTICATION_BACKENDS': ['notes.auth.CachedModelBackend'],
+    },
+}
+ROUTE_LABELS = (
+    'notes:list GET', 'notes:detail GET', 'notes:edit GET', 'api:list GET',
+)
+
+
+def run(size, repeat):
+    from django.test.utils import override_settings
+
+    context = make_context(size)
+    context['size'] = size
+    routes = [route for route in ROUTES if route.label in ROUTE_LABELS]
+    results = []
+    with override_settings(NOTES_PAGE_CACHE_TIMEOUT=0):
+        for route in routes:
+            row = {'route': route.label}
+            for mode, overrides in MODES.items():
+                with override_settings(**overrides):
+                    result = measure(route, context, repeat)
+                row[f'{mode}_queries'] = result['queries']
+                row[f'{mode}_ms'] = result['median_ms']
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with test_database():
+        results = run(args.notes, args.repeat)
+    report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
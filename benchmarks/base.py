@@ -0,0 +1,88 @@
+"""Общие инструменты бенчмарков: настройка Django, временная база, отчёт."""
+import contextlib
+import json
+import math
+import os
+import time
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database(name=None):
+    """
+    Создаёт тестовую базу с применёнными миграциями и удаляет её по выходу.
+    По умолчанию база SQLite создаётся в памяти; name задаёт файл.
+    """
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment, teardown_test_environment
+    )
+
+    setup_test_environment()
+    if name:
+        connection.settings_dict['TEST']['NAME'] = name
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_author(username):
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.create(username=username)
+
+
+def seed_notes(author, count, text_size=200, batch_size=5000):
+    """Быстро создаёт count заметок автора через bulk_create."""
+    from notes.models import Note
+
+    text = ('Съешь же ещё этих мягких французских булок. ' * (
+        text_size // 44 + 1))[:text_size]
+    for start in range(0, count, batch_size):
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {i}',
+                text=text,
+                slug=f'{author.username}-{i}',
+                author=author,
+            )
+            for i in range(start, min(start + batch_size, count))
+        )
+
+
+class Timer:
+    """Контекстный менеджер, измеряющий время выполнения блока."""
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
+
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def report(results, output=None):
+    """Печатает результаты построчно и при необходимости сохраняет JSON."""
+    for row in results:
+        print('  '.join(f'{key}={value}' for key, value in row.items()))
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,66 @@
+"""
+Пропускная способность и потребление памяти потоковой выгрузки заметок.
+
+    python -m benchmarks.export --counts 1000 10000 100000
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.base import (
+    Timer, create_author, report, seed_notes, setup_django, test_database
+)
+
+
+def consume(client, url):
+    """Читает потоковый ответ целиком и возвращает его размер в байтах."""
+    response = client.get(url)
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def run(counts, formats, text_size):
+    from django.shortcuts import reverse
+    from django.test import Client
+
+    results = []
+    for count in counts:
+        author = create_author(f'export-{count}')
+        seed_notes(author, count, text_size=text_size)
+        client = Client()
+        client.force_login(author)
+        for fmt in formats:
+            url = reverse('notes:export', args=(fmt,))
+            with Timer() as timer:
+                size = consume(client, url)
+            tracemalloc.start()
+            consume(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                'format': fmt,
+                'notes': count,
+                'bytes': size,
+                'seconds': round(timer.elapsed, 3),
+                'notes_per_sec': round(count / timer.elapsed),
+                'peak_kib': peak // 1024,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--counts', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    parser.add_argument(
+        '--formats', nargs='+', default=['ndjson', 'csv', 'zip']
+    )
+    parser.add_argument('--text-size', type=int, default=500)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with test_database():
+        report(run(args.counts, args.formats, args.text_size), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Место под историю правок и время восстановления версий для заметок
+с тысячами правок.
+
+    python -m benchmarks.history --revisions 1000 5000 --lines 500
+"""
+import argparse
+import random
+import statistics
+
+from benchmarks.base import (
+    Timer, create_author, report, setup_django, test_database
+)
+
+
+def edit_text(lines, rng):
+    """Правка одной строки или добавление новой, как при обычной работе."""
+    number = rng.randrange(len(lines))
+    if rng.random() < 0.2:
+        lines.insert(number, f'Добавленная строка {rng.random()}\n')
+    else:
+        lines[number] = f'Изменённая строка {rng.random()}\n'
+
+
+def run_note(author, revisions, line_count, samples, rng):
+    from notes import history
+    from notes.fields import compress_text
+    from notes.models import Note
+
+    lines = [
+        f'Строка {i}: исходный текст заметки\n' for i in range(line_count)
+    ]
+    note = Note.objects.create(
+        title=f'История {revisions}', text=''.join(lines), author=author
+    )
+    full_raw = full_compressed = 0
+    save_timings = []
+    for _ in range(revisions - 1):
+        edit_text(lines, rng)
+        note.text = ''.join(lines)
+        full_raw += len(note.text.encode())
+        full_compressed += len(compress_text(note.text))
+        with Timer() as timer:
+            note.save()
+        save_timings.append(timer.elapsed)
+    stored = list(note.revisions.defer('data'))
+    data_size = sum(
+        len(data) for data in note.revisions.values_list('data', flat=True)
+    )
+    read_timings = []
+    for revision in rng.sample(stored, min(samples, len(stored))):
+        with Timer() as timer:
+            history.revision_text(revision)
+        read_timings.append(timer.elapsed)
+    return {
+        'revisions': len(stored),
+        'text_kib': len(note.text.encode()) // 1024,
+        'snapshots': sum(revision.is_snapshot for revision in stored),
+        'history_kib': data_size // 1024,
+        'full_copies_kib': full_raw // 1024,
+        'compressed_copies_kib': full_compressed // 1024,
+        'save_median_ms': round(statistics.median(save_timings) * 1000, 2),
+        'restore_median_ms': round(
+            statistics.median(read_timings) * 1000, 2
+        ),
+        'restore_max_ms': round(max(read_timings) * 1000, 2),
+    }
+
+
+def run(revision_counts, line_count, samples, seed):
+    rng = random.Random(seed)
+    author = create_author('history')
+    return [
+        run_note(author, count, line_count, samples, rng)
+        for count in revision_counts
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--revisions', type=int, nargs='+', default=[1000, 5000]
+    )
+    parser.add_argument('--lines', type=int, default=500)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with test_database():
+        results = run(args.revisions, args.lines, args.samples, args.seed)
+    report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Память и время на запрос списка заметок с большим текстом:
+с выборкой только полей списка и с полной выборкой строк.
+
+    python -m benchmarks.list_memory --text-size 20000 --page-sizes 50 500
+"""
+import argparse
+import statistics
+import tracemalloc
+from unittest import mock
+
+from benchmarks.base import (
+    Timer, create_author, report, seed_notes, setup_django, test_database
+)
+
+MODES = (('summary', True), ('full', False))
+
+
+def measure(client, url, repeat):
+    """Медиана времени и пиковая память Python на один запрос."""
+    client.get(url)
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            client.get(url)
+        timings.append(timer.elapsed)
+    tracemalloc.start()
+    client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def run(count, text_size, page_sizes, repeat):
+    from django.shortcuts import reverse
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    from notes.views import NotesList
+
+    author = create_author('list-memory')
+    seed_notes(author, count, text_size=text_size)
+    client = Client()
+    client.force_login(author)
+    results = []
+    with override_settings(NOTES_PAGE_CACHE_TIMEOUT=0):
+        for page_size in page_sizes:
+            url = f'{reverse("notes:list")}?size={page_size}'
+            for mode, summary in MODES:
+                with mock.patch.object(NotesList, 'summary', summary):
+                    seconds, peak = measure(client, url, repeat)
+                results.append({
+                    'mode': mode,
+                    'page_size': page_size,
+                    'text_size': text_size,
+                    'median_ms': round(seconds * 1000, 2),
+                    'peak_kib': peak // 1024,
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=2000)
+    parser.add_argument('--text-size', type=int, default=20000)
+    parser.add_argument(
+        '--page-sizes', type=int, nargs='+', default=[50, 500]
+    )
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with test_database():
+        results = run(args.notes, args.text_size, args.page_sizes,
+                      args.repeat)
+    report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
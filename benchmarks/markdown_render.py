@@ -0,0 +1,108 @@
+"""
+Вывод текста заметки в HTML: разбор Markdown при каждом чтении против
+готового HTML, сохранённого по хешу текста.
+
+    python -m benchmarks.markdown_render --notes 100 --text-sizes 1000 100000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.base import (
+    Timer, create_author, percentile, report, setup_django, test_database
+)
+
+
+def markdown_text(index, size):
+    """Текст с заголовками, списками, кодом и ссылками."""
+    parts = []
+    length = 0
+    number = 0
+    while length < size:
+        part = (
+            f'## Раздел {number}\n\n'
+            f'Заметка {index}: **важное** и _второстепенное_, '
+            f'[ссылка](https://example.com/{number}).\n\n'
+            f'* пункт {number}\n* пункт {number + 1}\n\n'
+            f'```\nprint({number})\n```\n\n'
+        )
+        parts.append(part)
+        length += len(part)
+        number += 1
+    return ''.join(parts)[:size]
+
+
+def read_times(notes, read):
+    times = []
+    for note in notes:
+        with Timer() as timer:
+            read(note)
+        times.append(timer.elapsed * 1000)
+    return times
+
+
+def run_size(count, text_size, directory):
+    from notes import rendering
+    from notes.models import Note
+
+    name = os.path.join(directory, f'markdown-{text_size}.sqlite3')
+    with test_database(name):
+        author = create_author('markdown')
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {i}', text=markdown_text(i, text_size),
+                 slug=f'md-{i}', author=author)
+            for i in range(count)
+        )
+        pks = list(Note.objects.values_list('pk', flat=True))
+
+        def load(pk):
+            return Note.objects.select_related('rendering').get(pk=pk)
+
+        paths = {
+            'render_on_read': lambda pk: rendering.render_markdown(
+                load(pk).text
+            ),
+            'first_read': lambda pk: rendering.note_html(load(pk)),
+            'cached': lambda pk: rendering.note_html(load(pk)),
+        }
+        rows = []
+        for path, read in paths.items():
+            times = read_times(pks, read)
+            rows.append({
+                'path': path,
+                'text_size': text_size,
+                'notes': count,
+                'p50_ms': round(percentile(times, 0.5), 3),
+                'p95_ms': round(percentile(times, 0.95), 3),
+                'total_ms': round(sum(times), 1),
+            })
+        with Timer() as prerender:
+            Note.objects.filter(pk__in=pks).update(text='изменён')
+            rendering.prerender(list(Note.objects.all()), 'default')
+        rows.append({
+            'path': 'prerender_after_edit',
+            'text_size': text_size,
+            'notes': count,
+            'total_ms': round(prerender.elapsed * 1000, 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=100)
+    parser.add_argument(
+        '--text-sizes', type=int, nargs='+', default=[1000, 10000]
+    )
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for text_size in args.text_sizes:
+            results.extend(run_size(args.notes, text_size, directory))
+    report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Байты в сети и процессорное время на запрос при сжатии ответов:
+большой список заметок, список API и потоковая выгрузка.
+
+    python -m benchmarks.response_compression --notes 2000 --size 500
+"""
+import argparse
+import time
+
+from benchmarks.base import (
+    create_author, percentile, report, seed_notes, setup_django, test_database
+)
+
+
+def body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run(count, size, repeat, text_size):
+    from django.shortcuts import reverse
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    from notes import compression
+
+    author = create_author('compression')
+    seed_notes(author, count, text_size=text_size)
+    client = Client()
+    client.force_login(author)
+    routes = {
+        'notes:list': f'{reverse("notes:list")}?size={size}',
+        'api:list': f'{reverse("api:list")}?size={size}',
+        'notes:export': reverse('notes:export', args=('ndjson',)),
+    }
+    results = []
+    # Кеш страниц выключен: замеряется отрисовка и сжатие каждой страницы.
+    with override_settings(NOTES_PAGE_CACHE_TIMEOUT=0):
+        for route, url in routes.items():
+            plain = None
+            for coding in ('identity', *compression.CODECS):
+                cpu = []
+                for _ in range(repeat):
+                    start = time.process_time()
+                    response = client.get(url, HTTP_ACCEPT_ENCODING=coding)
+                    wire = body_size(response)
+                    cpu.append((time.process_time() - start) * 1000)
+                plain = plain or wire
+                results.append({
+                    'route': route,
+                    'encoding': response.get('Content-Encoding', 'identity'),
+                    'bytes': wire,
+                    'ratio': round(wire / plain, 3),
+                    'cpu_p50_ms': round(percentile(cpu, 0.5), 2),
+                    'cpu_p95_ms': round(percentile(cpu, 0.95), 2),
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--text-size', type=int, default=300)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with test_database():
+        report(
+            run(args.notes, args.size, args.repeat, args.text_size),
+            args.output,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+"""
+Время ответа и число SQL-запросов для каждого маршрута проекта.
+
+Для каждого объёма данных создаётся автор с заданным числом заметок,
+каждый маршрут запрашивается несколько раз, результаты сохраняются в JSON.
+Бенчмарк завершается с ошибкой, если маршрут превысил свой бюджет
+запросов или стал медленнее сохранённой базовой линии больше порога.
+
+    python -m benchmarks.routes --sizes 10 1000 100000 --output out.json
+    python -m benchmarks.routes --baseline baseline.json
+    python -m benchmarks.routes --save-baseline baseline.json
+"""
+import argparse
+import json
+import statistics
+import sys
+from dataclasses import dataclass
+
+from benchmarks.base import (
+    Timer, percentile, report, seed_notes, setup_django
+)
+
+PASSWORD = 'benchmark-password'
+IMPORT_FILE = '\n'.join(
+    json.dumps({'title': f'Импорт {i}', 'text': 'Текст'}) for i in range(10)
+)
+
+
+@dataclass
+class Route:
+    """
+    Маршрут бенчмарка. budget — наибольшее допустимое число SQL-запросов
+    на один запрос, включая чтение сессии и пользователя.
+    args и data — функции от контекста, возвращающие аргументы URL
+    и тело запроса; fresh_client — новый клиент на каждый повтор;
+    user — функция от контекста, возвращающая пользователя клиента
+    вместо автора.
+    """
+    name: str
+    budget: int
+    method: str = 'get'
+    args: object = None
+    data: object = None
+    params: dict = None
+    content_type: str = None
+    auth: bool = True
+    fresh_client: bool = False
+    user: object = None
+
+    @property
+    def label(self):
+        return f'{self.name} {self.method.upper()}'
+
+
+def note_slug(context):
+    return (context['note'].slug,)
+
+
+def first_revision(context):
+    """Первая версия заметки; её создаёт маршрут редактирования."""
+    return (context['note'].slug, 1)
+
+
+def fresh_note_slug(context):
+    """Отдельная заметка на каждый повтор для маршрутов удаления."""
+    from notes.models import Note
+
+    note = Note.objects.create(
+        title='Удаляемая', text='Текст', author=context['author']
+    )
+    return (note.slug,)
+
+
+def edit_data(context):
+    """Каждый повтор меняет текст, чтобы правка попадала в историю."""
+    note = context['note']
+    context['edits'] = context.get('edits', 0) + 1
+    return {'title': note.title, 'text': f'Правка {context["edits"]}',
+            'slug': note.slug}
+
+
+def import_data(context):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    return {
+        'file': SimpleUploadedFile('notes.ndjson', IMPORT_FILE.encode()),
+        'format': 'ndjson',
+    }
+
+
+def export_job(context):
+    """Задача выгрузки автора в очереди."""
+    from notes import jobs
+
+    job = jobs.enqueue('export', {'format': 'ndjson'}, user=context['author'])
+    return (job.pk,)
+
+
+def finished_export_job(context):
+    """Выполненная задача выгрузки с файлом результата."""
+    from notes import jobs
+    from notes.models import Job
+
+    (pk,) = export_job(context)
+    Job.objects.filter(pk=pk).update(
+        status=Job.RUNNING, locked_by='benchmark', attempts=1
+    )
+    jobs.execute(Job.objects.get(pk=pk))
+    return (pk,)
+
+
+def throwaway_user(context):
+    """Отдельный пользователь на каждый повтор удаления аккаунта."""
+    from django.contrib.auth import get_user_model
+
+    context['throwaways'] = context.get('throwaways', 0) + 1
+    return get_user_model().objects.create(
+        username=f'{context["author"].username}-{context["throwaways"]}'
+    )
+
+
+def batch_data(context):
+    return json.dumps([
+        {'op': 'create', 'data': {'title': 'Пакет', 'text': 'Текст'}}
+        for _ in range(10)
+    ])
+
+
+ROUTES = (
+    Route('notes:home', budget=0, auth=False),
+    Route('notes:add', budget=2),
+    Route('notes:add', budget=10, method='post',
+          data=lambda context: {'title': 'Бенчмарк', 'text': 'Текст'}),
+    Route('notes:edit', budget=3, args=note_slug),
+    Route('notes:edit', budget=11, method='post', args=note_slug,
+          data=edit_data),
+    Route('notes:detail', budget=4, args=note_slug),
+    Route('notes:history', budget=4, args=note_slug),
+    Route('notes:revision', budget=5, args=first_revision),
+    Route('notes:restore', budget=11, method='post', args=first_revision),
+    Route('notes:delete', budget=3, args=fresh_note_slug),
+    Route('notes:delete', budget=8, method='post', args=fresh_note_slug),
+    Route('notes:list', budget=4),
+    Route('notes:export', budget=3, args=lambda context: ('ndjson',)),
+    Route('notes:import', budget=2),
+    Route('notes:import', budget=7, method='post', data=import_data),
+    Route('notes:search', budget=4, params={'q': 'заметка'}),
+    Route('notes:cache_stats', budget=2),
+    Route('notes:metrics', budget=2),
+    Route('notes:success', budget=2),
+    Route('users:login', budget=0, auth=False),
+    Route('users:login', budget=5, method='post', auth=False,
+          data=lambda context: {
+              'username': context['author'].username, 'password': PASSWORD
+          }),
+    Route('users:logout', budget=4, fresh_client=True),
+    Route('users:signup', budget=0, auth=False),
+    Route('api:list', budget=3),
+    Route('api:detail', budget=3, args=note_slug),
+    Route('api:batch', budget=8, method='post', data=batch_data,
+          content_type='application/json'),
+    Route('api:job', budget=3, args=export_job),
+    Route('api:job_download', budget=3, args=finished_export_job),
+    Route('api:export_job', budget=3, method='post',
+          args=lambda context: ('ndjson',)),
+    Route('api:import_job', budget=3, method='post', data=import_data),
+    Route('api:delete_account', budget=7, method='post', fresh_client=True,
+          user=throwaway_user),
+)
+
+NAMESPACES = ('notes', 'users', 'api')
+
+
+def route_names(resolver=None, namespace=None):
+    """Имена всех маршрутов проекта в пространствах имён NAMESPACES."""
+    from django.urls import URLResolver, get_resolver
+
+    resolver = resolver or get_resolver()
+    names = set()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern, pattern.namespace or namespace)
+        elif pattern.name and namespace in NAMESPACES:
+            names.add(f'{namespace}:{pattern.name}')
+    return names
+
+
+def make_context(size):
+    from django.contrib.auth import get_user_model
+
+    from notes.models import Note
+
+    author = get_user_model().objects.create_user(
+        username=f'bench-{size}', password=PASSWORD, is_staff=True
+    )
+    seed_notes(author, size)
+    return {
+        'author': author,
+        'note': Note.objects.filter(author=author).order_by('pk').last(),
+    }
+
+
+def make_client(route, context):
+    from django.test import Client
+
+    client = Client()
+    if route.auth:
+        client.force_login(
+            route.user(context) if route.user else context['author']
+        )
+    return client
+
+
+def request(client, route, context):
+    """Выполняет запрос маршрута и возвращает (секунды, число запросов)."""
+    from django.db import connection
+    from django.shortcuts import reverse
+    from django.test.utils import CaptureQueriesContext
+
+    args = route.args(context) if route.args else None
+    url = reverse(route.name, args=args)
+    kwargs = {}
+    if route.data:
+        kwargs['data'] = route.data(context)
+    elif route.params:
+        kwargs['data'] = route.params
+    if route.content_type:
+        kwargs['content_type'] = route.content_type
+    with CaptureQueriesContext(connection) as queries, Timer() as timer:
+        response = getattr(client, route.method)(url, **kwargs)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+    if response.status_code >= 400:
+        raise RuntimeError(f'{route.label}: ответ {response.status_code}')
+    return timer.elapsed, len(queries)
+
+
+def measure(route, context, repeat):
+    client = make_client(route, context)
+    request(client, route, context)
+    timings, query_counts = [], []
+    for _ in range(repeat):
+        if route.fresh_client:
+            client = make_client(route, context)
+        elapsed, count = request(client, route, context)
+        timings.append(elapsed)
+        query_counts.append(count)
+    return {
+        'route': route.label,
+        'notes': context['size'],
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        'queries': max(query_counts),
+        'budget': route.budget,
+    }
+
+
+def check(results, baseline, threshold, min_delta_ms):
+    """Список нарушений бюджета запросов и регрессий времени ответа."""
+    problems = []
+    previous = {
+        (row['route'], row['notes']): row for row in baseline or ()
+    }
+    for row in results:
+        if row['queries'] > row['budget']:
+            problems.append(
+                f'{row["route"]} при {row["notes"]} заметках: '
+                f'{row["queries"]} запросов при бюджете {row["budget"]}'
+            )
+        old = previous.get((row['route'], row['notes']))
+        if old is None:
+            continue
+        limit = max(old['median_ms'] * threshold,
+                    old['median_ms'] + min_delta_ms)
+        if row['median_ms'] > limit:
+            problems.append(
+                f'{row["route"]} при {row["notes"]} заметках: '
+                f'{row["median_ms"]} мс против {old["median_ms"]} мс '
+                'в базовой линии'
+            )
+    return problems
+
+
+def run(sizes, repeat, page_cache):
+    import tempfile
+
+    from django.test.utils import override_settings
+
+    from notes import search
+
+    missing = route_names() - {route.name for route in ROUTES}
+    if missing:
+        raise SystemExit(f'Нет бенчмарка для маршрутов: {sorted(missing)}')
+    contexts = []
+    for size in sizes:
+        context = make_context(size)
+        context['size'] = size
+        contexts.append(context)
+    search.rebuild_index()
+    timeout = None if page_cache else 0
+    results = []
+    # Файлы задач выгрузки и импорта не остаются в каталоге проекта.
+    with tempfile.TemporaryDirectory() as job_dir, override_settings(
+            NOTES_PAGE_CACHE_TIMEOUT=timeout, NOTES_JOB_DIR=job_dir):
+        for context in contexts:
+            for route in ROUTES:
+                results.append(measure(route, context, repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10, 1000, 100000]
+    )
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--page-cache', action='store_true',
+        help='Не отключать кеш отрисованных страниц.',
+    )
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    parser.add_argument('--baseline', help='JSON с базовой линией.')
+    parser.add_argument(
+        '--save-baseline', help='Сохранить результаты как базовую линию.'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=1.5,
+        help='Допустимое замедление относительно базовой линии.',
+    )
+    parser.add_argument(
+        '--min-delta-ms', type=float, default=2.0,
+        help='Замедление меньше этого значения считается шумом.',
+    )
+    args = parser.parse_args()
+    setup_django()
+    from benchmarks.base import test_database
+
+    with test_database():
+        results = run(args.sizes, args.repeat, args.page_cache)
+    report(results, args.output)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    problems = check(results, baseline, args.threshold, args.min_delta_ms)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
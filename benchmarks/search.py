@@ -0,0 +1,91 @@
+"""
+Задержка полнотекстового поиска FTS5 на большом числе заметок:
+автор с наибольшим числом заметок и автор-медиана, частое слово,
+префикс, два слова и слово, которого нет в заметках.
+Бенчмарк завершается с ошибкой, если p95 какого-либо запроса
+больше цели --target-ms.
+
+    python -m benchmarks.search --notes 1000000 --users 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks.base import (
+    Timer, percentile, report, setup_django, test_database
+)
+
+# В словаре seed_notes около сотни слов, поэтому каждое слово
+# встречается в большой доле заметок автора: это худший случай
+# для ранжирования, которое сортирует все совпадения.
+QUERIES = ('молоко', 'мол', 'список покупок', 'несуществующее')
+
+
+def run(notes, users, repeat, directory):
+    from django.db.models import Count
+
+    from notes import search, seeding
+    from notes.models import Note
+
+    with test_database(os.path.join(directory, 'search.sqlite3')):
+        seeding.seed_notes(users, notes, prefix='search', search_index=True)
+        authors = list(
+            Note.objects.values('author_id').annotate(count=Count('id'))
+            .order_by('-count')
+        )
+        results = []
+        for label, author in (
+                ('heaviest', authors[0]),
+                ('median', authors[len(authors) // 2])):
+            for query in QUERIES:
+                times = []
+                for _ in range(repeat):
+                    with Timer() as timer:
+                        found = search.search_note_ids(
+                            author['author_id'], query
+                        )
+                    times.append(timer.elapsed * 1000)
+                results.append({
+                    'notes': notes,
+                    'author': label,
+                    'author_notes': author['count'],
+                    'query': query,
+                    'found': len(found),
+                    'p50_ms': round(percentile(times, 0.5), 2),
+                    'p95_ms': round(percentile(times, 0.95), 2),
+                })
+    return results
+
+
+def check(results, target_ms):
+    """Запросы, p95 которых больше цели."""
+    return [
+        f'{row["query"]!r} у автора {row["author"]} '
+        f'({row["author_notes"]} заметок): p95 {row["p95_ms"]} мс '
+        f'при цели {target_ms} мс'
+        for row in results if row['p95_ms'] > target_ms
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--target-ms', type=float, default=10.0)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with tempfile.TemporaryDirectory(prefix='yanote-bench-') as directory:
+        results = run(args.notes, args.users, args.repeat, directory)
+    report(results, args.output)
+    problems = check(results, args.target_ms)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
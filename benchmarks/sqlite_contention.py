@@ -0,0 +1,136 @@
+"""
+Конкурентные запись и чтение в SQLite из нескольких процессов
+со стандартными настройками соединения и с SQLITE_PRAGMAS проекта.
+
+    python -m benchmarks.sqlite_contention --processes 8 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.base import report, setup_django
+
+# default — стандартное поведение Django: журнал отката, synchronous=FULL
+# и новое соединение на каждый запрос; tuned — SQLITE_PRAGMAS проекта
+# (None: взять из настроек) и постоянные соединения.
+PROFILES = {
+    'default': {'pragmas': {}, 'conn_max_age': 0},
+    'tuned': {'pragmas': None, 'conn_max_age': 600},
+}
+
+
+def configure(path, profile):
+    """Направляет соединение на файл бенчмарка с PRAGMA профиля."""
+    from django.conf import settings
+    from django.db import connections
+
+    if PROFILES[profile]['pragmas'] is not None:
+        settings.SQLITE_PRAGMAS = PROFILES[profile]['pragmas']
+    connections['default'].settings_dict.update(
+        NAME=path, CONN_MAX_AGE=PROFILES[profile]['conn_max_age']
+    )
+
+
+def prepare(path, profile, users):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    configure(path, profile)
+    call_command('migrate', verbosity=0)
+    get_user_model().objects.bulk_create(
+        get_user_model()(username=f'user-{i}') for i in range(users)
+    )
+
+
+def worker(path, profile, seconds, write_ratio, users, seed):
+    """
+    Чередует запись заметки и чтение страницы списка, закрывая
+    устаревшие соединения так же, как это делается между запросами.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    setup_django()
+    from django.db import OperationalError, close_old_connections
+
+    from notes.models import Note
+
+    configure(path, profile)
+    rng = random.Random(seed)
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    deadline = time.perf_counter() + seconds
+    number = 0
+    while time.perf_counter() < deadline:
+        close_old_connections()
+        author_id = rng.randint(1, users)
+        try:
+            if rng.random() < write_ratio:
+                number += 1
+                Note.objects.create(
+                    title=f'Заметка {seed}-{number}',
+                    slug=f'bench-{seed}-{number}',
+                    text='Текст заметки',
+                    author_id=author_id,
+                )
+                counts['writes'] += 1
+            else:
+                list(
+                    Note.objects.filter(author_id=author_id)
+                    .order_by('-id')[:50]
+                )
+                counts['reads'] += 1
+        except OperationalError:
+            counts['locked'] += 1
+        close_old_connections()
+    return counts
+
+
+def run(profile, processes, seconds, write_ratio, users):
+    directory = tempfile.mkdtemp(prefix='yanote-bench-')
+    path = os.path.join(directory, f'{profile}.sqlite3')
+    prepare(path, profile, users)
+    from django.db import connections
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes) as pool:
+        results = pool.starmap(worker, [
+            (path, profile, seconds, write_ratio, users, seed)
+            for seed in range(processes)
+        ])
+    totals = {
+        key: sum(result[key] for result in results)
+        for key in ('writes', 'reads', 'locked')
+    }
+    return {
+        'profile': profile,
+        'processes': processes,
+        'writes_per_sec': round(totals['writes'] / seconds),
+        'reads_per_sec': round(totals['reads'] / seconds),
+        'locked_errors': totals['locked'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    from django.conf import settings
+
+    # Основной процесс переключает профили по очереди, поэтому
+    # настройки проекта запоминаются до первого переключения.
+    PROFILES['tuned']['pragmas'] = dict(settings.SQLITE_PRAGMAS)
+    report([
+        run(profile, args.processes, args.seconds, args.write_ratio,
+            args.users)
+        for profile in PROFILES
+    ], args.output)
+
+
+if __name__ == '__main__':
+    main()
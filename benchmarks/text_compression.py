@@ -0,0 +1,134 @@
+"""
+Размер базы и время записи и чтения заметок при разных методах сжатия
+текста: none соответствует прежнему хранению без сжатия.
+
+Заметки создаются через save(), как в приложении, поэтому в размер
+входит и поисковый индекс: notes_mib — таблица заметок с её индексами,
+search_mib — таблицы FTS5, db_mib — вся база.
+
+    python -m benchmarks.text_compression --notes 5000 --text-sizes 300 20000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.base import (
+    Timer, create_author, report, setup_django, test_database
+)
+
+METHODS = ('none', 'zlib', 'lzma')
+
+
+def log_text(index, size):
+    """Текст, похожий на вставленный в заметку журнал приложения."""
+    lines = []
+    length = 0
+    number = 0
+    while length < size:
+        line = (
+            f'2024-05-{number % 28 + 1:02d} '
+            f'12:{number % 60:02d}:{index % 60:02d} INFO '
+            f'worker-{number % 8} запрос {index * 1000 + number} '
+            f'обработан за {number * 7 % 997} мс\n'
+        )
+        lines.append(line)
+        length += len(line)
+        number += 1
+    return ''.join(lines)[:size]
+
+
+def database_size(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+        cursor.execute('PRAGMA page_count')
+        pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return pages * cursor.fetchone()[0]
+
+
+def table_sizes(connection):
+    """Размер страниц каждой таблицы вместе с её индексами, в байтах."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT master.tbl_name, SUM(stat.pgsize) FROM dbstat AS stat '
+            'JOIN sqlite_master AS master ON master.name = stat.name '
+            'GROUP BY master.tbl_name'
+        )
+        return dict(cursor.fetchall())
+
+
+def mib(size):
+    return round(size / 2 ** 20, 2)
+
+
+def run_method(method, count, text_size, directory):
+    from django.db import transaction
+    from django.test.utils import override_settings
+
+    from notes.models import Note
+    from notes.search import FTS_TABLE
+
+    name = os.path.join(directory, f'{method}-{text_size}.sqlite3')
+    with override_settings(NOTES_TEXT_COMPRESSION=method), \
+            test_database(name) as connection:
+        author = create_author('compression')
+        empty_size = database_size(connection)
+        texts = [log_text(i, text_size) for i in range(count)]
+        with Timer() as write:
+            for start in range(0, count, 1000):
+                with transaction.atomic():
+                    for i in range(start, min(start + 1000, count)):
+                        Note.objects.create(
+                            title=f'Журнал {i}', text=texts[i],
+                            slug=f'log-{i}', author=author,
+                        )
+        size = database_size(connection)
+        tables = table_sizes(connection)
+        with Timer() as load:
+            loaded = list(Note.objects.all())
+        with Timer() as access:
+            total = sum(len(note.text) for note in loaded)
+        assert total == sum(len(text) for text in texts)
+    return {
+        'method': method,
+        'text_size': text_size,
+        'notes': count,
+        'db_mib': mib(size - empty_size),
+        'notes_mib': mib(tables.get(Note._meta.db_table, 0)),
+        'search_mib': mib(sum(
+            pages for table, pages in tables.items()
+            if table.startswith(FTS_TABLE)
+        )),
+        'write_ms': round(write.elapsed * 1000, 1),
+        'load_ms': round(load.elapsed * 1000, 1),
+        'read_text_ms': round(access.elapsed * 1000, 1),
+    }
+
+
+def run(count, text_sizes, methods):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for text_size in text_sizes:
+            for method in methods:
+                results.append(
+                    run_method(method, count, text_size, directory)
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=5000)
+    parser.add_argument(
+        '--text-sizes', type=int, nargs='+', default=[300, 5000, 50000]
+    )
+    parser.add_argument('--methods', nargs='+', default=list(METHODS))
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    results = run(args.notes, args.text_sizes, args.methods)
+    report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Накладные расходы TimingMiddleware: время ответа маршрутов с включёнными
+и выключенными замерами.
+
+    python -m benchmarks.timing --notes 1000 --repeat 200
+"""
+import argparse
+
+from benchmarks.base import report, setup_django, test_database
+from benchmarks.routes import ROUTES, make_context, measure
+
+MODES = (('off', False), ('on', True))
+ROUTE_LABELS = (
+    'notes:home GET', 'notes:list GET', 'notes:detail GET', 'api:list GET',
+)
+
+
+def run(size, repeat):
+    from django.test.utils import override_settings
+
+    context = make_context(size)
+    context['size'] = size
+    routes = [route for route in ROUTES if route.label in ROUTE_LABELS]
+    results = []
+    with override_settings(NOTES_PAGE_CACHE_TIMEOUT=0):
+        for route in routes:
+            medians = {}
+            for mode, enabled in MODES:
+                with override_settings(NOTES_METRICS_ENABLED=enabled):
+                    medians[mode] = measure(route, context, repeat)[
+                        'median_ms'
+                    ]
+            results.append({
+                'route': route.label,
+                'off_ms': medians['off'],
+                'on_ms': medians['on'],
+                'overhead_ms': round(medians['on'] - medians['off'], 3),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output', help='Файл для результатов в JSON.')
+    args = parser.parse_args()
+    setup_django()
+    with test_database():
+        results = run(args.notes, args.repeat)
+    report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
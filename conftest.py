@@ -1,7 +1,56 @@
 import pytest
+from django.conf import settings
+from django.core.cache import caches
 
 # Импортируем модель заметки, чтобы создать экземпляр.
 from notes.models import Note
+from notes.resolver import resolver
+
+SHARDS = ['default', 'notes_1', 'notes_2']
+REPLICA = 'default_replica_1'
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(tmp_path_factory):
+    """
+    Тестовая база SQLite создаётся в файле, а не в памяти:
+    у общей памяти свои блокировки таблиц без ожидания,
+    и параллельные потоки в тестах получали бы ошибки блокировки.
+    """
+    directory = tmp_path_factory.mktemp('db')
+    database = settings.DATABASES['default']
+    database['TEST']['NAME'] = str(directory / 'test.sqlite3')
+    # Базы шардов и реплика для тестов шардирования и реплик; остальные
+    # тесты работают с одной базой, как при NOTES_SHARDS=1.
+    for alias in [*SHARDS[1:], REPLICA]:
+        settings.DATABASES[alias] = {
+            'ENGINE': database['ENGINE'],
+            'NAME': str(directory / f'{alias}.sqlite3'),
+            'TEST': {'NAME': str(directory / f'test_{alias}.sqlite3')},
+        }
+    settings.NOTES_SHARD_DATABASES = SHARDS
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Тесты не делят кеши: после отката транзакции id пользователей
+    выдаются заново, и закешированный пользователь оказался бы чужим.
+    """
+    for cache in caches.all():
+        cache.clear()
+    resolver.clear()
+
+
+@pytest.fixture
+def auth_cache(settings):
+    """
+    Сессии и пользователи из кеша, как при NOTES_AUTH_CACHE=1:
+    в тестах один процесс, и кеш locmem общий для всех запросов.
+    """
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    settings.SESSION_CACHE_ALIAS = 'sessions'
+    settings.AUTHENTICATION_BACKENDS = ['notes.auth.CachedModelBackend']
 
 
 @pytest.fixture
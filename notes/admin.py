@@ -1,5 +1,57 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
+from . import search
 from .models import Note
+from .pagination import EstimatedCountPaginator
 
-admin.site.register(Note)
+
+class NoteChangeList(ChangeList):
+    """Список заметок в админке без чтения текста."""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('text')
+
+
+@admin.register(Note)
+class NoteAdmin(admin.ModelAdmin):
+    """
+    Админка заметок, рассчитанная на миллионы строк: автор читается
+    тем же запросом, что и заметки, поиск и фильтры идут по индексам,
+    а число строк не считается COUNT(*) по всей таблице.
+    """
+    list_display = ('title', 'slug', 'author', 'updated_at')
+    list_select_related = ('author',)
+    list_filter = ('updated_at',)
+    search_fields = ('slug', 'title', 'author__username')
+    raw_id_fields = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return NoteChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Точное совпадение slug или имени автора по уникальным индексам
+        либо слова заголовка по полнотекстовому индексу.
+        Автор находится отдельным запросом по имени: условие на
+        author__username в OR с JOIN заставляет SQLite перебирать всю
+        таблицу заметок, а условия на колонки самой таблицы
+        проверяются каждое по своему индексу.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = (
+            Q(slug=search_term)
+            | Q(pk__in=search.search_title_ids(search_term))
+        )
+        author_id = get_user_model().objects.filter(
+            username=search_term
+        ).values_list('pk', flat=True).first()
+        if author_id is not None:
+            condition |= Q(author_id=author_id)
+        return queryset.filter(condition), False
@@ -0,0 +1,458 @@
+"""
+JSON API заметок.
+
+Клиент один раз входит через /auth/login/, а дальше передаёт cookie
+сессии и заголовок X-CSRFToken — отдельный GET за формой не нужен.
+Ответы собираются из values(), без создания экземпляров модели.
+"""
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import logout
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views import generic
+
+from . import jobs
+from .bulk import create_notes, delete_notes, update_notes
+from .export import EXPORTERS
+from .forms import WARNING, BatchNoteForm, NoteForm, NoteImportForm
+from .models import Job, Note
+from .pagination import get_page_size, keyset_paginate, parse_cursor
+from .slugs import (
+    SLUG_RETRIES, allocate_slugs, base_slug, save_note, taken_slugs
+)
+from .views import NoteBase
+
+LIST_FIELDS = ('id', 'title', 'slug', 'created_at', 'updated_at')
+DETAIL_FIELDS = LIST_FIELDS + ('text',)
+EDITABLE_FIELDS = ('title', 'text', 'slug')
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class ApiError(Exception):
+    """Ошибка запроса, которая возвращается клиенту как JSON."""
+
+    def __init__(self, status, payload):
+        super().__init__(status, payload)
+        self.status = status
+        self.payload = payload
+
+
+@dataclass
+class Pending:
+    """Проверенная операция пакета, ожидающая записи."""
+    index: int
+    note: Note
+    changed: set = field(default_factory=set)
+    old_slug: str = None
+
+
+def form_errors(form):
+    return {
+        name: [str(message) for message in messages]
+        for name, messages in form.errors.items()
+    }
+
+
+class ApiView(NoteBase, generic.View):
+    """Базовый класс API: JSON вместо редиректов и HTML-страниц ошибок."""
+
+    def handle_no_permission(self):
+        return JsonResponse(
+            {'detail': 'Требуется авторизация.'},
+            status=HTTPStatus.UNAUTHORIZED,
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(error.payload, status=error.status)
+
+    def read_json(self):
+        try:
+            return json.loads(self.request.body or b'null')
+        except ValueError:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, {'detail': 'Некорректный JSON.'}
+            )
+
+    def read_object(self):
+        data = self.read_json()
+        if not isinstance(data, dict):
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, {'detail': 'Ожидался JSON-объект.'}
+            )
+        return data
+
+    def get_values(self, pk):
+        return self.get_queryset().values(*DETAIL_FIELDS).get(pk=pk)
+
+    def save_form(self, form):
+        """Сохраняет форму заметки; занятый slug — ошибка клиента."""
+        if not form.is_valid():
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, {'errors': form_errors(form)}
+            )
+        try:
+            return save_note(form.instance, form.save)
+        except IntegrityError:
+            raise ApiError(
+                HTTPStatus.CONFLICT,
+                {'errors': {'slug': [form.instance.slug + WARNING]}},
+            )
+
+
+class NoteListApi(ApiView):
+    """Список заметок по курсору и создание заметки."""
+
+    def get(self, request):
+        page = keyset_paginate(
+            self.get_queryset().values(*LIST_FIELDS),
+            after=parse_cursor(request.GET.get('after')),
+            before=parse_cursor(request.GET.get('before')),
+            page_size=get_page_size(request.GET.get('size')),
+        )
+        return JsonResponse({
+            'results': page.object_list,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    def post(self, request):
+        form = NoteForm(data=self.read_object())
+        form.instance.author = request.user
+        note = self.save_form(form)
+        return JsonResponse(
+            self.get_values(note.pk), status=HTTPStatus.CREATED
+        )
+
+
+class NoteDetailApi(ApiView):
+    """Чтение, частичное изменение и удаление заметки по slug."""
+
+    def get_object(self):
+        note = self.get_queryset().filter(slug=self.kwargs['slug']).first()
+        if note is None:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND, {'detail': 'Заметка не найдена.'}
+            )
+        return note
+
+    def get(self, request, slug):
+        values = self.get_queryset().filter(slug=slug).values(
+            *DETAIL_FIELDS
+        ).first()
+        if values is None:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND, {'detail': 'Заметка не найдена.'}
+            )
+        return JsonResponse(values)
+
+    def patch(self, request, slug):
+        note = self.get_object()
+        data = {name: getattr(note, name) for name in EDITABLE_FIELDS}
+        data.update(self.read_object())
+        note = self.save_form(NoteForm(data=data, instance=note))
+        return JsonResponse(self.get_values(note.pk))
+
+    def delete(self, request, slug):
+        deleted, _ = self.get_queryset().filter(slug=slug).delete()
+        if not deleted:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND, {'detail': 'Заметка не найдена.'}
+            )
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+
+
+class NoteBatchApi(ApiView):
+    """
+    Пакет операций create, update и delete в одной транзакции.
+
+    Пакет проверяется целиком до записи: при любой ошибке не выполняется
+    ни одна операция. Записи выполняются множествами — сначала удаления,
+    затем изменения одним bulk_update и создания одним bulk_create.
+    Если подобранный slug успел занять параллельный запрос, пакет
+    проверяется и записывается заново, до SLUG_RETRIES раз; 409
+    возвращается, только когда занят slug, переданный клиентом.
+    """
+
+    def post(self, request):
+        operations = self.read_json()
+        if not isinstance(operations, list) or not operations:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                {'detail': 'Ожидался непустой JSON-массив операций.'},
+            )
+        if len(operations) > settings.NOTES_API_BATCH_LIMIT:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                {'detail': 'Операций в пакете не больше '
+                           f'{settings.NOTES_API_BATCH_LIMIT}.'},
+            )
+        for attempt in range(SLUG_RETRIES):
+            self.errors = {}
+            self.parse(operations)
+            self.check_slugs()
+            if self.errors:
+                # При повторе ошибка значит, что явный slug пакета
+                # занял параллельный запрос.
+                raise ApiError(
+                    HTTPStatus.CONFLICT if attempt else HTTPStatus.BAD_REQUEST,
+                    {'errors': self.errors},
+                )
+            try:
+                with transaction.atomic(using=self.get_queryset().db):
+                    self.write()
+            except IntegrityError:
+                if not self.allocated or attempt == SLUG_RETRIES - 1:
+                    raise ApiError(
+                        HTTPStatus.CONFLICT,
+                        {'detail': 'Slug занят параллельным запросом, '
+                                   'повторите пакет.'},
+                    )
+            else:
+                return JsonResponse({'results': self.results(operations)})
+
+    def add_error(self, index, name, message):
+        self.errors.setdefault(index, {}).setdefault(name, []).append(
+            message
+        )
+
+    def parse(self, operations):
+        """Проверяет операции и загружает затронутые заметки одним запросом."""
+        self.creates, self.updates, self.deletes = [], [], []
+        slugs = [
+            operation.get('slug') for operation in operations
+            if isinstance(operation, dict)
+            and operation.get('op') in ('update', 'delete')
+        ]
+        notes = self.get_queryset().in_bulk(
+            [slug for slug in slugs if isinstance(slug, str)],
+            field_name='slug',
+        )
+        seen = set()
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or (
+                    operation.get('op') not in OPERATIONS):
+                self.add_error(
+                    index, 'op', f'Ожидалась одна из: {", ".join(OPERATIONS)}.'
+                )
+                continue
+            data = operation.get('data', {})
+            if not isinstance(data, dict):
+                self.add_error(index, 'data', 'Ожидался JSON-объект.')
+                continue
+            if operation['op'] == 'create':
+                form = BatchNoteForm(data=data)
+                form.instance.author = self.request.user
+                self.collect(Pending(index, form.instance), form, self.creates)
+                continue
+            slug = operation.get('slug')
+            if not isinstance(slug, str):
+                self.add_error(index, 'slug', 'Ожидалась строка.')
+                continue
+            note = notes.get(slug)
+            if note is None:
+                self.add_error(index, 'slug', 'Заметка не найдена.')
+                continue
+            if note.pk in seen:
+                self.add_error(index, 'slug', 'Заметка уже есть в пакете.')
+                continue
+            seen.add(note.pk)
+            if operation['op'] == 'delete':
+                self.deletes.append(Pending(index, note))
+                continue
+            pending = Pending(
+                index, note, set(data) & set(EDITABLE_FIELDS), note.slug
+            )
+            merged = {name: getattr(note, name) for name in EDITABLE_FIELDS}
+            merged.update(data)
+            self.collect(
+                pending, BatchNoteForm(data=merged, instance=note),
+                self.updates,
+            )
+
+    def collect(self, pending, form, target):
+        if form.is_valid():
+            form.save(commit=False)
+            target.append(pending)
+        else:
+            for name, messages in form_errors(form).items():
+                for message in messages:
+                    self.add_error(pending.index, name, message)
+
+    def check_slugs(self):
+        """
+        Проверяет явные slug одним запросом и подбирает недостающие
+        одним запросом на весь пакет. allocated — подобран ли хоть
+        один slug: только такой пакет имеет смысл повторять.
+        """
+        explicit = {}
+        auto = []
+        for pending in self.creates + self.updates:
+            slug = pending.note.slug
+            if not slug:
+                auto.append(pending)
+            elif slug != pending.old_slug:
+                if slug in explicit:
+                    self.add_error(pending.index, 'slug', slug + WARNING)
+                explicit[slug] = pending.index
+        released = {pending.note.slug for pending in self.deletes}
+        taken = taken_slugs(list(explicit)).exclude(slug__in=released)
+        for slug in taken:
+            self.add_error(explicit[slug], 'slug', slug + WARNING)
+        bases = []
+        for pending in auto:
+            base = base_slug(pending.note.title)
+            if base == pending.old_slug:
+                pending.note.slug = base
+            else:
+                bases.append((pending.note, base))
+        self.allocated = bool(bases)
+        slugs = allocate_slugs(
+            [base for _, base in bases], reserved=explicit, released=released
+        )
+        for (note, _), slug in zip(bases, slugs):
+            note.slug = slug
+
+    def write(self):
+        queryset = self.get_queryset()
+        if self.deletes:
+            delete_notes(
+                [pending.note for pending in self.deletes], using=queryset.db
+            )
+        fields = set().union(*(pending.changed for pending in self.updates))
+        if fields:
+            update_notes(
+                [pending.note for pending in self.updates], sorted(fields),
+                using=queryset.db,
+            )
+        if self.creates:
+            create_notes(
+                [pending.note for pending in self.creates], using=queryset.db
+            )
+
+    def results(self, operations):
+        """Итог по каждой операции в порядке пакета одним запросом."""
+        saved = {
+            pending.index: pending.note.pk
+            for pending in self.creates + self.updates
+        }
+        values = {
+            row['id']: row for row in self.get_queryset().filter(
+                pk__in=list(saved.values())
+            ).values(*DETAIL_FIELDS)
+        }
+        results = []
+        for index, operation in enumerate(operations):
+            if index in saved:
+                results.append(values[saved[index]])
+            else:
+                results.append({'slug': operation['slug'], 'deleted': True})
+        return results
+
+
+def job_values(job):
+    """Состояние задачи для клиента, который опрашивает её статус."""
+    values = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'url': reverse('api:job', args=(job.pk,)),
+    }
+    if job.status == Job.DONE and (job.result or {}).get('file'):
+        values['download'] = reverse('api:job_download', args=(job.pk,))
+    return values
+
+
+def accepted(job):
+    """Ответ 202: задача принята, статус — по адресу из Location."""
+    values = job_values(job)
+    response = JsonResponse(values, status=HTTPStatus.ACCEPTED)
+    response['Location'] = values['url']
+    return response
+
+
+class JobApi(ApiView):
+    """Статус фоновой задачи пользователя."""
+
+    def get_job(self, pk):
+        job = Job.objects.filter(pk=pk, user=self.request.user).first()
+        if job is None:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND, {'detail': 'Задача не найдена.'}
+            )
+        return job
+
+    def get(self, request, pk):
+        return JsonResponse(job_values(self.get_job(pk)))
+
+
+class JobDownloadApi(JobApi):
+    """Файл с результатом завершённой задачи."""
+
+    def get(self, request, pk):
+        job = self.get_job(pk)
+        path = jobs.result_path(job)
+        if path is None:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND, {'detail': 'Файла результата нет.'}
+            )
+        return FileResponse(
+            path.open('rb'), as_attachment=True, filename=path.name,
+            content_type=job.result.get('content_type'),
+        )
+
+
+class ExportJobApi(ApiView):
+    """Выгрузка заметок в файл фоновой задачей."""
+
+    def post(self, request, fmt):
+        if fmt not in EXPORTERS:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND, {'detail': 'Неизвестный формат.'}
+            )
+        return accepted(
+            jobs.enqueue('export', {'format': fmt}, user=request.user)
+        )
+
+
+class ImportJobApi(ApiView):
+    """Импорт файла заметок фоновой задачей."""
+
+    def post(self, request):
+        form = NoteImportForm(request.POST, request.FILES)
+        if not form.is_valid():
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, {'errors': form_errors(form)}
+            )
+        path = jobs.save_upload(form.cleaned_data['file'])
+        return accepted(jobs.enqueue(
+            'import', {'path': path, 'format': form.cleaned_data['format']},
+            user=request.user,
+        ))
+
+
+class DeleteAccountApi(ApiView):
+    """
+    Удаление аккаунта со всеми заметками. Пользователь сразу теряет
+    доступ и выходит из системы, а данные удаляет фоновая задача.
+    """
+
+    def post(self, request):
+        user = request.user
+        user.is_active = False
+        user.save(update_fields=('is_active',))
+        job = jobs.enqueue('delete_account', {'user_id': user.pk}, user=user)
+        logout(request)
+        return accepted(job)
@@ -0,0 +1,25 @@
+from django.urls import path
+
+from notes import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('notes/', api.NoteListApi.as_view(), name='list'),
+    path('notes/<slug:slug>/', api.NoteDetailApi.as_view(), name='detail'),
+    path('batch/', api.NoteBatchApi.as_view(), name='batch'),
+    path('jobs/<int:pk>/', api.JobApi.as_view(), name='job'),
+    path(
+        'jobs/<int:pk>/download/', api.JobDownloadApi.as_view(),
+        name='job_download',
+    ),
+    path(
+        'jobs/export/<str:fmt>/', api.ExportJobApi.as_view(),
+        name='export_job',
+    ),
+    path('jobs/import/', api.ImportJobApi.as_view(), name='import_job'),
+    path(
+        'jobs/delete-account/', api.DeleteAccountApi.as_view(),
+        name='delete_account',
+    ),
+]
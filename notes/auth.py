@@ -0,0 +1,42 @@
+"""
+Загрузка пользователя запроса из кеша.
+
+AuthenticationMiddleware на каждом запросе вызывает get_user() бэкенда
+с id из сессии. Здесь пользователь берётся из кеша NOTES_USER_CACHE,
+а в базу запрос идёт только при промахе. Запись сбрасывается при
+сохранении и удалении пользователя — это покрывает смену пароля
+и обновление last_login при входе — и при выходе из системы.
+Изменения через QuerySet.update() сигналов не посылают и кеш
+не сбрасывают: запись устареет не позже NOTES_USER_CACHE_TIMEOUT.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[settings.NOTES_USER_CACHE]
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    """Удаляет пользователя из кеша."""
+    get_cache().delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который читает пользователя запроса из кеша."""
+
+    def get_user(self, user_id):
+        cache = get_cache()
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.NOTES_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
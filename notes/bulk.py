@@ -0,0 +1,84 @@
+"""
+Пакетная запись заметок мимо Model.save и сигналов.
+
+bulk_create и bulk_update не вызывают post_save, поэтому новые заметки
+добавляются в поисковый индекс, а кеш страниц сбрасывается здесь
+явно — тоже пакетно. Изменённые заметки в индексе обновляют триггеры.
+"""
+from django.db import router
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from . import history, page_cache, search, sharding
+from .models import Note
+from .resolver import resolver
+
+
+def note_database(notes, using=None):
+    """База пакета заметок одного автора: явная или шард автора."""
+    return using or router.db_for_write(Note, instance=notes[0])
+
+
+def bump_authors(notes, using=None):
+    for author_id in {note.author_id for note in notes}:
+        page_cache.bump_version(author_id, using=using)
+
+
+def create_notes(notes, using=None):
+    """
+    Вставляет заметки одним bulk_create. Если база не вернула id,
+    они выбираются одним запросом по уникальным slug.
+    Вызывается внутри транзакции базы заметок.
+    """
+    using = note_database(notes, using)
+    created = Note.objects.using(using).bulk_create(notes)
+    if any(note.pk is None for note in created):
+        ids = dict(
+            Note.objects.using(using).filter(
+                slug__in=[note.slug for note in created]
+            ).values_list('slug', 'pk')
+        )
+        for note in created:
+            note.pk = ids[note.slug]
+    sharding.claim_slugs(created, using)
+    search.index_notes(created, using=using)
+    bump_authors(created, using=using)
+    return created
+
+
+def update_notes(notes, fields, using=None):
+    """
+    Сохраняет изменённые поля заметок одним bulk_update
+    и их новые версии одним bulk_create.
+    """
+    using = note_database(notes, using)
+    previous = history.previous_versions(notes, using=using)
+    now = timezone.now()
+    for note in notes:
+        note.updated_at = now
+    Note.objects.using(using).bulk_update(
+        notes, [*fields, 'updated_at']
+    )
+    if 'slug' in fields:
+        sharding.update_slugs(notes, using)
+        for note in notes:
+            resolver.forget(note.author_id, note.pk, note.slug)
+    history.record_revisions(notes, previous, using=using)
+    history.remember_loaded(notes)
+    bump_authors(notes, using=using)
+    return notes
+
+
+def delete_notes(notes, using=None):
+    """
+    Удаляет загруженные заметки с сигналами post_delete и каскадом.
+    Collector получает готовые экземпляры и не выбирает заметки заново,
+    а версии и HTML удаляет запросами DELETE без SELECT: транзакция
+    начинается с записи. Если бы она начиналась с чтения, SQLite
+    пришлось бы повышать блокировку до записи, а такое повышение
+    не ждёт busy_timeout и сразу падает с «database is locked».
+    """
+    using = note_database(notes, using)
+    collector = Collector(using=using)
+    collector.collect(notes)
+    return collector.delete()
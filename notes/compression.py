@@ -0,0 +1,131 @@
+"""
+Сжатие ответов: выбор кодировки по Accept-Encoding и потоковые кодеки.
+
+gzip доступен всегда, br — если установлен пакет brotli, zstd — если
+установлен zstandard. Уровни сжатия подобраны для ответов, которые
+сжимаются на каждый запрос: выигрыш от максимальных уровней не стоит
+процессорного времени. Каждый кусок потока сбрасывается кодеку сразу,
+поэтому клиент получает данные без ожидания конца ответа.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+
+def encoding_qualities(header):
+    """
+    Функция, возвращающая вес q кодировки из заголовка Accept-Encoding.
+    Кодировка, не названная явно, получает вес '*' или 0.
+    """
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    wildcard = qualities.pop('*', 0.0)
+    return lambda coding: qualities.get(coding, wildcard)
+
+
+class GzipStream:
+    def __init__(self):
+        # wbits=31: формат gzip с заголовком и контрольной суммой.
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=True):
+        output = self.compressor.compress(data)
+        if flush:
+            output += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        return output
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data, flush=True):
+        output = self.compressor.process(data)
+        if flush:
+            output += self.compressor.flush()
+        return output
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL
+        ).compressobj()
+
+    def compress(self, data, flush=True):
+        output = self.compressor.compress(data)
+        if flush:
+            output += self.compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        return output
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+# Доступные кодеки в порядке предпочтения при равном весе у клиента.
+CODECS = {
+    name: codec for name, codec, module in (
+        ('zstd', ZstdStream, zstandard),
+        ('br', BrotliStream, brotli),
+        ('gzip', GzipStream, zlib),
+    ) if module is not None
+}
+
+
+def negotiate(accept_encoding, codecs=CODECS):
+    """Кодировка с наибольшим весом у клиента или None."""
+    quality = encoding_qualities(accept_encoding)
+    best, best_quality = None, 0.0
+    for coding in codecs:
+        if quality(coding) > best_quality:
+            best, best_quality = coding, quality(coding)
+    return best
+
+
+def compress(coding, data):
+    stream = CODECS[coding]()
+    return stream.compress(data, flush=False) + stream.finish()
+
+
+def compress_stream(coding, chunks):
+    """Сжимает поток кусками, не накапливая его в памяти."""
+    stream = CODECS[coding]()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        output = stream.compress(chunk)
+        if output:
+            yield output
+    yield stream.finish()
@@ -0,0 +1,28 @@
+"""Настройка соединений с базой данных."""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import search
+
+
+def sqlite_pragmas(pragmas):
+    """Команды PRAGMA в виде SQL; значения берутся только из настроек."""
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite
+    и регистрирует функцию, которой индекс поиска удаляет записи.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in sqlite_pragmas(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
+    connection.connection.create_function(
+        search.AUTHOR_TERMS_FUNCTION, 2, search.stored_author_terms,
+        deterministic=True,
+    )
@@ -0,0 +1,86 @@
+"""Потоковая выгрузка заметок пользователя в NDJSON, CSV и ZIP."""
+import csv
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = ('id', 'title', 'slug', 'text')
+
+
+class StreamBuffer:
+    """
+    Файлоподобный приёмник записей: накапливает то, что в него пишут
+    csv.writer или zipfile, и отдаёт накопленное генератору ответа.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(
+            chunk.encode() if isinstance(chunk, str) else chunk
+            for chunk in self._chunks
+        )
+        self._chunks = []
+        return data
+
+
+def iter_rows(queryset, chunk_size=None):
+    """Перебирает заметки порциями, не загружая их все в память."""
+    return queryset.order_by('pk').values(*EXPORT_FIELDS).iterator(
+        chunk_size=chunk_size or settings.NOTES_EXPORT_CHUNK_SIZE
+    )
+
+
+def export_ndjson(queryset, chunk_size=None):
+    for row in iter_rows(queryset, chunk_size):
+        yield json.dumps(
+            row, ensure_ascii=False, cls=DjangoJSONEncoder
+        ).encode() + b'\n'
+
+
+def export_csv(queryset, chunk_size=None):
+    buffer = StreamBuffer()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.drain()
+    for row in iter_rows(queryset, chunk_size):
+        writer.writerow(row)
+        yield buffer.drain()
+
+
+def note_markdown(row):
+    return f'# {row["title"]}\n\n{row["text"]}\n'.encode()
+
+
+def export_zip(queryset, chunk_size=None):
+    """
+    Архив из Markdown-файлов по одному на заметку. Архив пишется
+    в поток без поддержки seek(), поэтому zipfile не перематывает его,
+    и каждый файл отдаётся клиенту сразу после сжатия. В памяти остаётся
+    только оглавление архива — по записи ZipInfo на каждую заметку.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for row in iter_rows(queryset, chunk_size):
+            with archive.open(f'{row["slug"]}.md', 'w') as file:
+                file.write(note_markdown(row))
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+# Формат выгрузки: (генератор, тип содержимого, расширение файла).
+EXPORTERS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (export_csv, 'text/csv; charset=utf-8', 'csv'),
+    'zip': (export_zip, 'application/zip', 'zip'),
+}
@@ -0,0 +1,93 @@
+"""
+Текстовое поле со сжатием больших значений.
+
+В столбце BLOB хранится байт заголовка и данные: 0 — текст в UTF-8
+без сжатия, 1 — zlib, 2 — lzma. Текст короче порога
+NOTES_TEXT_COMPRESS_MIN_SIZE байт и текст, который не уменьшился
+при сжатии, хранится без сжатия. Сжатое значение читается из базы как
+ленивая строка: распаковка происходит при первом обращении к тексту,
+поэтому загрузка заметки без вывода текста её не распаковывает.
+Строки, сохранённые до перехода на это поле, читаются как есть.
+"""
+import lzma
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.utils.functional import lazy
+
+RAW = 0
+ZLIB = 1
+LZMA = 2
+
+COMPRESSORS = {
+    'zlib': (ZLIB, zlib.compress),
+    'lzma': (LZMA, lzma.compress),
+}
+DECOMPRESSORS = {
+    ZLIB: zlib.decompress,
+    LZMA: lzma.decompress,
+}
+
+
+def compress_text(text, method=None, min_size=None):
+    """Кодирует текст в байт заголовка и данные."""
+    method = method or settings.NOTES_TEXT_COMPRESSION
+    if min_size is None:
+        min_size = settings.NOTES_TEXT_COMPRESS_MIN_SIZE
+    data = text.encode()
+    if method in COMPRESSORS and len(data) >= min_size:
+        header, compress = COMPRESSORS[method]
+        packed = compress(data)
+        if len(packed) < len(data):
+            return bytes((header,)) + packed
+    return bytes((RAW,)) + data
+
+
+def decompress_text(value):
+    """Текст из значения столбца; строка старого формата не меняется."""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    header, data = value[0], value[1:]
+    if header != RAW:
+        data = DECOMPRESSORS[header](data)
+    return data.decode()
+
+
+class CompressedText:
+    """Сжатое значение из базы, распаковываемое один раз по требованию."""
+    __slots__ = ('value', 'text')
+
+    def __init__(self, value):
+        self.value = value
+        self.text = None
+
+    def decode(self):
+        if self.text is None:
+            self.text = decompress_text(self.value)
+        return self.text
+
+
+lazy_text = lazy(CompressedText.decode, str)
+
+
+class CompressedTextField(models.TextField):
+    """TextField, который хранит большие значения сжатыми."""
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[0] == RAW:
+            return value[1:].decode()
+        return lazy_text(CompressedText(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(compress_text(value))
@@ -1,9 +1,9 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
+from .importers import READERS
 from .models import Note
+from .slugs import taken_slugs
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
 
@@ -16,14 +16,38 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+        """
+        Обрабатывает случай, если указанный slug не уникален.
+        Пустой slug подбирает модель при сохранении.
+        """
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
+            return ''
+        if taken_slugs(
+                [slug], self.instance._state.db, self.instance.pk
+        ).exists():
             raise ValidationError(slug + WARNING)
         return slug
+
+
+class BatchNoteForm(NoteForm):
+    """
+    Форма заметки для пакетных операций API: поля проверяются так же,
+    но уникальность slug проверяется для всего пакета одним запросом.
+    """
+
+    def clean_slug(self):
+        return self.cleaned_data.get('slug') or ''
+
+    def validate_unique(self):
+        pass
+
+
+class NoteImportForm(forms.Form):
+    """Форма загрузки файла с заметками для импорта."""
+    file = forms.FileField(label='Файл')
+    format = forms.ChoiceField(
+        label='Формат',
+        choices=[(name, name.upper()) for name in READERS],
+        help_text='NDJSON или CSV с полями title, text и slug'
+    )
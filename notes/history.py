@@ -0,0 +1,179 @@
+"""
+История правок заметок.
+
+Каждая правка заголовка или текста сохраняется версией: разницей
+по строкам с предыдущей версией, сжатой так же, как текст заметки.
+Раз в NOTES_HISTORY_SNAPSHOT_INTERVAL версий, а также когда разница
+не меньше самого текста, сохраняется снимок — полный текст. Поэтому
+восстановление любой версии читает не больше интервала строк
+и применяет не больше интервала разниц, а место растёт с размером
+правок, а не с размером заметки.
+
+Последняя версия истории совпадает с текущей заметкой, пока заметку
+меняют через save() и bulk-функции. Если заметку изменили в обход
+(например, QuerySet.update()), это видно по хешу текста: перед
+следующей правкой прежнее состояние сохраняется отдельным снимком.
+"""
+import difflib
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from .fields import compress_text, decompress_text
+from .models import Note, NoteRevision
+
+
+def text_digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def make_delta(old, new):
+    """
+    Разница двух текстов по строкам: список из пар [начало, конец] —
+    скопировать эти строки старого текста — и строк с новым текстом.
+    Общие начало и конец отбрасываются до сравнения: обычная правка
+    затрагивает одно место, и SequenceMatcher сравнивает только его.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    limit = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and old_lines[-suffix - 1] == new_lines[-suffix - 1]):
+        suffix += 1
+    matcher = difflib.SequenceMatcher(
+        None, old_lines[prefix:len(old_lines) - suffix],
+        new_lines[prefix:len(new_lines) - suffix], False,
+    )
+    delta = [[0, prefix]] if prefix else []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([prefix + i1, prefix + i2])
+        elif j1 < j2:
+            delta.append(''.join(new_lines[prefix + j1:prefix + j2]))
+    if suffix:
+        delta.append([len(old_lines) - suffix, len(old_lines)])
+    return delta
+
+
+def apply_delta(old, delta):
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for operation in delta:
+        if isinstance(operation, str):
+            parts.append(operation)
+        else:
+            parts.extend(old_lines[operation[0]:operation[1]])
+    return ''.join(parts)
+
+
+def previous_versions(notes, using=None):
+    """
+    Заголовок и текст заметок в том виде, в каком они были прочитаны
+    из базы. Для заметок, загруженных без текста, они выбираются одним
+    запросом. Возвращает словарь {pk: (title, text)}.
+    """
+    versions = {}
+    missing = []
+    for note in notes:
+        loaded = getattr(note, '_loaded_values', {})
+        if len(loaded) == 2:
+            versions[note.pk] = (loaded['title'], loaded['text'])
+        else:
+            missing.append(note.pk)
+    if missing:
+        rows = Note.objects.using(using).filter(pk__in=missing).values_list(
+            'pk', 'title', 'text'
+        )
+        for pk, title, text in rows:
+            versions[pk] = (title, text)
+    return versions
+
+
+def tip_revisions(note_ids, using=None):
+    """Последние версии заметок одним запросом: {note_id: NoteRevision}."""
+    last = NoteRevision.objects.filter(note=OuterRef('note')).order_by(
+        '-number'
+    ).values('number')[:1]
+    revisions = NoteRevision.objects.using(using).filter(
+        note_id__in=note_ids, number=Subquery(last)
+    ).defer('data')
+    return {revision.note_id: revision for revision in revisions}
+
+
+def build_revision(note_id, number, base, title, text, data=None):
+    if data is None:
+        data = compress_text(text)
+        base = number
+    return NoteRevision(
+        note_id=note_id, number=number, base=base, title=title,
+        data=data, size=len(text), digest=text_digest(text),
+    )
+
+
+def record_revisions(notes, previous, using=None):
+    """
+    Сохраняет новые версии изменённых заметок одним bulk_create.
+    previous — прежние версии из previous_versions().
+    Вызывается внутри транзакции, в которой меняются заметки.
+    """
+    changed = []
+    for note in notes:
+        old_title, old_text = previous.get(note.pk, (None, None))
+        if old_text is None:
+            continue
+        old_text, new_text = str(old_text), str(note.text)
+        if old_title != note.title or old_text != new_text:
+            changed.append((note, old_title, old_text, new_text))
+    if not changed:
+        return []
+    tips = tip_revisions([note.pk for note, *_ in changed], using=using)
+    interval = settings.NOTES_HISTORY_SNAPSHOT_INTERVAL
+    revisions = []
+    for note, old_title, old_text, new_text in changed:
+        tip = tips.get(note.pk)
+        if tip is None or (tip.digest, tip.title) != (
+                text_digest(old_text), old_title):
+            tip = build_revision(
+                note.pk, tip.number + 1 if tip else 1, None,
+                old_title, old_text,
+            )
+            revisions.append(tip)
+        number = tip.number + 1
+        data = compress_text(json.dumps(
+            make_delta(old_text, new_text), ensure_ascii=False
+        ))
+        if (number - tip.base >= interval
+                or len(data) >= len(new_text.encode())):
+            data = None
+        revisions.append(build_revision(
+            note.pk, number, tip.base, note.title, new_text, data
+        ))
+    return NoteRevision.objects.using(using).bulk_create(revisions)
+
+
+def remember_loaded(notes):
+    """Сохранённое состояние заметок становится базой следующей правки."""
+    for note in notes:
+        note._loaded_values = {'title': note.title, 'text': note.text}
+
+
+def revision_text(revision, using=None):
+    """
+    Текст версии: снимок и разницы от него до версии читаются
+    одним запросом по диапазону номеров из базы самой версии.
+    """
+    chain = NoteRevision.objects.using(using or revision._state.db).filter(
+        note_id=revision.note_id,
+        number__range=(revision.base, revision.number),
+    ).order_by('number').values_list('data', flat=True)
+    chain = iter(chain)
+    text = decompress_text(next(chain))
+    for data in chain:
+        text = apply_delta(text, json.loads(decompress_text(data)))
+    return text
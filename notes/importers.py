@@ -0,0 +1,118 @@
+"""Потоковый импорт заметок из NDJSON и CSV."""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .bulk import create_notes, note_database
+from .models import Note
+from .slugs import SLUG_RETRIES, allocate_slugs, base_slug
+
+IMPORT_FIELDS = ('title', 'text', 'slug')
+
+
+class RowError(ValueError):
+    """Строку входного файла нельзя превратить в заметку."""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+
+def read_ndjson(lines):
+    """Построчно разбирает NDJSON: (номер строки, словарь или RowError)."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield number, RowError(f'Некорректный JSON: {error}')
+            continue
+        if not isinstance(row, dict):
+            yield number, RowError('Ожидался JSON-объект.')
+            continue
+        yield number, row
+
+
+def read_csv(lines):
+    """Построчно разбирает CSV с заголовком: title, text и slug."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def build_note(row, author):
+    """Создаёт несохранённую заметку и проверяет поля без запросов к БД."""
+    values = {}
+    for name in IMPORT_FIELDS:
+        value = row.get(name) or ''
+        if not isinstance(value, str):
+            raise RowError(f'{name}: ожидалась строка.')
+        values[name] = value.strip() if name == 'slug' else value
+    note = Note(author=author, **values)
+    try:
+        note.clean_fields(exclude=('author',))
+    except ValidationError as error:
+        raise RowError('; '.join(
+            f'{name}: {" ".join(messages)}'
+            for name, messages in error.message_dict.items()
+        ))
+    return note
+
+
+def save_batch(notes, using=None):
+    """
+    Подбирает slug для пакета одним запросом и сохраняет его через
+    bulk_create в отдельной транзакции. Если slug успел занять другой
+    запрос, пакет пересобирается заново.
+    """
+    using = note_database(notes, using)
+    requested = [note.slug or base_slug(note.title) for note in notes]
+    for attempt in range(SLUG_RETRIES):
+        for note, slug in zip(notes, allocate_slugs(requested, using=using)):
+            note.slug = slug
+        try:
+            with transaction.atomic(using=using):
+                return len(create_notes(notes, using=using))
+        except IntegrityError:
+            if attempt == SLUG_RETRIES - 1:
+                raise
+
+
+def import_notes(rows, author, batch_size=None, using=None):
+    """
+    Импортирует заметки из потока (номер строки, словарь) пакетами.
+    Ошибочные строки пропускаются и попадают в отчёт, не прерывая импорт.
+    """
+    batch_size = batch_size or settings.NOTES_IMPORT_BATCH_SIZE
+    result = ImportResult()
+    batch = []
+    for line, row in rows:
+        try:
+            if isinstance(row, RowError):
+                raise row
+            batch.append(build_note(row, author))
+        except RowError as error:
+            result.add_error(line, str(error))
+            continue
+        if len(batch) >= batch_size:
+            result.created += save_batch(batch, using=using)
+            batch = []
+    if batch:
+        result.created += save_batch(batch, using=using)
+    return result
@@ -0,0 +1,263 @@
+"""
+Очередь фоновых задач в базе данных.
+
+Задача — строка таблицы Job, брокер не нужен: очередь работает на той же
+SQLite. Воркеры manage.py run_workers забирают готовые задачи условным
+UPDATE: если одну задачу выбрали несколько воркеров, её получает тот,
+чей UPDATE изменил строку. Упавшая задача повторяется с экспоненциальной
+задержкой, после max_attempts попыток остаётся со статусом failed.
+Задача, воркер которой умер, снова выдаётся, когда истекает
+NOTES_JOB_TIMEOUT. Пока обработчик работает, воркер продлевает аренду
+задачи: раз в NOTES_JOB_HEARTBEAT секунд обновляет locked_at, поэтому
+долгая задача не выдаётся второму воркеру, пока первый жив.
+"""
+import contextlib
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+# Обработчики задач: тип -> (функция, предел попыток или None).
+HANDLERS = {}
+# Сколько раз воркер выбирает задачу заново, если её перехватил другой.
+CLAIM_RETRIES = 5
+# Сколько символов трассировки ошибки сохраняется в задаче.
+ERROR_LENGTH = 4000
+
+
+def handler(kind, max_attempts=None):
+    """
+    Регистрирует обработчик задач kind. Обработчик получает Job
+    и возвращает результат, который можно сохранить в JSON.
+    Обработчики неидемпотентных задач задают max_attempts=1.
+    """
+    def register(function):
+        HANDLERS[kind] = (function, max_attempts)
+        return function
+    return register
+
+
+def enqueue(kind, payload=None, user=None, delay=0):
+    """Ставит задачу в очередь; воркер возьмёт её через delay секунд."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Неизвестный тип задачи: {kind}')
+    _, max_attempts = HANDLERS[kind]
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        user=user,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.NOTES_JOB_MAX_ATTEMPTS,
+    )
+
+
+def backoff(attempt):
+    """
+    Задержка перед повтором: удваивается с каждой попыткой, а случайная
+    доля разводит по времени задачи, упавшие вместе.
+    """
+    delay = min(
+        settings.NOTES_JOB_BACKOFF * 2 ** (attempt - 1),
+        settings.NOTES_JOB_BACKOFF_MAX,
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def worker_name(number):
+    return f'{socket.gethostname()}:{os.getpid()}:{number}'[:100]
+
+
+def next_candidate(now):
+    """
+    Брошенная задача, а если таких нет — самая ранняя готовая.
+    Оба запроса идут по индексам (status, locked_at) и (status, run_at).
+    """
+    expired = now - timedelta(seconds=settings.NOTES_JOB_TIMEOUT)
+    fields = ('pk', 'status', 'attempts')
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=expired
+    ).values_list(*fields).first() or Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at').values_list(*fields).first()
+
+
+def claim(worker):
+    """Забирает готовую задачу для воркера или возвращает None."""
+    for _ in range(CLAIM_RETRIES):
+        now = timezone.now()
+        candidate = next_candidate(now)
+        if candidate is None:
+            return None
+        pk, status, attempts = candidate
+        if Job.objects.filter(
+                pk=pk, status=status, attempts=attempts
+        ).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1,
+        ):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def finish(job, **fields):
+    """Записывает итог задачи, если её не перехватил другой воркер."""
+    return Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by,
+        attempts=job.attempts,
+    ).update(**fields)
+
+
+@contextlib.contextmanager
+def lease(job):
+    """
+    Продлевает аренду задачи, пока выполняется блок: поток со своим
+    соединением раз в NOTES_JOB_HEARTBEAT секунд обновляет locked_at.
+    Если задачу перехватил другой воркер, продление прекращается.
+    Ошибка базы, например занятая запись, пропускает одно продление.
+    """
+    stop = threading.Event()
+
+    def renew():
+        try:
+            while not stop.wait(settings.NOTES_JOB_HEARTBEAT):
+                try:
+                    if not finish(job, locked_at=timezone.now()):
+                        return
+                except DatabaseError:
+                    continue
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(
+        target=renew, name=f'job-{job.pk}-lease', daemon=True
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def execute(job):
+    """
+    Выполняет взятую задачу. Ошибка обработчика не останавливает
+    воркер: задача уходит на повтор или помечается failed.
+    """
+    function, _ = HANDLERS.get(job.kind, (None, None))
+    try:
+        if function is None:
+            raise LookupError(f'Неизвестный тип задачи: {job.kind}')
+        if job.attempts > job.max_attempts:
+            raise TimeoutError(
+                'Задача не завершена воркером за NOTES_JOB_TIMEOUT'
+            )
+        with lease(job):
+            result = function(job)
+    except Exception:
+        error = traceback.format_exc()[-ERROR_LENGTH:]
+        if function is not None and job.attempts < job.max_attempts:
+            finish(
+                job, status=Job.QUEUED, error=error, locked_by='',
+                locked_at=None,
+                run_at=timezone.now() + timedelta(
+                    seconds=backoff(job.attempts)
+                ),
+            )
+        else:
+            finish(
+                job, status=Job.FAILED, error=error,
+                finished_at=timezone.now(),
+            )
+        return False
+    finish(
+        job, status=Job.DONE, result=result, error='',
+        finished_at=timezone.now(),
+    )
+    return True
+
+
+def work(worker, stop, burst=False, poll=None):
+    """
+    Цикл воркера: берёт и выполняет задачи, пока не установлен stop.
+    В режиме burst выходит, когда готовых задач не осталось.
+    Возвращает число выполненных задач.
+    """
+    poll = settings.NOTES_JOB_POLL_INTERVAL if poll is None else poll
+    processed = 0
+    while not stop.is_set():
+        job = claim(worker)
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll)
+            continue
+        execute(job)
+        processed += 1
+    return processed
+
+
+def work_in_thread(number, stop, burst=False, poll=None):
+    """Точка входа потока-воркера: соединения потока закрываются в конце."""
+    try:
+        return work(worker_name(number), stop, burst, poll)
+    finally:
+        connections.close_all()
+
+
+def work_in_process(number, stop, burst=False, poll=None):
+    """
+    Точка входа процесса-воркера, в том числе при запуске через spawn.
+    Ctrl+C получает вся группа процессов, а останавливает воркеры
+    родитель через stop, чтобы текущая задача не прерывалась.
+    """
+    import django
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+    work_in_thread(number, stop, burst, poll)
+
+
+def job_dir(job):
+    path = Path(settings.NOTES_JOB_DIR) / str(job.pk)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def partial_path(job, name):
+    """
+    Временный файл попытки для результата name. У каждой попытки свой
+    файл: попытка, которую сочли брошенной, не пишет в файл новой.
+    """
+    return job_dir(job) / f'{name}.{job.attempts}.part'
+
+
+def result_path(job):
+    """Файл с результатом задачи или None, если файла нет."""
+    name = (job.result or {}).get('file') if job.status == Job.DONE else None
+    if not name:
+        return None
+    path = Path(settings.NOTES_JOB_DIR) / str(job.pk) / name
+    return path if path.is_file() else None
+
+
+def save_upload(upload):
+    """Сохраняет загруженный файл до постановки задачи; возвращает путь."""
+    directory = Path(settings.NOTES_JOB_DIR) / 'uploads'
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{uuid.uuid4().hex}{Path(upload.name).suffix}'
+    with path.open('wb') as file:
+        for chunk in upload.chunks():
+            file.write(chunk)
+    return str(path)
@@ -0,0 +1,382 @@
+"""
+Нагрузочный тест приложения без сети (manage.py loadtest).
+
+Воркеры — потоки или процессы — вызывают yanote.wsgi.application
+напрямую, со всеми middleware, сессиями и CSRF. Каждый синтетический
+пользователь принадлежит одному воркеру и ведёт себя как браузер:
+входит по паролю, хранит cookie и выполняет действия из смеси
+маршрутов: список, страница заметки, создание, правка, удаление и вход.
+Для каждого маршрута считаются задержки, ответы с неожиданным статусом
+и ошибки блокировки базы («database is locked»), которые не дождались
+busy_timeout.
+"""
+import io
+import math
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connections, router, transaction
+from django.urls import reverse
+
+from . import bulk
+from .models import Note
+
+# Доли маршрутов в трафике по умолчанию: чтение преобладает над записью.
+DEFAULT_MIX = {
+    'list': 40, 'detail': 35, 'create': 10, 'edit': 8, 'delete': 4,
+    'login': 3,
+}
+# Статус успешного ответа маршрута: формы после записи перенаправляют.
+EXPECTED_STATUS = {
+    'list': 200, 'detail': 200, 'create': 302, 'edit': 302, 'delete': 302,
+    'login': 302,
+}
+USERNAME = 'loadtest-{}'
+PASSWORD = 'loadtest-password'
+ACCEPT_ENCODING = 'gzip, deflate, br'
+# Размеры текста заметок: от короткой строки до длинной записи.
+TEXT_SIZES = (40, 300, 2000)
+TEXT = 'Съешь же ещё этих мягких французских булок, да выпей чаю. '
+
+local = threading.local()
+
+
+def parse_mix(value):
+    """Смесь маршрутов из строки вида list=40,detail=35,create=10."""
+    mix = {}
+    for item in value.split(','):
+        route, _, weight = item.partition('=')
+        route = route.strip()
+        if route not in EXPECTED_STATUS:
+            raise ValueError(f'Неизвестный маршрут: {route}')
+        mix[route] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError('Сумма долей маршрутов должна быть больше нуля')
+    return mix
+
+
+def text_of(rng):
+    size = rng.choice(TEXT_SIZES)
+    return (TEXT * (size // len(TEXT) + 1))[:size]
+
+
+def prepare_users(count, notes_per_user):
+    """
+    Создаёт недостающих синтетических пользователей с общим паролем
+    и дополняет их заметки до notes_per_user.
+    Возвращает список (id, имя, slug заметок).
+    """
+    User = get_user_model()
+    names = [USERNAME.format(number) for number in range(count)]
+    existing = set(
+        User.objects.filter(username__in=names)
+        .values_list('username', flat=True)
+    )
+    # Хеш пароля считается один раз: он одинаков у всех пользователей.
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=name, password=password)
+        for name in names if name not in existing
+    )
+    users = []
+    rng = random.Random(0)
+    for author in User.objects.filter(username__in=names).order_by('pk'):
+        using = router.db_for_write(Note, instance=Note(author=author))
+        slugs = list(
+            Note.objects.using(using).filter(author=author)
+            .values_list('slug', flat=True)[:notes_per_user]
+        )
+        missing = [
+            Note(
+                title=f'Заметка нагрузки {number}',
+                text=text_of(rng),
+                slug=f'loadtest-{author.pk}-{number}',
+                author=author,
+            )
+            for number in range(len(slugs), notes_per_user)
+        ]
+        if missing:
+            with transaction.atomic(using=using):
+                bulk.create_notes(missing, using=using)
+            slugs += [note.slug for note in missing]
+        users.append((author.pk, author.username, slugs))
+    return users
+
+
+def count_locked(sender, request=None, **kwargs):
+    """Отмечает запрос воркера, упавший на блокировке базы."""
+    error = sys.exc_info()[1]
+    if isinstance(error, OperationalError) and 'locked' in str(error):
+        local.locked = True
+
+
+class Session:
+    """Синтетический пользователь: cookie и slug своих заметок."""
+
+    def __init__(self, username, slugs):
+        self.username = username
+        self.slugs = list(slugs)
+        # CsrfViewMiddleware сравнивает cookie с заголовком X-CSRFToken,
+        # поэтому токен можно завести самим, не загружая форму.
+        self.cookies = {settings.CSRF_COOKIE_NAME: secrets.token_hex(32)}
+        self.logged_in = False
+
+    def environ(self, method, path, data=None):
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'loadtest',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': 'loadtest',
+            'HTTP_ACCEPT_ENCODING': ACCEPT_ENCODING,
+            'HTTP_COOKIE': '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            ),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if method == 'POST':
+            environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+            environ[settings.CSRF_HEADER_NAME] = self.cookies[
+                settings.CSRF_COOKIE_NAME
+            ]
+        return environ
+
+    def store_cookies(self, headers):
+        for name, value in headers:
+            if name.lower() != 'set-cookie':
+                continue
+            for morsel in SimpleCookie(value).values():
+                if morsel['max-age'] == '0':
+                    self.cookies.pop(morsel.key, None)
+                else:
+                    self.cookies[morsel.key] = morsel.value
+
+
+class Worker:
+    """Воркер: по очереди выполняет действия своих пользователей."""
+
+    def __init__(self, number, users, mix, seed):
+        from yanote.wsgi import application
+
+        self.application = application
+        self.number = number
+        self.rng = random.Random(seed * 1000 + number)
+        self.sessions = [
+            Session(username, slugs) for _, username, slugs in users
+        ]
+        self.routes = list(mix)
+        self.weights = list(mix.values())
+        # Slug новых заметок уникальны между прогонами и воркерами.
+        self.run_id = secrets.token_hex(3)
+        self.created = 0
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.locked = defaultdict(int)
+
+    def request(self, route, session, method, path, data=None):
+        status_holder = []
+
+        def start_response(status, headers, exc_info=None):
+            status_holder.append(int(status.split()[0]))
+            session.store_cookies(headers)
+
+        local.locked = False
+        started = time.perf_counter()
+        try:
+            body = self.application(
+                session.environ(method, path, data), start_response
+            )
+            try:
+                for _ in body:
+                    pass
+            finally:
+                # close() отправляет request_finished: соединения с базой
+                # закрываются или остаются жить, как на сервере.
+                if hasattr(body, 'close'):
+                    body.close()
+            status = status_holder[0]
+        except Exception as error:
+            status = 'exception'
+            if isinstance(error, OperationalError) and 'locked' in str(error):
+                local.locked = True
+        self.latencies[route].append((time.perf_counter() - started) * 1000)
+        self.statuses[route][str(status)] += 1
+        if status != EXPECTED_STATUS[route]:
+            self.errors[route] += 1
+        if local.locked:
+            self.locked[route] += 1
+        return status
+
+    def login(self, session):
+        status = self.request(
+            'login', session, 'POST', reverse('users:login'),
+            {'username': session.username, 'password': PASSWORD},
+        )
+        session.logged_in = status == EXPECTED_STATUS['login']
+
+    def step(self):
+        session = self.rng.choice(self.sessions)
+        if not session.logged_in:
+            return self.login(session)
+        route = self.rng.choices(self.routes, self.weights)[0]
+        if route in ('detail', 'edit', 'delete') and not session.slugs:
+            route = 'create'
+        if route == 'delete' and len(session.slugs) == 1:
+            route = 'create'
+        if route == 'list':
+            self.request(route, session, 'GET', reverse('notes:list'))
+        elif route == 'detail':
+            slug = self.rng.choice(session.slugs)
+            self.request(
+                route, session, 'GET', reverse('notes:detail', args=(slug,))
+            )
+        elif route == 'create':
+            self.created += 1
+            slug = f'lt-{self.run_id}-{self.number}-{self.created}'
+            status = self.request(
+                route, session, 'POST', reverse('notes:add'), {
+                    'title': f'Новая заметка {self.created}',
+                    'text': text_of(self.rng),
+                    'slug': slug,
+                },
+            )
+            if status == EXPECTED_STATUS[route]:
+                session.slugs.append(slug)
+        elif route == 'edit':
+            slug = self.rng.choice(session.slugs)
+            self.request(
+                route, session, 'POST', reverse('notes:edit', args=(slug,)),
+                {
+                    'title': f'Правка {self.rng.randrange(10 ** 6)}',
+                    'text': text_of(self.rng),
+                    'slug': slug,
+                },
+            )
+        elif route == 'delete':
+            # Удаляются сначала заметки, созданные во время теста.
+            slug = session.slugs.pop()
+            self.request(
+                route, session, 'POST', reverse('notes:delete', args=(slug,))
+            )
+        else:
+            session.logged_in = False
+            self.login(session)
+
+    def run(self, deadline=None, requests=None):
+        done = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                if requests is not None and done >= requests:
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                self.step()
+                done += 1
+        finally:
+            connections.close_all()
+        return {
+            'elapsed': time.perf_counter() - started,
+            'latencies': dict(self.latencies),
+            'statuses': {
+                route: dict(counts) for route, counts in self.statuses.items()
+            },
+            'errors': dict(self.errors),
+            'locked': dict(self.locked),
+        }
+
+
+def run_worker(number, users, mix, seed, seconds, requests):
+    """Точка входа воркера, в том числе в отдельном процессе."""
+    got_request_exception.connect(
+        count_locked, dispatch_uid='loadtest_count_locked'
+    )
+    deadline = None if requests is not None else (
+        time.perf_counter() + seconds
+    )
+    return Worker(number, users, mix, seed).run(deadline, requests)
+
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, statuses, errors, locked, elapsed):
+    count = len(latencies)
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 1) if elapsed else 0,
+        'errors': errors,
+        'locked_errors': locked,
+        'statuses': dict(sorted(statuses.items())),
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+def merge(results):
+    """
+    Сводка по маршрутам и в целом из результатов воркеров.
+    Пропускная способность считается за время самого долгого воркера.
+    """
+    elapsed = max(result['elapsed'] for result in results)
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    errors = defaultdict(int)
+    locked = defaultdict(int)
+    for result in results:
+        for route, values in result['latencies'].items():
+            latencies[route] += values
+        for route, counts in result['statuses'].items():
+            for status, count in counts.items():
+                statuses[route][status] += count
+        for route, count in result['errors'].items():
+            errors[route] += count
+        for route, count in result['locked'].items():
+            locked[route] += count
+    routes = {
+        route: summarize(
+            latencies[route], statuses[route], errors[route], locked[route],
+            elapsed,
+        )
+        for route in EXPECTED_STATUS if latencies[route]
+    }
+    everything = [value for values in latencies.values() for value in values]
+    total_statuses = defaultdict(int)
+    for counts in statuses.values():
+        for status, count in counts.items():
+            total_statuses[status] += count
+    total = summarize(
+        everything, total_statuses, sum(errors.values()),
+        sum(locked.values()), elapsed,
+    ) if everything else {'requests': 0}
+    return {
+        'elapsed_seconds': round(elapsed, 2), 'total': total, 'routes': routes,
+    }
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.importers import READERS, import_notes
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с заметками.')
+        parser.add_argument(
+            '--user', required=True,
+            help='Имя пользователя, которому принадлежат заметки.',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(READERS), default=None,
+            help='Формат файла; по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Количество заметок, сохраняемых одной транзакцией.',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {fmt}')
+        try:
+            author = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["user"]} не найден'
+            )
+        with path.open(encoding='utf-8', newline='') as lines:
+            result = import_notes(
+                READERS[fmt](lines), author, options['batch_size']
+            )
+        for line, message in result.errors:
+            self.stderr.write(f'Строка {line}: {message}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Импортировано заметок: {result.created}')
+        )
@@ -0,0 +1,152 @@
+import json
+import multiprocessing
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from notes import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: воркеры вызывают WSGI-приложение напрямую '
+        'от имени синтетических пользователей и замеряют задержки '
+        'по маршрутам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=50,
+            help='Количество синтетических пользователей.',
+        )
+        parser.add_argument(
+            '--notes-per-user', type=int, default=20,
+            help='Сколько заметок у пользователя перед началом теста.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Количество воркеров.',
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Воркеры — процессы, а не потоки.',
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=10,
+            help='Длительность теста в секундах.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=None,
+            help='Общее число запросов вместо длительности.',
+        )
+        parser.add_argument(
+            '--mix', type=loadtest.parse_mix, default=loadtest.DEFAULT_MIX,
+            help='Доли маршрутов, например '
+                 'list=40,detail=35,create=10,edit=8,delete=4,login=3.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных действий.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON; «-» — вывести JSON.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if options['users'] < workers:
+            raise CommandError(
+                'Пользователей должно быть не меньше, чем воркеров.'
+            )
+        users = loadtest.prepare_users(
+            options['users'], options['notes_per_user']
+        )
+        requests = options['requests']
+        tasks = [
+            (
+                number, users[number::workers], options['mix'],
+                options['seed'], options['seconds'],
+                None if requests is None else (
+                    requests // workers + (number < requests % workers)
+                ),
+            )
+            for number in range(workers)
+        ]
+        # Соединения не должны достаться дочерним процессам.
+        connections.close_all()
+        if options['processes']:
+            pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        else:
+            pool = ThreadPoolExecutor(workers)
+        with pool:
+            results = list(pool.map(loadtest.run_worker, *zip(*tasks)))
+        summary = {
+            'commit': current_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(
+                timespec='seconds'
+            ),
+            'config': {
+                'users': options['users'],
+                'notes_per_user': options['notes_per_user'],
+                'workers': workers,
+                'processes': options['processes'],
+                'seconds': None if requests is not None else options[
+                    'seconds'
+                ],
+                'requests': requests,
+                'mix': options['mix'],
+                'seed': options['seed'],
+            },
+            **loadtest.merge(results),
+        }
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(summary, file, ensure_ascii=False, indent=2)
+        self.report(summary)
+
+    def report(self, summary):
+        self.stdout.write(
+            f'{"маршрут":<8} {"запросы":>8} {"в сек.":>8} {"p50":>8} '
+            f'{"p95":>8} {"p99":>8} {"ошибки":>7} {"locked":>7}'
+        )
+        rows = [*summary['routes'].items(), ('всего', summary['total'])]
+        for route, row in rows:
+            if not row['requests']:
+                continue
+            self.stdout.write(
+                f'{route:<8} {row["requests"]:>8} '
+                f'{row["throughput_rps"]:>8} {row["p50_ms"]:>8} '
+                f'{row["p95_ms"]:>8} {row["p99_ms"]:>8} '
+                f'{row["errors"]:>7} {row["locked_errors"]:>7}'
+            )
+        total = summary['total']
+        style = self.style.SUCCESS
+        if total.get('errors') or total.get('locked_errors'):
+            style = self.style.WARNING
+        self.stdout.write(style(
+            f'Запросов: {total["requests"]} за '
+            f'{summary["elapsed_seconds"]} с, задержки в мс'
+        ))
+
+
+def current_commit():
+    """Коммит кода, на котором запущен тест, чтобы сравнивать прогоны."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
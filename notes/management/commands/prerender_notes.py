@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes import rendering
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее рисует HTML текста заметок, у которых его нет '
+        'или он устарел.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество заметок, отрисовываемых одной транзакцией.',
+        )
+        parser.add_argument(
+            '--database', default=None,
+            help='Псевдоним базы данных; по умолчанию — все шарды.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перерисовать и заметки с актуальным HTML.',
+        )
+
+    def handle(self, *args, **options):
+        databases = (
+            [options['database']] if options['database']
+            else settings.NOTES_SHARDS
+        )
+        total = 0
+        for alias in databases:
+            last_pk = 0
+            while True:
+                notes = list(
+                    Note.objects.using(alias).filter(
+                        pk__gt=last_pk
+                    ).order_by('pk').only('pk', 'text')[
+                        :options['batch_size']
+                    ]
+                )
+                if not notes:
+                    break
+                last_pk = notes[-1].pk
+                total += rendering.prerender(notes, alias, options['force'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Отрисовано заметок: {total}')
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from notes import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит заметки авторов на шарды, выбранные по текущему '
+        'NOTES_SHARDS, и дописывает недостающие slug в реестр.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество заметок, переносимых одной транзакцией.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, каких авторов нужно перенести.',
+        )
+
+    def handle(self, *args, **options):
+        conflicts = sharding.sync_registry()
+        for slug in conflicts:
+            self.stderr.write(f'Slug {slug} занят на нескольких шардах')
+        moves = sharding.misplaced_authors()
+        total = 0
+        for author_id, source, target in moves:
+            if options['dry_run']:
+                self.stdout.write(f'Автор {author_id}: {source} -> {target}')
+                continue
+            moved = sharding.move_author(
+                author_id, source, target, options['batch_size']
+            )
+            total += moved
+            self.stdout.write(
+                f'Автор {author_id}: {source} -> {target}, заметок: {moved}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов к переносу: {len(moves)}, перенесено заметок: {total}'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from notes import jobs, search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс заметок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество заметок, индексируемых за один запрос.',
+        )
+        parser.add_argument(
+            '--database', default=None,
+            help='Псевдоним базы данных, индекс которой перестраивается.',
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Поставить перестройку в очередь фоновых задач.',
+        )
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('reindex', {'database': options['database']})
+            self.stdout.write(
+                self.style.SUCCESS(f'Задача {job.pk} поставлена в очередь')
+            )
+            return
+        total = search.rebuild_index(
+            batch_size=options['batch_size'], using=options['database']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано заметок: {total}')
+        )
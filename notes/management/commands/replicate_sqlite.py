@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notes import replication
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплики SQLite копиями основных баз раз в --lag секунд, '
+        'имитируя отставание реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=float, default=2.0,
+            help='Пауза между обновлениями реплик в секундах.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обновить реплики один раз и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = replication.replicate()
+            self.stdout.write(f'Обновлено реплик: {count}')
+            if options['once']:
+                return
+            time.sleep(options['lag'])
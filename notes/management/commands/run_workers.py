@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from notes import jobs
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры, выполняющие фоновые задачи из базы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.NOTES_JOB_WORKERS,
+            help='Количество воркеров.',
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Воркеры — процессы, а не потоки: для задач, '
+                 'нагружающих процессор.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда готовых задач не останется.',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=None,
+            help='Пауза между проверками пустой очереди в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes']:
+            # Соединения не должны достаться дочерним процессам.
+            connections.close_all()
+            stop = multiprocessing.Event()
+            workers = [
+                multiprocessing.Process(
+                    target=jobs.work_in_process,
+                    args=(number, stop, options['burst'], options['poll']),
+                )
+                for number in range(options['workers'])
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(
+                    target=jobs.work_in_thread,
+                    args=(number, stop, options['burst'], options['poll']),
+                )
+                for number in range(options['workers'])
+            ]
+        # SIGTERM останавливает воркеры так же мягко, как Ctrl+C.
+        previous = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Запущено воркеров: {len(workers)}')
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка: воркеры завершают текущие задачи')
+            stop.set()
+            for worker in workers:
+                worker.join()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены'))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро создаёт синтетических пользователей и заметки '
+        'для нагрузочных тестов и бенчмарков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Количество пользователей.',
+        )
+        parser.add_argument(
+            '--notes', type=int, default=100000,
+            help='Общее количество заметок.',
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей: seed-0, seed-1, ...',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=20000,
+            help='Количество заметок, сохраняемых одной транзакцией.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Количество процессов, генерирующих заметки; '
+                 'записывает всё равно основной процесс.',
+        )
+        parser.add_argument(
+            '--search-index', action='store_true',
+            help='Сразу заполнять поисковый индекс; это втрое медленнее, '
+                 'чем перестроить его потом командой rebuild_search_index.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных данных.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        users, notes, seconds = seeding.seed_notes(
+            options['users'],
+            options['notes'],
+            prefix=options['prefix'],
+            batch_size=options['batch_size'],
+            processes=options['processes'],
+            search_index=options['search_index'],
+            seed=options['seed'],
+            progress=lambda created: self.stdout.write(
+                f'Создано заметок: {created}'
+            ) if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {users}, заметок: {notes} '
+            f'за {seconds:.1f} с ({notes / max(seconds, 1e-9):.0f} в секунду)'
+        ))
+        if notes and not options['search_index']:
+            self.stdout.write(
+                'Поиск не найдёт новые заметки, пока индекс не перестроен: '
+                'manage.py rebuild_search_index'
+            )
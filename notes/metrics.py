@@ -0,0 +1,155 @@
+"""
+Метрики времени обработки запросов в формате Prometheus.
+
+Гистограммы и счётчики хранятся в памяти процесса, как и статистика
+кеша страниц: при нескольких процессах WSGI-сервера каждый отдаёт
+свои значения, а суммирует их Prometheus по метке instance.
+"""
+import bisect
+import threading
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+PREFIX = 'yanote'
+
+
+@dataclass
+class RequestTimings:
+    """Замеры одного запроса; время в секундах."""
+    queries: int = 0
+    db: float = 0.0
+    view: float = 0.0
+    render: float = 0.0
+    total: float = 0.0
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        middleware = max(self.total - self.view - self.render, 0.0)
+        return ', '.join((
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+            f'view;dur={self.view * 1000:.2f}',
+            f'render;dur={self.render * 1000:.2f}',
+            f'middleware;dur={middleware * 1000:.2f}',
+            f'total;dur={self.total * 1000:.2f}',
+        ))
+
+
+@dataclass
+class ViewMetrics:
+    """Накопленные значения для одного представления и метода."""
+    buckets: list
+    count: int = 0
+    duration: float = 0.0
+    queries: int = 0
+    db: float = 0.0
+    render: float = 0.0
+    statuses: dict = field(default_factory=dict)
+
+
+class Registry:
+    """Потокобезопасное хранилище метрик по представлениям."""
+
+    def __init__(self, bounds=None):
+        self.bounds = tuple(bounds or settings.NOTES_METRICS_BUCKETS)
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, method, status, timings):
+        index = bisect.bisect_left(self.bounds, timings.total)
+        with self.lock:
+            metrics = self.views.get((view, method))
+            if metrics is None:
+                metrics = self.views[view, method] = ViewMetrics(
+                    [0] * len(self.bounds)
+                )
+            if index < len(self.bounds):
+                metrics.buckets[index] += 1
+            metrics.count += 1
+            metrics.duration += timings.total
+            metrics.queries += timings.queries
+            metrics.db += timings.db
+            metrics.render += timings.render
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus 0.0.4."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                f'# HELP {PREFIX}_request_duration_seconds '
+                'Время обработки запроса.',
+                f'# TYPE {PREFIX}_request_duration_seconds histogram',
+            ]
+            for (view, method), metrics in views:
+                labels = f'view="{escape(view)}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(self.bounds, metrics.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'{PREFIX}_request_duration_seconds_bucket'
+                        f'{{{labels},le="{bound:g}"}} {cumulative}'
+                    )
+                lines += [
+                    f'{PREFIX}_request_duration_seconds_bucket'
+                    f'{{{labels},le="+Inf"}} {metrics.count}',
+                    f'{PREFIX}_request_duration_seconds_sum'
+                    f'{{{labels}}} {metrics.duration:.6f}',
+                    f'{PREFIX}_request_duration_seconds_count'
+                    f'{{{labels}}} {metrics.count}',
+                ]
+            for name, help_text, attribute, kind in COUNTERS:
+                lines += [
+                    f'# HELP {PREFIX}_{name} {help_text}',
+                    f'# TYPE {PREFIX}_{name} counter',
+                ]
+                for (view, method), metrics in views:
+                    value = getattr(metrics, attribute)
+                    lines.append(
+                        f'{PREFIX}_{name}'
+                        f'{{view="{escape(view)}",method="{method}"}} '
+                        + (f'{value:.6f}' if kind is float else str(value))
+                    )
+            lines += [
+                f'# HELP {PREFIX}_responses_total Ответы по кодам статуса.',
+                f'# TYPE {PREFIX}_responses_total counter',
+            ]
+            for (view, method), metrics in views:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'{PREFIX}_responses_total{{view="{escape(view)}",'
+                        f'method="{method}",status="{status}"}} {count}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+COUNTERS = (
+    ('db_queries_total', 'Число SQL-запросов.', 'queries', int),
+    ('db_duration_seconds_total', 'Время SQL-запросов.', 'db', float),
+    ('render_duration_seconds_total', 'Время отрисовки шаблонов.',
+     'render', float),
+)
+
+
+def escape(value):
+    """Экранирует значение метки по правилам формата Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry()
+    return _registry
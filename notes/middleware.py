@@ -0,0 +1,194 @@
+import contextlib
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression
+from .metrics import RequestTimings, get_registry
+from .routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Типы содержимого, которые сжимаются; архивы и картинки уже сжаты.
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson',
+    'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+
+class TimingMiddleware:
+    """
+    Замеряет число и время SQL-запросов, время представления и отрисовки
+    шаблона, отдаёт их в заголовке Server-Timing и копит гистограммы
+    для /metrics/.
+
+    Должен стоять первым в MIDDLEWARE: тогда total включает работу
+    сессий и аутентификации, а разница total - view - render показывает
+    время остальных middleware. Для потоковых ответов замеряется время
+    до первого байта. При NOTES_METRICS_ENABLED = False Django исключает
+    middleware из цепочки и накладных расходов нет совсем.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NOTES_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request.timings = RequestTimings()
+        start = time.perf_counter()
+
+        def record_query(execute, sql, params, many, context):
+            query_start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timings.db += time.perf_counter() - query_start
+                timings.queries += 1
+
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(record_query)
+                )
+            response = self.get_response(request)
+        end = time.perf_counter()
+        timings.total = end - start
+        view_start = getattr(request, 'view_started', None)
+        if view_start is not None:
+            view_end = getattr(request, 'view_finished', end)
+            timings.view = view_end - view_start
+        response['Server-Timing'] = timings.server_timing()
+        match = request.resolver_match
+        get_registry().observe(
+            match.view_name if match else 'unresolved',
+            request.method, response.status_code, timings,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """Вызывается последним перед render(): здесь кончается view."""
+        request.view_finished = time.perf_counter()
+
+        def finish_render(rendered):
+            request.timings.render = (
+                time.perf_counter() - request.view_finished
+            )
+
+        response.add_post_render_callback(finish_render)
+        return response
+
+
+class ReplicaReadMiddleware:
+    """
+    Разрешает GET- и HEAD-запросам читать заметки с реплик.
+
+    После успешного изменяющего запроса клиент получает cookie
+    со временем, до которого его чтения идут в основную базу: так автор
+    сразу видит свою правку, даже если реплика ещё отстаёт. Без реплик
+    в настройках Django исключает middleware из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not any(settings.NOTES_REPLICAS.values()):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        token = replica_reads.set(safe and not self.is_sticky(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        if not safe and response.status_code < 400:
+            window = settings.NOTES_REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                settings.NOTES_REPLICA_COOKIE,
+                str(int(time.time() + window)),
+                max_age=window, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def is_sticky(self, request):
+        """Не истекло ли окно чтения из основной базы после записи."""
+        value = request.COOKIES.get(settings.NOTES_REPLICA_COOKIE, '')
+        return value.isdigit() and int(value) > time.time()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы кодировкой, которую клиент принимает с наибольшим
+    весом: zstd, br или gzip (см. notes.compression).
+
+    Потоковые ответы сжимаются кусками по мере отдачи, без накопления
+    в памяти. Не сжимаются ответы меньше NOTES_COMPRESS_MIN_SIZE байт,
+    уже сжатые (Content-Encoding или тип вроде zip) и с no-transform.
+    Страницы с CSRF-токеном не сжимаются: размер сжатого ответа, где
+    секрет соседствует с отражённым вводом, раскрывает его (BREACH).
+    Сжатый ответ получает слабый ETag: байты отличаются от несжатых,
+    а If-None-Match в ConditionalPageMixin сравнивается по слабому
+    правилу, поэтому 304 продолжает работать. Должен стоять сразу после
+    TimingMiddleware, чтобы сжимать ответ после всех остальных.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NOTES_COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.META.get('CSRF_COOKIE_USED'):
+            return response
+        coding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if response.status_code == 304:
+            # Валидатор 304 совпадает с тем, что ушёл в сжатом ответе 200.
+            if coding:
+                patch_vary_headers(response, ('Accept-Encoding',))
+                weaken_etag(response)
+            return response
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if coding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                coding, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            content = compression.compress(coding, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        weaken_etag(response)
+        response['Content-Encoding'] = coding
+        return response
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        return response.streaming or (
+            len(response.content) >= settings.NOTES_COMPRESS_MIN_SIZE
+        )
+
+
+def weaken_etag(response):
+    etag = response.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = f'W/{etag}'
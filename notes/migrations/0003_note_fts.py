@@ -0,0 +1,38 @@
+from django.db import migrations
+
+CREATE_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_note_fts USING fts5(
+    owner, title, text,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+FILL_FTS = """
+INSERT INTO notes_note_fts (rowid, owner, title, text)
+SELECT id, 'u' || author_id, title, text FROM notes_note
+"""
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_FTS)
+    schema_editor.execute(FILL_FTS)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS notes_note_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
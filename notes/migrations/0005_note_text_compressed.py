@@ -0,0 +1,59 @@
+from django.db import migrations
+
+import notes.fields
+from notes.fields import compress_text, decompress_text
+
+BATCH_SIZE = 1000
+
+
+def convert_texts(schema_editor, convert):
+    """
+    Перезаписывает текст всех заметок пакетами по BATCH_SIZE строк
+    в порядке id, чтобы не держать в памяти всю таблицу.
+    """
+    connection = schema_editor.connection
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, text FROM notes_note WHERE id > %s '
+                'ORDER BY id LIMIT %s',
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            cursor.executemany(
+                'UPDATE notes_note SET text = %s WHERE id = %s',
+                [(convert(text), pk) for pk, text in rows],
+            )
+        last_id = rows[-1][0]
+
+
+def compress(apps, schema_editor):
+    convert_texts(
+        schema_editor,
+        lambda text: compress_text(decompress_text(text)),
+    )
+
+
+def decompress(apps, schema_editor):
+    convert_texts(schema_editor, decompress_text)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_note_timestamps'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='text',
+            field=notes.fields.CompressedTextField(
+                help_text='Добавьте подробностей', verbose_name='Текст'
+            ),
+        ),
+        migrations.RunPython(compress, decompress),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_noterevision'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['updated_at'], name='notes_note_updated_idx'),
+        ),
+    ]
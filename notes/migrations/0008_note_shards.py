@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0007_note_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteSlug',
+            fields=[
+                ('slug', models.SlugField(max_length=100, primary_key=True, serialize=False, verbose_name='Slug')),
+                ('shard', models.CharField(max_length=100, verbose_name='Шард')),
+                ('note_id', models.BigIntegerField(verbose_name='Заметка')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='noteslug',
+            index=models.Index(fields=['shard', 'note_id'], name='notes_slug_note_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import notes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRendering',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendering', serialize=False, to='notes.note')),
+                ('text_hash', models.CharField(max_length=32, verbose_name='Хеш текста')),
+                ('html', notes.fields.CompressedTextField(verbose_name='HTML')),
+            ],
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations
+
+from notes.fields import decompress_text
+from notes.search import INSERT_SQL, index_row
+
+BATCH_SIZE = 1000
+
+CREATE_FTS = """
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    title, text, plain_title,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+CREATE_OLD_FTS = """
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    owner, title, text,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+INSERT_OLD_SQL = (
+    'INSERT INTO notes_note_fts (rowid, owner, title, text) '
+    'VALUES (%s, %s, %s, %s)'
+)
+
+
+def recreate_index(schema_editor, create_sql, insert_sql, make_row):
+    """
+    Пересоздаёт индекс и заполняет его пакетами по BATCH_SIZE заметок
+    в порядке id, чтобы не держать в памяти всю таблицу.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS notes_note_fts')
+    schema_editor.execute(create_sql)
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, author_id, title, text FROM notes_note '
+                'WHERE id > %s ORDER BY id LIMIT %s',
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(insert_sql, [
+                make_row(pk, author_id, title, decompress_text(text))
+                for pk, author_id, title, text in rows
+            ])
+        last_id = rows[-1][0]
+    schema_editor.execute(
+        "INSERT INTO notes_note_fts (notes_note_fts) VALUES ('optimize')"
+    )
+
+
+def author_terms(apps, schema_editor):
+    recreate_index(schema_editor, CREATE_FTS, INSERT_SQL, index_row)
+
+
+def owner_column(apps, schema_editor):
+    recreate_index(
+        schema_editor, CREATE_OLD_FTS, INSERT_OLD_SQL,
+        lambda pk, author_id, title, text: (
+            pk, f'u{author_id}', title, text
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0010_note_rendering'),
+    ]
+
+    operations = [
+        migrations.RunPython(author_terms, owner_column),
+    ]
@@ -0,0 +1,118 @@
+from django.db import migrations
+
+from notes.fields import decompress_text
+from notes.search import INSERT_SQL, index_row
+
+BATCH_SIZE = 1000
+
+CREATE_FTS = """
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    title, text, plain_title,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+CREATE_OLD_FTS = """
+CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+    title, text, plain_title,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+
+# Прежние термы вычисляет функция notes_author_terms, которую
+# регистрирует notes.db. Заметки, которых нет в индексе, пропускаются:
+# команда 'delete' для непроиндексированной строки испортила бы индекс.
+CREATE_TRIGGERS = (
+    """
+    CREATE TRIGGER notes_note_fts_update
+    AFTER UPDATE OF author_id, title, text ON notes_note
+    WHEN old.id IN (SELECT id FROM notes_note_fts_docsize)
+        AND (old.author_id IS NOT new.author_id
+             OR old.title IS NOT new.title OR old.text IS NOT new.text)
+    BEGIN
+        INSERT INTO notes_note_fts (notes_note_fts, rowid, title, text,
+                                    plain_title)
+        VALUES ('delete', old.id,
+                notes_author_terms(old.author_id, old.title),
+                notes_author_terms(old.author_id, old.text), old.title);
+        INSERT INTO notes_note_fts (rowid, title, text, plain_title)
+        VALUES (new.id,
+                notes_author_terms(new.author_id, new.title),
+                notes_author_terms(new.author_id, new.text), new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_note_fts_delete AFTER DELETE ON notes_note
+    WHEN old.id IN (SELECT id FROM notes_note_fts_docsize)
+    BEGIN
+        INSERT INTO notes_note_fts (notes_note_fts, rowid, title, text,
+                                    plain_title)
+        VALUES ('delete', old.id,
+                notes_author_terms(old.author_id, old.title),
+                notes_author_terms(old.author_id, old.text), old.title);
+    END
+    """,
+)
+
+DROP_TRIGGERS = (
+    'DROP TRIGGER IF EXISTS notes_note_fts_update',
+    'DROP TRIGGER IF EXISTS notes_note_fts_delete',
+)
+
+
+def recreate_index(schema_editor, create_sql):
+    """
+    Пересоздаёт индекс и заполняет его пакетами по BATCH_SIZE заметок
+    в порядке id, чтобы не держать в памяти всю таблицу.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS notes_note_fts')
+    schema_editor.execute(create_sql)
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, author_id, title, text FROM notes_note '
+                'WHERE id > %s ORDER BY id LIMIT %s',
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(INSERT_SQL, [
+                index_row(pk, author_id, title, decompress_text(text))
+                for pk, author_id, title, text in rows
+            ])
+        last_id = rows[-1][0]
+    schema_editor.execute(
+        "INSERT INTO notes_note_fts (notes_note_fts) VALUES ('optimize')"
+    )
+
+
+def contentless(apps, schema_editor):
+    recreate_index(schema_editor, CREATE_FTS)
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+def with_content(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_TRIGGERS:
+            schema_editor.execute(statement)
+    recreate_index(schema_editor, CREATE_OLD_FTS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_note_fts_author_terms'),
+    ]
+
+    operations = [
+        migrations.RunPython(contentless, with_content),
+    ]
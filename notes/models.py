@@ -1,7 +1,38 @@
+from functools import partial
+
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from .fields import CompressedTextField
+from .routers import is_sharded, shard_for
+from .slugs import save_with_slug
+
+# Поля, которые выводят списки заметок: без текста, самого большого поля.
+SUMMARY_FIELDS = ('id', 'title', 'slug')
+# Поля, изменения которых сохраняются в истории правок.
+VERSIONED_FIELDS = ('title', 'text')
+
+
+class NoteQuerySet(models.QuerySet):
 
-from pytils.translit import slugify
+    def summaries(self):
+        """Заметки только с полями для списков; текст не читается."""
+        return self.only(*SUMMARY_FIELDS)
+
+    def for_author(self, author):
+        """Заметки автора из базы его шарда."""
+        return self.using(shard_for(author.pk)).filter(author=author)
+
+    def create(self, **kwargs):
+        """
+        Без явного using() заметка пишется туда, куда её направит роутер
+        по автору, а не в базу по умолчанию.
+        """
+        note = self.model(**kwargs)
+        self._for_write = True
+        note.save(force_insert=True, using=self._db)
+        return note
 
 
 class Note(models.Model):
@@ -11,7 +42,7 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
@@ -23,17 +54,189 @@ class Note(models.Model):
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
     )
+    # Заметка может лежать на шарде, а автор — в базе default,
+    # поэтому внешний ключ проверяет Django, а не база.
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    updated_at = models.DateTimeField('Изменена', auto_now=True)
+
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'id'), name='notes_note_author_id_idx'
+            ),
+            models.Index(
+                fields=('author', 'updated_at'),
+                name='notes_note_author_upd_idx'
+            ),
+            models.Index(
+                fields=('updated_at',), name='notes_note_updated_idx'
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает прочитанные заголовок и текст для истории правок."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in VERSIONED_FIELDS
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        loaded = getattr(self, '_loaded_values', {})
+        for name in VERSIONED_FIELDS:
+            if (fields is None or name in fields) and name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+        self._loaded_values = loaded
+
     def save(self, *args, **kwargs):
+        """
+        Без явного slug заметка получает свободный slug из заголовка.
+        На шардах запись и реестр slug меняются в одной транзакции шарда:
+        если slug занят на другом шарде, запись откатывается.
+        """
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        save = partial(super().save, *args, **kwargs)
         if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+            return save_with_slug(self, save, using)
+        if not is_sharded():
+            return save()
+        with transaction.atomic(using=using):
+            return save()
+
+
+class NoteRevision(models.Model):
+    """
+    Версия заметки. Текст хранится либо целиком (снимок), либо разницей
+    с предыдущей версией; base — номер снимка, с которого начинается
+    цепочка разниц до этой версии.
+    """
+    note = models.ForeignKey(
+        Note, on_delete=models.CASCADE, related_name='revisions'
+    )
+    number = models.PositiveIntegerField('Номер')
+    base = models.PositiveIntegerField('Снимок')
+    title = models.CharField('Заголовок', max_length=100)
+    data = models.BinaryField('Данные')
+    size = models.PositiveIntegerField('Длина текста')
+    digest = models.CharField('Хеш текста', max_length=16)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='notes_revision_number_uniq'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.note_id} #{self.number}'
+
+    @property
+    def is_snapshot(self):
+        return self.base == self.number
+
 
+class NoteRendering(models.Model):
+    """
+    HTML текста заметки, отрисованный из Markdown. Хранится на шарде
+    заметки; text_hash — хеш текста, из которого HTML получен.
+    """
+    note = models.OneToOneField(
+        Note, on_delete=models.CASCADE, primary_key=True,
+        related_name='rendering',
+    )
+    text_hash = models.CharField('Хеш текста', max_length=32)
+    html = CompressedTextField('HTML')
+
+    def __str__(self):
+        return f'{self.note_id} {self.text_hash}'
+
+
+class NoteSlug(models.Model):
+    """
+    Реестр slug в базе default. Заметки разных авторов лежат на разных
+    шардах, и уникальный индекс одного шарда не видит slug других;
+    уникальный slug реестра делает его уникальным для всех шардов.
+    Ведётся, только когда шардов больше одного.
+    """
+    slug = models.SlugField('Slug', max_length=100, primary_key=True)
+    shard = models.CharField('Шард', max_length=100)
+    note_id = models.BigIntegerField('Заметка')
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('shard', 'note_id'), name='notes_slug_note_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.slug} ({self.shard}:{self.note_id})'
+
+
+class Job(models.Model):
+    """
+    Фоновая задача: выгрузка, импорт, переиндексация, удаление аккаунта.
+    Воркер, взявший задачу, записывает себя в locked_by; задача без
+    отметки дольше NOTES_JOB_TIMEOUT считается брошенной.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Тип', max_length=50)
+    payload = models.JSONField('Параметры', default=dict)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+    )
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Предел попыток', default=1)
+    run_at = models.DateTimeField('Запуск не раньше', default=timezone.now)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята', null=True, blank=True)
+    result = models.JSONField('Результат', null=True, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'), name='notes_job_ready_idx'
+            ),
+            models.Index(
+                fields=('status', 'locked_at'), name='notes_job_lease_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
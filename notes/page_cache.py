@@ -0,0 +1,104 @@
+"""
+Кеш отрисованных страниц заметок с версией на пользователя.
+
+Ключ страницы содержит текущую версию пользователя, поэтому любое
+изменение его заметок сводится к смене версии: старые страницы
+перестают находиться и вытесняются бэкендом кеша сами. Версия — время
+последнего изменения в наносекундах, по ней же строится Last-Modified.
+"""
+import datetime
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.NOTES_PAGE_CACHE]
+
+
+def version_key(user_id):
+    return f'notes:version:{user_id}'
+
+
+def get_version(user_id):
+    """
+    Текущая версия страниц пользователя. Начальное значение берётся
+    из времени, чтобы пользователь с повторно выданным id не получил
+    чужие страницы, оставшиеся в кеше.
+    """
+    cache = get_cache()
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def changed_at(user_id):
+    """Время последнего сброса страниц пользователя."""
+    return datetime.datetime.fromtimestamp(
+        get_version(user_id) / 1e9, tz=datetime.timezone.utc
+    )
+
+
+def version_age(user_id):
+    """Сколько секунд прошло с последнего сброса страниц пользователя."""
+    return (time.time_ns() - get_version(user_id)) / 1e9
+
+
+def _bump(user_id):
+    """Новая версия всегда больше прежней, даже при грубых часах."""
+    cache = get_cache()
+    key = version_key(user_id)
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, None)
+
+
+def bump_version(user_id, using=None):
+    """
+    Сбрасывает кешированные страницы пользователя: сразу и ещё раз после
+    фиксации транзакции, чтобы страница, отрисованная до фиксации,
+    не осталась в кеше с новой версией.
+    """
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id), using=using)
+
+
+def page_key(user_id, name, path):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'notes:page:{user_id}:{get_version(user_id)}:{name}:{digest}'
+
+
+def get_page(key, name):
+    """Возвращает кешированное тело страницы или None и учитывает промах."""
+    content = get_cache().get(key)
+    with _stats_lock:
+        _stats[name, 'hit' if content is not None else 'miss'] += 1
+    return content
+
+
+def set_page(key, content):
+    get_cache().set(key, content, settings.NOTES_PAGE_CACHE_TIMEOUT)
+
+
+def stats():
+    """Счётчики попаданий и промахов кеша по страницам в этом процессе."""
+    with _stats_lock:
+        result = {}
+        for (name, outcome), count in _stats.items():
+            result.setdefault(name, {'hit': 0, 'miss': 0})[outcome] = count
+        return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def row_key(row):
+    """Первичный ключ записи: модели или словаря из values()."""
+    return row['id'] if isinstance(row, dict) else row.pk
+
+
+@dataclass
+class KeysetPage:
+    """Страница заметок, выбранная по курсору."""
+    object_list: list = field(default_factory=list)
+    has_next: bool = False
+    has_previous: bool = False
+
+    @property
+    def next_cursor(self):
+        """Курсор для ссылки ?after= на следующую страницу."""
+        if self.has_next and self.object_list:
+            return row_key(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        """Курсор для ссылки ?before= на предыдущую страницу."""
+        if self.has_previous and self.object_list:
+            return row_key(self.object_list[0])
+        return None
+
+
+def parse_cursor(value):
+    """Возвращает курсор из GET-параметра или None, если он некорректен."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def get_page_size(value):
+    """
+    Размер страницы из GET-параметра, ограниченный NOTES_MAX_PAGE_SIZE.
+    При отсутствии или ошибке используется NOTES_PAGE_SIZE.
+    """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return settings.NOTES_PAGE_SIZE
+    return max(1, min(size, settings.NOTES_MAX_PAGE_SIZE))
+
+
+def keyset_paginate(queryset, after=None, before=None, page_size=None):
+    """
+    Выбирает одну страницу по первичному ключу без OFFSET и COUNT(*).
+
+    Запрашивается на одну запись больше размера страницы: по ней
+    определяется, есть ли страница дальше в направлении выборки.
+    Наличие страницы в обратном направлении следует из самого курсора,
+    но только для непустой страницы: у пустой нет записи, от которой
+    строится курсор, например у ?before=1 или ?after= за концом списка.
+    """
+    page_size = page_size or settings.NOTES_PAGE_SIZE
+    if before is not None:
+        rows = list(
+            queryset.filter(pk__lt=before).order_by('-pk')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        return KeysetPage(rows, has_next=bool(rows), has_previous=has_more)
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    rows = list(queryset.order_by('pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    return KeysetPage(
+        rows[:page_size], has_next=has_more,
+        has_previous=after is not None and bool(rows),
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator, который не считает COUNT(*) по всей таблице.
+
+    Строки считаются не дальше NOTES_ADMIN_EXACT_COUNT_LIMIT: если их
+    меньше, число точное. Иначе для выборки без фильтров число строк
+    оценивается по наибольшему первичному ключу — это один шаг по индексу,
+    а для выборки с фильтрами возвращается сам предел. В обоих случаях
+    это один запрос.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.NOTES_ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset[:limit + 1].count()
+        meta = queryset.model._meta
+        connection = connections[queryset.db]
+        table = connection.ops.quote_name(meta.db_table)
+        pk = connection.ops.quote_name(meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*), (SELECT MAX({pk}) FROM {table}) '
+                f'FROM (SELECT 1 FROM {table} LIMIT %s)',
+                [limit + 1],
+            )
+            counted, last_pk = cursor.fetchone()
+        return counted if counted <= limit else max(counted, last_pk)
@@ -0,0 +1,106 @@
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from notes import search
+from notes.models import Note
+
+CHANGELIST_URL = reverse('admin:notes_note_changelist')
+
+
+def create_notes(django_user_model, count, start=0):
+    authors = [
+        django_user_model.objects.create(username=f'Автор {start}-{i}')
+        for i in range(3)
+    ]
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {i}', text='Текст', slug=f'note-{i}',
+             author=authors[i % len(authors)])
+        for i in range(start, start + count)
+    )
+    search.rebuild_index()
+
+
+def changelist_queries(client, params=''):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(CHANGELIST_URL + params)
+    assert response.status_code == 200
+    return response, [query['sql'] for query in context.captured_queries]
+
+
+def test_1_changelist_queries_are_constant(
+        settings, admin_client, django_user_model):
+    """
+    Тест 1. Число запросов списка заметок не зависит от числа строк,
+    строки не считаются COUNT(*) по всей таблице.
+    """
+    settings.NOTES_ADMIN_EXACT_COUNT_LIMIT = 20
+    create_notes(django_user_model, 5)
+    admin_client.get(CHANGELIST_URL)
+    _, small = changelist_queries(admin_client)
+    create_notes(django_user_model, 100, start=5)
+    response, large = changelist_queries(admin_client)
+    assert len(small) == len(large)
+    assert all(
+        'LIMIT' in sql for sql in large if 'COUNT(' in sql.upper()
+    )
+    assert response.context['cl'].result_count >= 105
+
+
+@pytest.mark.parametrize(
+    'term, expected',
+    (
+        ('note-3', {'note-3'}),
+        ('Автор 0-1', {'note-1', 'note-4'}),
+        ('Заметка', {f'note-{i}' for i in range(6)}),
+    ),
+)
+def test_2_search(admin_client, django_user_model, term, expected):
+    """
+    Тест 2. Поиск по slug, имени автора и словам заголовка.
+    """
+    create_notes(django_user_model, 6)
+    response, _ = changelist_queries(admin_client, f'?q={term}')
+    slugs = {note.slug for note in response.context['cl'].result_list}
+    assert slugs == expected
+
+
+def test_3_filtered_count_is_capped(
+        settings, admin_client, django_user_model):
+    """
+    Тест 3. Для выборки с фильтром число строк считается до предела.
+    """
+    settings.NOTES_ADMIN_EXACT_COUNT_LIMIT = 10
+    create_notes(django_user_model, 30)
+    response, _ = changelist_queries(
+        admin_client, '?updated_at__gte=2000-01-01+00:00:00%2B00:00'
+    )
+    assert response.context['cl'].result_count == 11
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@pytest.mark.parametrize('term', ('note-3', 'Автор 0-1', 'Заметка'))
+def test_4_search_uses_indexes(admin_client, django_user_model, term):
+    """
+    Тест 4. Запрос заметок при поиске идёт по индексам,
+    а не перебором всей таблицы.
+    """
+    create_notes(django_user_model, 6)
+    _, queries = changelist_queries(admin_client, f'?q={term}')
+    note_queries = [
+        sql for sql in queries
+        if 'FROM "notes_note"' in sql and 'COUNT(' not in sql.upper()
+    ]
+    assert note_queries
+    for sql in note_queries:
+        plan = explain(sql)
+        assert not any(
+            step.startswith('SCAN') and 'notes_note' in step
+            for step in plan
+        ), plan
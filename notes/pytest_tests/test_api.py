@@ -0,0 +1,327 @@
+import threading
+from http import HTTPStatus
+
+import pytest
+from django.db import connection, connections
+from django.shortcuts import reverse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from pytils.translit import slugify
+
+from notes.api import NoteBatchApi
+from notes.models import Note
+
+LIST_URL = reverse('api:list')
+BATCH_URL = reverse('api:batch')
+
+
+def detail_url(slug):
+    return reverse('api:detail', args=(slug,))
+
+
+@pytest.mark.django_db
+def test_1_anonymous_gets_401(client):
+    """
+    Тест 1. Анонимный пользователь получает 401 вместо редиректа.
+    """
+    response = client.get(LIST_URL)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_2_list_and_retrieve_own_notes(author_client, admin_client, note):
+    """
+    Тест 2. Список и заметка доступны только автору.
+    """
+    results = author_client.get(LIST_URL).json()['results']
+    assert [row['slug'] for row in results] == [note.slug]
+    assert 'text' not in results[0]
+    assert admin_client.get(LIST_URL).json()['results'] == []
+    assert author_client.get(detail_url(note.slug)).json()['text'] == (
+        note.text
+    )
+    response = admin_client.get(detail_url(note.slug))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_3_create_update_delete(author_client, author, note, form_data):
+    """
+    Тест 3. Создание, частичное изменение и удаление заметки
+    с правилами проверки формы NoteForm.
+    """
+    response = author_client.post(
+        LIST_URL, form_data, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['slug'] == form_data['slug']
+    response = author_client.post(
+        LIST_URL, form_data, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'slug' in response.json()['errors']
+    response = author_client.patch(
+        detail_url(note.slug), {'text': 'Изменено'},
+        content_type='application/json',
+    )
+    assert response.json()['text'] == 'Изменено'
+    assert response.json()['title'] == note.title
+    response = author_client.delete(detail_url(note.slug))
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert not Note.objects.filter(pk=note.pk).exists()
+
+
+def test_4_batch_is_set_based(author_client, author):
+    """
+    Тест 4. Пакет операций выполняется одной транзакцией,
+    число запросов не зависит от размера пакета.
+    """
+    notes = [
+        Note.objects.create(title=f'Заметка {i}', text='Текст', author=author)
+        for i in range(4)
+    ]
+
+    def run(size):
+        operations = [
+            {'op': 'create', 'data': {'title': 'Новая', 'text': 'Текст'}}
+            for _ in range(size)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = author_client.post(
+                BATCH_URL, operations, content_type='application/json'
+            )
+        assert response.status_code == HTTPStatus.OK
+        return response.json()['results'], len(context.captured_queries)
+
+    # Первый запрос кладёт сессию и пользователя в кеш.
+    run(1)
+    results, small = run(2)
+    results, large = run(20)
+    assert small == large
+    assert len({row['slug'] for row in results}) == 20
+    operations = [
+        {'op': 'update', 'slug': notes[0].slug, 'data': {'text': 'Новый'}},
+        {'op': 'delete', 'slug': notes[1].slug},
+        {'op': 'create', 'data': {
+            'title': 'Своя', 'text': 'Текст', 'slug': notes[1].slug
+        }},
+    ]
+    response = author_client.post(
+        BATCH_URL, operations, content_type='application/json'
+    )
+    results = response.json()['results']
+    assert results[0]['text'] == 'Новый'
+    assert results[1] == {'slug': notes[1].slug, 'deleted': True}
+    assert results[2]['slug'] == notes[1].slug
+
+
+def test_5_invalid_batch_changes_nothing(author_client, author, note):
+    """
+    Тест 5. Ошибка в любой операции пакета отменяет весь пакет,
+    ошибки возвращаются по номерам операций.
+    """
+    operations = [
+        {'op': 'create', 'data': {'title': 'Новая', 'text': 'Текст'}},
+        {'op': 'update', 'slug': note.slug, 'data': {'text': ''}},
+        {'op': 'delete', 'slug': 'missing'},
+        {'op': 'create', 'data': {'text': 'Текст', 'slug': note.slug}},
+        {'op': 'rename'},
+    ]
+    response = author_client.post(
+        BATCH_URL, operations, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert sorted(response.json()['errors']) == ['1', '2', '3', '4']
+    assert Note.objects.count() == 1
+    assert not Note.objects.filter(slug=slugify('Новая')).exists()
+
+
+@pytest.mark.parametrize('slug', ([], ['a'], {'a': 1}, 1, None))
+def test_6_slug_must_be_string(author_client, note, slug):
+    """
+    Тест 6. Slug операции, который не строка, возвращается как ошибка
+    в поле slug, а не приводит к ошибке сервера.
+    """
+    operations = [
+        {'op': 'update', 'slug': slug, 'data': {'text': 'Новый'}},
+        {'op': 'delete', 'slug': slug},
+    ]
+    response = author_client.post(
+        BATCH_URL, operations, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    errors = response.json()['errors']
+    assert sorted(errors) == ['0', '1']
+    assert all('slug' in error for error in errors.values())
+    assert Note.objects.filter(pk=note.pk, text=note.text).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('with_create', (False, True))
+def test_7_concurrent_deleting_batches(django_user_model, with_create):
+    """
+    Тест 7. Параллельные пакеты разных авторов, удаляющие свои заметки,
+    не падают на блокировке базы.
+    """
+    threads_count, batches, per_batch = 8, 5, 4
+    clients = []
+    for number in range(threads_count):
+        author = django_user_model.objects.create(username=f'Автор {number}')
+        Note.objects.bulk_create(
+            Note(title='Заметка', text='Текст', author=author,
+                 slug=f'note-{number}-{index}')
+            for index in range(batches * per_batch)
+        )
+        client = Client()
+        client.force_login(author)
+        clients.append((number, client))
+    barrier = threading.Barrier(threads_count)
+    statuses = []
+    errors = []
+
+    def delete_notes(number, client):
+        try:
+            barrier.wait()
+            for batch in range(batches):
+                operations = [
+                    {'op': 'delete',
+                     'slug': f'note-{number}-{batch * per_batch + index}'}
+                    for index in range(per_batch)
+                ]
+                if with_create:
+                    operations.append(
+                        {'op': 'create',
+                         'data': {'title': f'Новая {number}',
+                                  'text': 'Текст'}}
+                    )
+                statuses.append(client.post(
+                    BATCH_URL, operations, content_type='application/json'
+                ).status_code)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=delete_notes, args=client)
+        for client in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert set(statuses) == {HTTPStatus.OK}
+    assert Note.objects.filter(title='Заметка').count() == 0
+    expected = threads_count * batches if with_create else 0
+    assert Note.objects.count() == expected
+
+
+@pytest.fixture
+def slug_taken_after_check(monkeypatch, django_user_model):
+    """
+    Занимает slug операции с индексом 0 сразу после первой проверки
+    пакета, как параллельный запрос между проверкой и записью.
+    """
+    other = django_user_model.objects.create(username='Параллельный')
+    check_slugs = NoteBatchApi.check_slugs
+    calls = []
+
+    def check_and_take(view):
+        check_slugs(view)
+        calls.append(view)
+        if len(calls) == 1:
+            pending = (view.creates + view.updates)[0]
+            Note.objects.create(
+                title='Чужая', text='Текст', slug=pending.note.slug,
+                author=other,
+            )
+
+    monkeypatch.setattr(NoteBatchApi, 'check_slugs', check_and_take)
+    return calls
+
+
+def test_8_allocated_slug_conflict_is_retried(author_client, author,
+                                              slug_taken_after_check):
+    """
+    Тест 8. Если подобранный slug занял параллельный запрос,
+    пакет повторяется с новым slug вместо ответа 409.
+    """
+    operations = [
+        {'op': 'create', 'data': {'title': 'Пакет', 'text': 'Текст'}},
+        {'op': 'create', 'data': {'title': 'Пакет', 'text': 'Текст'}},
+    ]
+    response = author_client.post(
+        BATCH_URL, operations, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(slug_taken_after_check) == 2
+    slugs = [row['slug'] for row in response.json()['results']]
+    assert slugs[0] != slugs[1]
+    assert set(Note.objects.filter(author=author).values_list(
+        'slug', flat=True
+    )) == set(slugs)
+
+
+def test_9_explicit_slug_conflict_is_409(author_client, author,
+                                         slug_taken_after_check):
+    """
+    Тест 9. Slug, переданный клиентом и занятый параллельным запросом,
+    не повторяется: ответ 409, пакет не записан.
+    """
+    operations = [
+        {'op': 'create',
+         'data': {'title': 'Пакет', 'text': 'Текст', 'slug': 'moy-slug'}},
+        {'op': 'create', 'data': {'title': 'Пакет', 'text': 'Текст'}},
+    ]
+    response = author_client.post(
+        BATCH_URL, operations, content_type='application/json'
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert Note.objects.filter(author=author).count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_10_concurrent_batches_with_same_titles(django_user_model):
+    """
+    Тест 10. Параллельные пакеты с одинаковыми заголовками получают
+    свободные slug без ответа 409.
+    """
+    threads_count, batches, per_batch = 4, 3, 5
+    clients = []
+    for number in range(threads_count):
+        client = Client()
+        client.force_login(
+            django_user_model.objects.create(username=f'Автор {number}')
+        )
+        clients.append(client)
+    barrier = threading.Barrier(threads_count)
+    statuses = []
+    errors = []
+
+    def create_notes(client):
+        try:
+            barrier.wait()
+            for _ in range(batches):
+                operations = [
+                    {'op': 'create',
+                     'data': {'title': 'Пакет', 'text': 'Текст'}}
+                ] * per_batch
+                statuses.append(client.post(
+                    BATCH_URL, operations, content_type='application/json'
+                ).status_code)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=create_notes, args=(client,))
+        for client in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert set(statuses) == {HTTPStatus.OK}
+    expected = threads_count * batches * per_batch
+    assert Note.objects.values('slug').distinct().count() == expected
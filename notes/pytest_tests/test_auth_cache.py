@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from notes import auth
+
+LIST_URL = reverse('notes:list')
+PASSWORD = 'old-password'
+
+
+@pytest.fixture
+def user_client(auth_cache, author, client):
+    author.set_password(PASSWORD)
+    author.save()
+    client.login(username=author.username, password=PASSWORD)
+    return client
+
+
+def auth_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'django_session' in query['sql'] or 'auth_user' in query['sql']
+    ]
+
+
+def test_1_session_and_user_from_cache(author, user_client, note):
+    """
+    Тест 1. Начиная со второго запроса сессия и пользователь читаются
+    из кеша, а не из базы.
+    """
+    auth_queries(user_client, LIST_URL)
+    detail_url = reverse('notes:detail', args=(note.slug,))
+    for url in (LIST_URL, detail_url):
+        assert auth_queries(user_client, url) == []
+    assert auth.get_cache().get(auth.user_key(author.pk)) == author
+
+
+def test_2_password_change_ends_session(author, user_client):
+    """
+    Тест 2. После смены пароля кешированный пользователь сбрасывается,
+    и старая сессия больше не действует.
+    """
+    auth_queries(user_client, LIST_URL)
+    author.set_password('new-password')
+    author.save()
+    assert auth.get_cache().get(auth.user_key(author.pk)) is None
+    response = user_client.get(LIST_URL)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+def test_3_logout_forgets_user(author, user_client):
+    """
+    Тест 3. Выход из системы удаляет пользователя из кеша.
+    """
+    auth_queries(user_client, LIST_URL)
+    user_client.get(reverse('users:logout'))
+    assert auth.get_cache().get(auth.user_key(author.pk)) is None
+    assert user_client.get(LIST_URL).status_code == HTTPStatus.FOUND
+
+
+def test_4_session_deleted_elsewhere_ends_by_default(author_client):
+    """
+    Тест 4. По умолчанию с кешем locmem сессии читаются из базы:
+    сессия, удалённая выходом в другом процессе, сразу перестаёт
+    действовать.
+    """
+    assert author_client.get(LIST_URL).status_code == HTTPStatus.OK
+    Session.objects.all().delete()
+    assert author_client.get(LIST_URL).status_code == HTTPStatus.FOUND
@@ -0,0 +1,71 @@
+import json
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+
+from notes import fields
+from notes.models import Note
+
+LONG_TEXT = 'Строка журнала: запрос обработан.\n' * 200
+
+
+def stored_header(note):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT text FROM notes_note WHERE id = %s', [note.pk]
+        )
+        return bytes(cursor.fetchone()[0])[0]
+
+
+@pytest.mark.parametrize(
+    'method, text, header',
+    (
+        ('zlib', 'Короткий текст', fields.RAW),
+        ('zlib', LONG_TEXT, fields.ZLIB),
+        ('lzma', LONG_TEXT, fields.LZMA),
+        ('none', LONG_TEXT, fields.RAW),
+    ),
+)
+def test_1_text_round_trip(author, settings, method, text, header):
+    """
+    Тест 1. Короткий текст хранится без сжатия, длинный — сжатым
+    выбранным методом; из базы читается исходный текст.
+    """
+    settings.NOTES_TEXT_COMPRESSION = method
+    note = Note.objects.create(title='Журнал', text=text, author=author)
+    assert stored_header(note) == header
+    assert Note.objects.get(pk=note.pk).text == text
+    assert Note.objects.values_list('text', flat=True).get(
+        pk=note.pk
+    ) == text
+
+
+def test_2_decompression_is_lazy(author):
+    """
+    Тест 2. Текст распаковывается при первом обращении и только один раз.
+    """
+    note = Note.objects.create(title='Журнал', text=LONG_TEXT, author=author)
+    decompress = mock.Mock(wraps=fields.DECOMPRESSORS[fields.ZLIB])
+    with mock.patch.dict(fields.DECOMPRESSORS, {fields.ZLIB: decompress}):
+        note = Note.objects.get(pk=note.pk)
+        assert decompress.call_count == 0
+        assert note.text.startswith('Строка журнала')
+        assert note.text == LONG_TEXT
+        assert decompress.call_count == 1
+
+
+def test_3_compressed_text_in_responses(author, author_client):
+    """
+    Тест 3. Сжатый текст выводится на странице заметки, в API
+    и в выгрузке.
+    """
+    note = Note.objects.create(title='Журнал', text=LONG_TEXT, author=author)
+    response = author_client.get(reverse('notes:detail', args=(note.slug,)))
+    assert 'Строка журнала' in response.content.decode()
+    response = author_client.get(reverse('api:detail', args=(note.slug,)))
+    assert response.json()['text'] == LONG_TEXT
+    response = author_client.get(reverse('notes:export', args=('ndjson',)))
+    row = json.loads(b''.join(response.streaming_content))
+    assert row['text'] == LONG_TEXT
@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from notes.models import Note
+
+LIST_URL = reverse('notes:list')
+
+
+@pytest.fixture
+def detail_url(note):
+    return reverse('notes:detail', args=(note.slug,))
+
+
+def revalidate(client, url):
+    """Повторный запрос с валидаторами из первого ответа."""
+    first = client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(
+            url,
+            HTTP_IF_NONE_MATCH=first['ETag'],
+            HTTP_IF_MODIFIED_SINCE=first['Last-Modified'],
+        )
+    note_queries = [
+        query['sql'] for query in context.captured_queries
+        if 'notes_note' in query['sql']
+    ]
+    return response, note_queries
+
+
+@pytest.mark.parametrize(
+    'url',
+    (LIST_URL, pytest.lazy_fixture('detail_url')),
+)
+def test_1_not_modified(author_client, url):
+    """
+    Тест 1. Неизменённая страница отдаётся как 304 одним запросом
+    к таблице заметок и без отрисовки шаблона.
+    """
+    response, note_queries = revalidate(author_client, url)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert response.templates == []
+    assert len(note_queries) == 1
+    assert 'ETag' in response
+    assert 'private' in response['Cache-Control']
+
+
+@pytest.mark.parametrize(
+    'url',
+    (LIST_URL, pytest.lazy_fixture('detail_url')),
+)
+def test_2_modified_after_edit(author_client, note, url):
+    """
+    Тест 2. После изменения заметки страница отдаётся заново.
+    """
+    first = author_client.get(url)
+    note.text = 'Другой текст'
+    note.save()
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_3_list_modified_after_delete(author, author_client, note):
+    """
+    Тест 3. Удаление заметки меняет ETag и Last-Modified списка,
+    хотя максимальное время изменения остальных заметок прежнее.
+    """
+    Note.objects.create(title='Вторая', text='Текст', author=author)
+    first = author_client.get(LIST_URL)
+    note.delete()
+    response = author_client.get(LIST_URL, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != first['ETag']
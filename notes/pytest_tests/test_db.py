@@ -0,0 +1,21 @@
+import pytest
+from django.db import connection
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'pragma, expected',
+    (
+        ('journal_mode', 'wal'),
+        ('synchronous', 1),
+        ('busy_timeout', 5000),
+        ('temp_store', 2),
+    ),
+)
+def test_1_sqlite_pragmas_applied(pragma, expected):
+    """
+    Тест 1. Настройки SQLITE_PRAGMAS применяются к соединению.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {pragma}')
+        assert cursor.fetchone()[0] == expected
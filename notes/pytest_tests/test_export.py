@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+from django.shortcuts import reverse
+
+from notes.models import Note
+
+
+def download(client, fmt):
+    response = client.get(reverse('notes:export', args=(fmt,)))
+    assert response.streaming
+    return b''.join(response.streaming_content)
+
+
+@pytest.fixture
+def other_note(admin_user):
+    return Note.objects.create(
+        title='Чужая', text='Чужой текст', slug='other', author=admin_user
+    )
+
+
+def test_1_ndjson(author_client, note, other_note):
+    """
+    Тест 1. NDJSON содержит по строке на каждую заметку автора.
+    """
+    lines = download(author_client, 'ndjson').decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{
+        'id': note.id, 'title': note.title,
+        'slug': note.slug, 'text': note.text,
+    }]
+
+
+def test_2_csv(author_client, note, other_note):
+    """
+    Тест 2. CSV содержит заголовок и строки только с заметками автора.
+    """
+    content = download(author_client, 'csv').decode()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [row['slug'] for row in rows] == [note.slug]
+
+
+def test_3_zip(author_client, note, other_note):
+    """
+    Тест 3. ZIP-архив содержит Markdown-файл для каждой заметки автора.
+    """
+    content = download(author_client, 'zip')
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert archive.namelist() == [f'{note.slug}.md']
+        text = archive.read(f'{note.slug}.md').decode()
+    assert text == f'# {note.title}\n\n{note.text}\n'
+
+
+def test_4_unknown_format(author_client):
+    """
+    Тест 4. Для неизвестного формата возвращается 404.
+    """
+    response = author_client.get(reverse('notes:export', args=('xml',)))
+    assert response.status_code == 404
@@ -0,0 +1,115 @@
+from http import HTTPStatus
+
+import pytest
+from django.shortcuts import reverse
+
+from notes import history
+from notes.models import Note, NoteRevision
+
+LINES = [f'Строка номер {i}\n' for i in range(500)]
+
+
+def edit(note, number):
+    """Меняет одну строку текста заметки и сохраняет её."""
+    lines = str(note.text).splitlines(keepends=True)
+    lines[number % len(lines)] = f'Правка {number}\n'
+    note.text = ''.join(lines)
+    note.save()
+    return note.text
+
+
+@pytest.fixture
+def long_note(author):
+    return Note.objects.create(
+        title='Длинная', text=''.join(LINES), author=author
+    )
+
+
+def test_1_every_version_is_restored(settings, long_note):
+    """
+    Тест 1. Любая версия восстанавливается по снимку и разницам,
+    снимки сохраняются не реже интервала.
+    """
+    settings.NOTES_HISTORY_SNAPSHOT_INTERVAL = 4
+    texts = [long_note.text]
+    for number in range(10):
+        texts.append(edit(long_note, number))
+    revisions = list(long_note.revisions.order_by('number'))
+    assert [revision.number for revision in revisions] == list(range(1, 12))
+    assert [r.number for r in revisions if r.is_snapshot] == [1, 5, 9]
+    for revision, text in zip(revisions, texts):
+        assert history.revision_text(revision) == text
+
+
+def test_2_delta_is_small(long_note):
+    """
+    Тест 2. Правка одной строки занимает меньше места, чем текст.
+    """
+    edit(long_note, 1)
+    delta = long_note.revisions.get(number=2)
+    assert not delta.is_snapshot
+    assert len(delta.data) * 20 < len(long_note.text.encode())
+
+
+def test_3_change_outside_save_is_kept(long_note):
+    """
+    Тест 3. Изменение в обход save() сохраняется снимком
+    перед следующей правкой.
+    """
+    edit(long_note, 1)
+    Note.objects.filter(pk=long_note.pk).update(text='Вне истории\n')
+    long_note.refresh_from_db()
+    long_note.text = 'После\n'
+    long_note.save()
+    revisions = long_note.revisions.order_by('number')
+    assert [history.revision_text(revision) for revision in revisions][
+        -2:] == ['Вне истории\n', 'После\n']
+
+
+def test_4_history_and_restore(author_client, long_note):
+    """
+    Тест 4. Страницы истории и восстановление версии.
+    """
+    original = long_note.text
+    edit(long_note, 1)
+    slug = long_note.slug
+    response = author_client.get(reverse('notes:history', args=(slug,)))
+    assert [r.number for r in response.context['revisions']] == [2, 1]
+    response = author_client.get(reverse('notes:revision', args=(slug, 1)))
+    assert response.context['revision_text'] == original
+    response = author_client.post(reverse('notes:restore', args=(slug, 1)))
+    assert response.status_code == HTTPStatus.FOUND
+    long_note.refresh_from_db()
+    assert long_note.text == original
+    assert long_note.revisions.count() == 3
+
+
+@pytest.mark.parametrize('name, method, args', (
+    ('notes:history', 'get', ()),
+    ('notes:revision', 'get', (1,)),
+    ('notes:restore', 'post', (1,)),
+))
+def test_5_other_users_history_is_hidden(
+        admin_client, long_note, name, method, args):
+    """
+    Тест 5. Чужая история недоступна: ответ 404.
+    """
+    edit(long_note, 1)
+    url = reverse(name, args=(long_note.slug, *args))
+    response = getattr(admin_client, method)(url)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_6_batch_update_records_revisions(author_client, long_note):
+    """
+    Тест 6. Изменения через пакетный API тоже попадают в историю.
+    """
+    author_client.post(
+        reverse('api:batch'),
+        [{'op': 'update', 'slug': long_note.slug, 'data': {'text': 'Новый'}}],
+        content_type='application/json',
+    )
+    revisions = NoteRevision.objects.filter(note=long_note).order_by('number')
+    assert [history.revision_text(r) for r in revisions] == [
+        ''.join(LINES), 'Новый'
+    ]
@@ -0,0 +1,87 @@
+import json
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+from pytils.translit import slugify
+
+from notes import search
+from notes.importers import import_notes, read_csv, read_ndjson
+from notes.models import Note
+
+NDJSON = '\n'.join((
+    json.dumps({'title': 'Заголовок', 'text': 'Первая'}),
+    'не json',
+    json.dumps({'title': 'Без текста'}),
+    json.dumps({'title': 'Заголовок', 'text': 'Вторая'}),
+    json.dumps({'title': 'Свой', 'text': 'Третья', 'slug': 'own'}),
+))
+
+
+def test_1_import_reports_errors_and_resolves_slugs(author, note):
+    """
+    Тест 1. Ошибочные строки попадают в отчёт и не мешают импорту,
+    совпадающие slug получают числовой суффикс,
+    новые заметки попадают в поисковый индекс.
+    """
+    note.slug = slugify(note.title)
+    note.save()
+    result = import_notes(read_ndjson(NDJSON.splitlines()), author)
+    assert result.created == 3
+    assert [line for line, _ in result.errors] == [2, 3]
+    slugs = Note.objects.exclude(pk=note.pk).values_list('slug', flat=True)
+    assert sorted(slugs) == sorted([
+        f'{note.slug}-2', f'{note.slug}-3', 'own'
+    ])
+    assert search.search_note_ids(author.pk, 'третья') == [
+        Note.objects.get(slug='own').pk
+    ]
+
+
+def test_2_one_slug_query_per_batch(author):
+    """
+    Тест 2. На пакет заметок выполняется один запрос проверки slug
+    и ни одного запроса exists().
+    """
+    lines = ['title,text'] + [f'Заметка {i},Текст' for i in range(50)]
+    with CaptureQueriesContext(connection) as context:
+        result = import_notes(read_csv(lines), author, batch_size=25)
+    assert result.created == 50
+    slug_queries = [
+        query['sql'] for query in context.captured_queries
+        if 'VALUES' in query['sql'] and 'SELECT DISTINCT' in query['sql']
+    ]
+    assert len(slug_queries) == 2
+    assert not any(
+        'LIMIT 1' in query['sql'] for query in context.captured_queries
+    )
+
+
+def test_3_upload(author_client, author):
+    """
+    Тест 3. Заметки импортируются из загруженного файла.
+    """
+    upload = SimpleUploadedFile('notes.ndjson', NDJSON.encode())
+    response = author_client.post(
+        reverse('notes:import'), {'file': upload, 'format': 'ndjson'}
+    )
+    assert response.context['result'].created == 3
+    assert Note.objects.filter(author=author).count() == 3
+
+
+def test_4_management_command(tmp_path, author):
+    """
+    Тест 4. Команда import_notes импортирует заметки из файла.
+    """
+    path = tmp_path / 'notes.csv'
+    path.write_text('title,text,slug\nЗаголовок,Текст,\n', encoding='utf-8')
+    out = StringIO()
+    call_command(
+        'import_notes', str(path), user=author.username,
+        stdout=out, stderr=StringIO(),
+    )
+    assert 'Импортировано заметок: 1' in out.getvalue()
+    assert Note.objects.get().slug == slugify('Заголовок')
@@ -0,0 +1,244 @@
+import json
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import Client
+from django.utils import timezone
+
+from notes import jobs
+from notes.export import EXPORTERS
+from notes.models import Job, Note
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def job_dir(settings, tmp_path):
+    settings.NOTES_JOB_DIR = str(tmp_path)
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    """Обработчик, который падает дважды, а на третий раз выполняется."""
+    calls = []
+
+    def run(job):
+        calls.append(job.attempts)
+        if len(calls) < 3:
+            raise RuntimeError('Временная ошибка')
+        return {'calls': len(calls)}
+
+    monkeypatch.setitem(jobs.HANDLERS, 'flaky', (run, 3))
+    return calls
+
+
+def run_next():
+    job = jobs.claim('test')
+    assert job is not None
+    jobs.execute(job)
+    job.refresh_from_db()
+    return job
+
+
+def test_1_export_job(author_client, author, note):
+    """
+    Тест 1. Выгрузка ставится в очередь ответом 202,
+    а после выполнения файл доступен по ссылке из статуса.
+    """
+    response = author_client.post(reverse('api:export_job', args=('ndjson',)))
+    assert response.status_code == HTTPStatus.ACCEPTED
+    status_url = response['Location']
+    assert author_client.get(status_url).json()['status'] == Job.QUEUED
+    run_next()
+    status = author_client.get(status_url).json()
+    assert status['status'] == Job.DONE
+    response = author_client.get(status['download'])
+    assert response.status_code == HTTPStatus.OK
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line)['slug'] for line in lines] == [note.slug]
+
+
+def test_2_unknown_export_format(author_client):
+    """Тест 2. Неизвестный формат выгрузки не ставится в очередь."""
+    response = author_client.post(reverse('api:export_job', args=('xml',)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert not Job.objects.exists()
+
+
+def test_3_failed_job_is_retried_with_backoff(flaky, settings):
+    """
+    Тест 3. Упавшая задача возвращается в очередь с растущей задержкой
+    и выполняется после повторов; ошибка попытки сохраняется.
+    """
+    settings.NOTES_JOB_BACKOFF = 10
+    job = jobs.enqueue('flaky')
+    delays = []
+    for _ in range(2):
+        job = run_next()
+        assert job.status == Job.QUEUED
+        assert 'Временная ошибка' in job.error
+        delays.append((job.run_at - timezone.now()).total_seconds())
+        assert jobs.claim('test') is None
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+    assert 4 < delays[0] <= 10 < delays[1] <= 20
+    job = run_next()
+    assert (job.status, job.result) == (Job.DONE, {'calls': 3})
+    assert job.attempts == 3
+    assert flaky == [1, 2, 3]
+
+
+def test_4_job_fails_after_max_attempts(flaky):
+    """Тест 4. После max_attempts неудачных попыток задача — failed."""
+    job = jobs.enqueue('flaky')
+    Job.objects.filter(pk=job.pk).update(max_attempts=2)
+    run_next()
+    Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+    job = run_next()
+    assert job.status == Job.FAILED
+    assert job.finished_at is not None
+    assert jobs.claim('test') is None
+
+
+def test_5_abandoned_job_is_reclaimed(settings, author):
+    """
+    Тест 5. Задачу, воркер которой не завершил её за NOTES_JOB_TIMEOUT,
+    забирает другой воркер, а итог прежнего воркера не записывается.
+    """
+    job = jobs.enqueue('export', {'format': 'csv'}, user=author)
+    lost = jobs.claim('lost')
+    assert jobs.claim('other') is None
+    Job.objects.filter(pk=job.pk).update(
+        locked_at=timezone.now() - timedelta(
+            seconds=settings.NOTES_JOB_TIMEOUT + 1
+        )
+    )
+    job = jobs.claim('other')
+    assert (job.locked_by, job.attempts) == ('other', 2)
+    assert not jobs.finish(lost, status=Job.DONE)
+    assert jobs.execute(job)
+
+
+def test_6_foreign_job_is_hidden(author_client, django_user_model):
+    """Тест 6. Статус и файл чужой задачи недоступны."""
+    other = django_user_model.objects.create(username='Другой')
+    job = jobs.enqueue('export', {'format': 'csv'}, user=other)
+    for name in ('api:job', 'api:job_download'):
+        response = author_client.get(reverse(name, args=(job.pk,)))
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_7_import_job(author_client, author, tmp_path):
+    """
+    Тест 7. Импорт выполняется в фоне, отчёт об ошибках попадает
+    в результат задачи, загруженный файл удаляется.
+    """
+    upload = SimpleUploadedFile('notes.ndjson', '\n'.join((
+        json.dumps({'title': 'Первая', 'text': 'Текст'}),
+        'не json',
+    )).encode())
+    response = author_client.post(
+        reverse('api:import_job'), {'file': upload, 'format': 'ndjson'}
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED
+    job = run_next()
+    assert job.status == Job.DONE
+    assert (job.result['created'], job.result['error_count']) == (1, 1)
+    assert Note.objects.filter(author=author, title='Первая').exists()
+    assert not list((tmp_path / 'uploads').iterdir())
+
+
+def test_8_delete_account_job(author_client, author, note):
+    """
+    Тест 8. Аккаунт сразу блокируется и выходит из системы,
+    а пользователь с заметками удаляется фоновой задачей.
+    """
+    response = author_client.post(reverse('api:delete_account'))
+    assert response.status_code == HTTPStatus.ACCEPTED
+    author.refresh_from_db()
+    assert not author.is_active
+    assert author_client.get(reverse('api:list')).status_code == (
+        HTTPStatus.UNAUTHORIZED
+    )
+    job = run_next()
+    assert job.status == Job.DONE
+    assert not Note.objects.filter(pk=note.pk).exists()
+    assert not type(author).objects.filter(pk=author.pk).exists()
+
+
+def test_9_reindex_in_background():
+    """Тест 9. Перестройку поискового индекса можно поставить в очередь."""
+    call_command('rebuild_search_index', '--background')
+    job = run_next()
+    assert (job.kind, job.status) == ('reindex', Job.DONE)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_10_run_workers_processes_queue(author):
+    """
+    Тест 10. Пул потоков выполняет каждую задачу очереди ровно один раз.
+    """
+    for fmt in ('csv', 'ndjson', 'zip') * 4:
+        jobs.enqueue('export', {'format': fmt}, user=author)
+    call_command('run_workers', '--workers', '4', '--burst')
+    assert list(Job.objects.values_list('status', 'attempts').distinct()) == [
+        (Job.DONE, 1)
+    ]
+    client = Client()
+    client.force_login(author)
+    job = Job.objects.last()
+    assert client.get(
+        reverse('api:job_download', args=(job.pk,))
+    ).status_code == HTTPStatus.OK
+
+
+@pytest.mark.django_db(transaction=True)
+def test_11_running_job_keeps_its_lease(settings, monkeypatch):
+    """
+    Тест 11. Пока обработчик работает дольше NOTES_JOB_TIMEOUT,
+    аренда задачи продлевается и другой воркер её не получает.
+    """
+    settings.NOTES_JOB_TIMEOUT = 0.5
+    settings.NOTES_JOB_HEARTBEAT = 0.1
+    claimed = []
+
+    def slow(job):
+        time.sleep(1)
+        claimed.append(jobs.claim('other'))
+        return {}
+
+    monkeypatch.setitem(jobs.HANDLERS, 'slow', (slow, None))
+    job = jobs.enqueue('slow')
+    assert jobs.execute(jobs.claim('test'))
+    assert claimed == [None]
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.DONE, 1)
+
+
+def test_12_attempts_write_separate_files(settings, author, monkeypatch):
+    """
+    Тест 12. Каждая попытка выгрузки пишет свой временный файл,
+    а упавшая попытка его удаляет.
+    """
+    def broken(notes):
+        yield b'id,slug\n'
+        raise RuntimeError('Сбой выгрузки')
+
+    monkeypatch.setitem(EXPORTERS, 'csv', (broken, 'text/csv', 'csv'))
+    job = jobs.enqueue('export', {'format': 'csv'}, user=author)
+    first = jobs.claim('first')
+    Job.objects.filter(pk=job.pk).update(
+        locked_at=timezone.now() - timedelta(
+            seconds=settings.NOTES_JOB_TIMEOUT + 1
+        )
+    )
+    second = jobs.claim('second')
+    assert jobs.partial_path(first, 'notes.csv') != jobs.partial_path(
+        second, 'notes.csv'
+    )
+    assert not jobs.execute(second)
+    assert list(jobs.job_dir(job).iterdir()) == []
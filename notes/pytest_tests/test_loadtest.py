@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from notes import loadtest
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def fast_hasher(settings):
+    settings.PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher'
+    ]
+
+
+def run(tmp_path, *args):
+    output = tmp_path / 'result.json'
+    call_command('loadtest', *args, '--output', str(output),
+                 stdout=io.StringIO())
+    return json.loads(output.read_text(encoding='utf-8'))
+
+
+def test_1_mixed_traffic_without_errors(tmp_path, django_user_model):
+    """
+    Тест 1. Потоки выполняют заданное число запросов всех маршрутов
+    от имени синтетических пользователей без ошибок и блокировок,
+    а отчёт содержит перцентили задержек по каждому маршруту.
+    """
+    result = run(
+        tmp_path, '--users', '4', '--notes-per-user', '5', '--workers', '2',
+        '--requests', '120', '--mix',
+        'list=3,detail=3,create=2,edit=2,delete=1,login=1',
+    )
+    assert result['total']['requests'] == 120
+    assert result['total']['errors'] == 0
+    assert result['total']['locked_errors'] == 0
+    assert set(result['routes']) == set(loadtest.EXPECTED_STATUS)
+    for row in result['routes'].values():
+        assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms']
+        assert row['throughput_rps'] > 0
+    assert django_user_model.objects.filter(
+        username__startswith='loadtest-'
+    ).count() == 4
+    created = result['routes']['create']['requests']
+    deleted = result['routes']['delete']['requests']
+    assert Note.objects.count() == 4 * 5 + created - deleted
+
+
+def test_2_users_and_notes_are_reused(tmp_path):
+    """
+    Тест 2. Повторный запуск не создаёт пользователей и заметки заново.
+    """
+    for _ in range(2):
+        run(
+            tmp_path, '--users', '2', '--notes-per-user', '3',
+            '--workers', '1', '--requests', '4', '--mix', 'list=1',
+        )
+    assert Note.objects.count() == 6
+
+
+def test_3_mix_is_validated():
+    """Тест 3. Неизвестный маршрут в смеси — ошибка."""
+    assert loadtest.parse_mix('list=1, detail=2') == {
+        'list': 1, 'detail': 2
+    }
+    with pytest.raises(ValueError):
+        loadtest.parse_mix('list=1,search=1')
@@ -0,0 +1,83 @@
+import re
+
+import pytest
+from django.shortcuts import reverse
+
+from notes.metrics import get_registry
+
+LIST_URL = reverse('notes:list')
+METRICS_URL = reverse('notes:metrics')
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(settings):
+    settings.NOTES_PAGE_CACHE_TIMEOUT = 0
+    get_registry().reset()
+
+
+def server_timing(response):
+    return dict(
+        re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing'])
+    )
+
+
+def test_1_server_timing_header(author_client, note):
+    """
+    Тест 1. Ответ содержит Server-Timing с числом SQL-запросов и временем
+    базы, представления, отрисовки и всего запроса.
+    """
+    response = author_client.get(LIST_URL)
+    timing = server_timing(response)
+    assert set(timing) == {'db', 'view', 'render', 'middleware', 'total'}
+    assert float(timing['render']) > 0
+    assert float(timing['total']) >= float(timing['view'])
+    queries = re.search(r'"(\d+) queries"', response['Server-Timing'])
+    assert int(queries.group(1)) > 0
+
+
+def test_2_metrics_histogram(admin_client, author_client, note):
+    """
+    Тест 2. /metrics/ отдаёт гистограмму по представлениям
+    в формате Prometheus.
+    """
+    for _ in range(3):
+        author_client.get(LIST_URL)
+    response = admin_client.get(METRICS_URL)
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.content.decode()
+    labels = 'view="notes:list",method="GET"'
+    assert f'yanote_request_duration_seconds_count{{{labels}}} 3' in body
+    assert (
+        f'yanote_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3'
+        in body
+    )
+    assert f'yanote_responses_total{{{labels},status="200"}} 3' in body
+    assert f'yanote_db_queries_total{{{labels}}}' in body
+
+
+@pytest.mark.parametrize(
+    'header, expected_status',
+    (
+        ('Bearer secret', 200),
+        ('Bearer wrong', 302),
+        ('', 302),
+    ),
+)
+def test_3_metrics_access(client, settings, header, expected_status):
+    """
+    Тест 3. Без входа персонала /metrics/ доступен только по токену.
+    """
+    settings.NOTES_METRICS_TOKEN = 'secret'
+    response = client.get(METRICS_URL, HTTP_AUTHORIZATION=header)
+    assert response.status_code == expected_status
+
+
+def test_4_disabled_middleware_is_skipped(client, settings):
+    """
+    Тест 4. При NOTES_METRICS_ENABLED = False middleware не подключается.
+    """
+    settings.NOTES_METRICS_ENABLED = False
+    client.handler.load_middleware()
+    response = client.get(reverse('notes:home'))
+    assert 'Server-Timing' not in response
+    assert get_registry().views == {}
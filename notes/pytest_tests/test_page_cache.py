@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from notes import page_cache, rendering
+from notes.models import Note
+
+LIST_URL = reverse('notes:list')
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    page_cache.reset_stats()
+
+
+def get_page(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    note_queries = [
+        query for query in context.captured_queries
+        if 'notes_note' in query['sql']
+    ]
+    return response.content.decode(), len(note_queries)
+
+
+def test_1_second_visit_is_served_from_cache(author_client, note):
+    """
+    Тест 1. При повторном просмотре списка и заметки остаётся только
+    проверка времени изменения, счётчики учитывают попадания и промахи.
+    """
+    detail_url = reverse('notes:detail', args=(note.slug,))
+    # HTML текста отрисован заранее, как после prerender_notes.
+    rendering.prerender([note], note._state.db)
+    for url in (LIST_URL, detail_url):
+        first, first_queries = get_page(author_client, url)
+        second, second_queries = get_page(author_client, url)
+        assert first_queries == 2
+        assert second_queries == 1
+        assert first == second
+    assert page_cache.stats() == {
+        'list': {'hit': 1, 'miss': 1},
+        'detail': {'hit': 1, 'miss': 1},
+    }
+
+
+def test_2_changes_reset_cache(
+        author, author_client, note, django_capture_on_commit_callbacks
+):
+    """
+    Тест 2. Создание, изменение и удаление заметки сбрасывают
+    кешированные страницы автора.
+    """
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.get(LIST_URL)
+        new_note = Note.objects.create(
+            title='Новая', text='Текст', author=author
+        )
+        assert 'Новая' in get_page(author_client, LIST_URL)[0]
+        new_note.title = 'Изменённая'
+        new_note.save()
+        assert 'Изменённая' in get_page(author_client, LIST_URL)[0]
+        new_note.delete()
+        assert 'Изменённая' not in get_page(author_client, LIST_URL)[0]
+
+
+def test_3_cache_is_per_user(author_client, admin_client, note):
+    """
+    Тест 3. Страница одного пользователя не отдаётся другому.
+    """
+    author_client.get(LIST_URL)
+    content = admin_client.get(LIST_URL).content.decode()
+    assert note.title not in content
+
+
+def test_4_stats_for_staff_only(author_client, admin_client):
+    """
+    Тест 4. Счётчики кеша доступны только персоналу.
+    """
+    url = reverse('notes:cache_stats')
+    assert author_client.get(url).status_code == 403
+    assert admin_client.get(url).status_code == 200
@@ -0,0 +1,126 @@
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from notes.models import Note
+
+PAGE_SIZE = 5
+
+
+@pytest.fixture(autouse=True)
+def disable_page_cache(settings):
+    """Заметки создаются через bulk_create, минуя сброс кеша страниц."""
+    settings.NOTES_PAGE_CACHE_TIMEOUT = 0
+
+
+def create_notes(author, count):
+    start = Note.objects.count()
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {i}', text='Текст', slug=f'note-{i}',
+             author=author)
+        for i in range(start, start + count)
+    )
+
+
+def get_note_query(client, url):
+    """Возвращает SQL-запросы страницы и запрос выборки заметок."""
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    queries = [query['sql'] for query in context.captured_queries]
+    note_queries = [
+        sql for sql in queries
+        if 'FROM "notes_note"' in sql and 'MAX(' not in sql
+    ]
+    assert len(note_queries) == 1
+    return queries, note_queries[0]
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(NOTES_PAGE_SIZE=PAGE_SIZE)
+def test_1_pages_follow_cursor(author, author_client):
+    """
+    Тест 1. Страницы выдаются по курсору ?after= и ?before=
+    и вместе покрывают все заметки пользователя без повторов.
+    """
+    create_notes(author, PAGE_SIZE * 2 + 1)
+    url = reverse('notes:list')
+    seen = []
+    response = author_client.get(url)
+    while True:
+        page = response.context['page_obj']
+        seen.extend(note.pk for note in page.object_list)
+        if not page.has_next:
+            break
+        response = author_client.get(url, {'after': page.next_cursor})
+    assert seen == list(
+        Note.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    response = author_client.get(url, {'before': page.previous_cursor})
+    previous = response.context['page_obj']
+    assert len(previous.object_list) == PAGE_SIZE
+    assert previous.object_list[-1].pk < page.object_list[0].pk
+
+
+def test_2_page_size_param_is_limited(author, author_client):
+    """
+    Тест 2. Размер страницы задаётся параметром ?size=
+    и не превышает NOTES_MAX_PAGE_SIZE.
+    """
+    create_notes(author, 4)
+    url = reverse('notes:list')
+    response = author_client.get(url, {'size': 3})
+    assert len(response.context['object_list']) == 3
+    with override_settings(NOTES_MAX_PAGE_SIZE=2):
+        response = author_client.get(url, {'size': 3})
+    assert len(response.context['object_list']) == 2
+
+
+@override_settings(NOTES_PAGE_SIZE=PAGE_SIZE)
+@pytest.mark.parametrize('params', ('', '?after=3', '?before=50'))
+def test_3_queries_do_not_grow_with_notes(author, author_client, params):
+    """
+    Тест 3. Число запросов и план выборки заметок не зависят от количества
+    заметок пользователя; OFFSET и COUNT(*) не используются.
+    """
+    url = reverse('notes:list') + params
+    create_notes(author, 10)
+    # Первый запрос кладёт сессию и пользователя в кеш.
+    author_client.get(url)
+    small_queries, small_sql = get_note_query(author_client, url)
+    create_notes(author, 500)
+    large_queries, large_sql = get_note_query(author_client, url)
+    assert len(small_queries) == len(large_queries)
+    assert 'OFFSET' not in large_sql.upper()
+    assert 'COUNT(' not in large_sql.upper()
+    small_plan, large_plan = explain(small_sql), explain(large_sql)
+    assert small_plan == large_plan
+    assert any('SEARCH' in step and 'INDEX' in step for step in large_plan)
+
+
+@override_settings(NOTES_PAGE_SIZE=PAGE_SIZE)
+@pytest.mark.parametrize('direction', ('before', 'after'))
+def test_4_empty_page_has_no_links(author, author_client, direction):
+    """
+    Тест 4. Пустая страница ?before=1 или ?after= за концом списка
+    не считается страницей с соседями и не выводит ссылок с курсором
+    None, ни в HTML, ни в API.
+    """
+    create_notes(author, PAGE_SIZE + 1)
+    last = Note.objects.order_by('pk').last().pk
+    cursor = 1 if direction == 'before' else last
+    response = author_client.get(reverse('notes:list'), {direction: cursor})
+    page = response.context['page_obj']
+    assert page.object_list == []
+    assert not page.has_next and not page.has_previous
+    assert not response.context['is_paginated']
+    assert 'None' not in response.content.decode()
+    data = author_client.get(
+        reverse('api:list'), {direction: cursor}
+    ).json()
+    assert data == {'results': [], 'next': None, 'previous': None}
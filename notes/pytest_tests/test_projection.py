@@ -0,0 +1,58 @@
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+TEXT_COLUMN = '"notes_note"."text"'
+
+
+@pytest.fixture(autouse=True)
+def no_page_cache(settings):
+    settings.NOTES_PAGE_CACHE_TIMEOUT = 0
+
+
+def note_selects(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "notes_note"' in query['sql']
+        and 'MAX(' not in query['sql']
+    ]
+
+
+@pytest.mark.parametrize(
+    'name, params',
+    (('notes:list', ''), ('notes:search', '?q=Заголовок')),
+)
+def test_1_lists_skip_text(author_client, note, name, params):
+    """
+    Тест 1. Список и поиск не читают текст заметок.
+    """
+    queries = note_selects(author_client, reverse(name) + params)
+    assert queries
+    assert all(TEXT_COLUMN not in sql for sql in queries)
+
+
+def test_2_detail_reads_text(author_client, note):
+    """
+    Тест 2. Страница заметки читает текст.
+    """
+    queries = note_selects(
+        author_client, reverse('notes:detail', args=(note.slug,))
+    )
+    assert any(TEXT_COLUMN in sql for sql in queries)
+
+
+def test_3_admin_changelist_skips_text(admin_client, note):
+    """
+    Тест 3. Список заметок в админке не читает текст.
+    """
+    queries = note_selects(
+        admin_client, reverse('admin:notes_note_changelist')
+    )
+    rows = [sql for sql in queries if 'COUNT(' not in sql]
+    assert rows
+    assert all(TEXT_COLUMN not in sql for sql in rows)
@@ -0,0 +1,108 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.shortcuts import reverse
+
+from notes import rendering
+from notes.models import Note, NoteRendering
+
+pytestmark = pytest.mark.django_db
+
+MARKDOWN = '\n'.join((
+    '# Заголовок',
+    '',
+    '* первый пункт',
+    '* [ссылка](https://example.com)',
+    '',
+    '<script>alert(1)</script>',
+    '[опасная](javascript:alert(1))',
+    '<img src="x.png" onerror="alert(1)">',
+))
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Считает вызовы разбора Markdown."""
+    calls = []
+    render = rendering.render_markdown
+
+    def counted(text):
+        calls.append(text)
+        return render(text)
+
+    monkeypatch.setattr(rendering, 'render_markdown', counted)
+    return calls
+
+
+def load(note):
+    return Note.objects.select_related('rendering').get(pk=note.pk)
+
+
+def test_1_markdown_is_sanitised():
+    """
+    Тест 1. Разметка превращается в HTML, а скрипты, обработчики
+    событий и ссылки javascript: вырезаются.
+    """
+    html = rendering.render_markdown(MARKDOWN)
+    assert '<h1>Заголовок</h1>' in html
+    assert '<li>первый пункт</li>' in html
+    assert 'href="https://example.com"' in html
+    assert '<script' not in html
+    assert 'javascript:' not in html
+    assert 'onerror' not in html
+    assert '<img src="x.png">' in html
+
+
+def test_2_detail_shows_html(author_client, note):
+    """Тест 2. Страница заметки показывает текст, отрисованный из Markdown."""
+    note.text = MARKDOWN
+    note.save()
+    response = author_client.get(reverse('notes:detail', args=(note.slug,)))
+    content = response.content.decode()
+    assert '<h1>Заголовок</h1>' in content
+    assert '<script>alert(1)' not in content
+
+
+def test_3_html_is_rendered_once_per_text(renders, note):
+    """
+    Тест 3. HTML рисуется при первом чтении и берётся готовым,
+    пока текст заметки не изменится любым путём.
+    """
+    first = rendering.note_html(load(note))
+    assert rendering.note_html(load(note)) == first
+    assert len(renders) == 1
+    Note.objects.filter(pk=note.pk).update(text='**Новый** текст')
+    assert rendering.note_html(load(note)) == (
+        '<p><strong>Новый</strong> текст</p>'
+    )
+    rendering.note_html(load(note))
+    assert len(renders) == 2
+    assert NoteRendering.objects.get().text_hash == rendering.text_hash(
+        '**Новый** текст'
+    )
+
+
+def test_4_prerender_command(renders, author, note):
+    """
+    Тест 4. Команда рисует HTML только для заметок без него
+    или с устаревшим HTML, а --force — для всех.
+    """
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {number}', text=f'_{number}_',
+             slug=f'note-{number}', author=author)
+        for number in range(5)
+    )
+
+    def prerender(*args):
+        out = StringIO()
+        call_command('prerender_notes', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    assert 'Отрисовано заметок: 6' in prerender()
+    assert 'Отрисовано заметок: 0' in prerender()
+    Note.objects.filter(slug='note-3').update(text='Изменённый')
+    assert 'Отрисовано заметок: 1' in prerender()
+    assert 'Отрисовано заметок: 6' in prerender('--force')
+    assert rendering.note_html(load(note)) == '<p>Текст заметки</p>'
+    assert len(renders) == 13
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from django.shortcuts import reverse
+from django.test import Client
+
+from conftest import REPLICA
+from notes import page_cache, replication
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', REPLICA]
+)
+
+LIST_URL = reverse('notes:list')
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.NOTES_REPLICAS = {'default': [REPLICA]}
+    settings.NOTES_REPLICA_STICKY_SECONDS = 60
+    replication.replicate()
+
+
+def listed(client):
+    response = client.get(LIST_URL)
+    return [note.slug for note in response.context['object_list']]
+
+
+def replica_slugs():
+    return list(Note.objects.using(REPLICA).values_list('slug', flat=True))
+
+
+def test_1_reads_go_to_replica(replicas, author, author_client):
+    """
+    Тест 1. Список читается с реплики: заметка видна после того,
+    как реплика её получила.
+    """
+    Note.objects.create(title='Заметка', text='Текст', author=author)
+    assert listed(author_client) == []
+    replication.replicate()
+    assert listed(author_client) == [Note.objects.get().slug]
+
+
+def test_2_writer_reads_own_writes(replicas, author, author_client):
+    """
+    Тест 2. После записи автор читает из основной базы, пока не истекло
+    окно; другой клиент того же автора читает с реплики.
+    """
+    response = author_client.post(reverse('notes:add'), data={
+        'title': 'Новая', 'text': 'Текст', 'slug': 'new',
+    })
+    assert response.cookies['notes_primary_until']['max-age'] == 60
+    assert replica_slugs() == []
+    assert listed(author_client) == ['new']
+    other = Client()
+    other.force_login(author)
+    page_cache.get_cache().clear()
+    assert listed(other) == []
+    author_client.cookies['notes_primary_until'] = str(int(time.time()) - 1)
+    page_cache.get_cache().clear()
+    assert listed(author_client) == []
+
+
+def test_3_writes_go_to_primary(replicas, author, author_client, note):
+    """
+    Тест 3. Правка заметки, прочитанной с реплики, записывается
+    в основную базу, а реплика меняется только при репликации.
+    """
+    replication.replicate()
+    response = author_client.post(
+        reverse('notes:edit', args=(note.slug,)),
+        data={'title': 'Правка', 'text': 'Текст', 'slug': note.slug},
+    )
+    assert response.status_code == 302
+    assert Note.objects.get().title == 'Правка'
+    assert Note.objects.using(REPLICA).get().title == note.title
+
+
+def test_4_lagging_page_is_not_cached(replicas, author, author_client):
+    """
+    Тест 4. Страница, прочитанная с реплики сразу после изменения,
+    не попадает в кеш, и после репликации видна новая заметка.
+    """
+    Note.objects.create(title='Заметка', text='Текст', author=author)
+    assert listed(author_client) == []
+    replication.replicate()
+    assert len(listed(author_client)) == 1
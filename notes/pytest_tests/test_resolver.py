@@ -0,0 +1,84 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+
+from notes.models import Note
+from notes.resolver import resolver
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures('auth_cache')]
+
+PK_LOOKUP = '"notes_note"."id" = '
+
+
+def request(client, name, slug, method='get', data=None):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(
+            reverse(name, args=(slug,)), data=data
+        )
+    return response, [query['sql'] for query in context.captured_queries]
+
+
+@pytest.mark.parametrize('name, method, expected', (
+    ('notes:detail', 'get', 1),
+    ('notes:edit', 'get', 1),
+    ('notes:delete', 'get', 1),
+    ('notes:delete', 'post', 4),
+))
+def test_1_queries_per_request(author_client, note, name, method, expected):
+    """
+    Тест 1. После первого перехода заметка находится по первичному
+    ключу, и запрос к странице делает заданное число запросов к базе:
+    страница заметки — только проверку времени изменения, удаление —
+    поиск заметки и удаление её самой, истории, HTML и записи индекса.
+    """
+    request(author_client, 'notes:detail', note.slug)
+    response, queries = request(author_client, name, note.slug, method)
+    assert response.status_code in (HTTPStatus.OK, HTTPStatus.FOUND)
+    assert len(queries) == expected
+    assert PK_LOOKUP in queries[0]
+
+
+def test_2_renamed_and_deleted_notes_are_forgotten(author_client, note):
+    """
+    Тест 2. После смены slug старый адрес отвечает 404, а после
+    удаления заметки её адрес не находит её по старой записи кеша.
+    """
+    request(author_client, 'notes:edit', note.slug)
+    response, _ = request(author_client, 'notes:edit', note.slug, 'post', {
+        'title': note.title, 'text': note.text, 'slug': 'renamed',
+    })
+    assert response.status_code == HTTPStatus.FOUND
+    response, _ = request(author_client, 'notes:detail', note.slug)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    response, _ = request(author_client, 'notes:detail', 'renamed')
+    assert response.status_code == HTTPStatus.OK
+    Note.objects.get(slug='renamed').delete()
+    assert resolver.get(note.author_id, 'renamed') is None
+
+
+def test_3_stale_entry_falls_back_to_slug(author, author_client, note):
+    """
+    Тест 3. Запись кеша, устаревшая из-за правки в другом процессе,
+    не подменяет заметку: она ищется заново по slug.
+    """
+    other = Note.objects.create(
+        title='Другая', text='Текст', slug='other', author=author
+    )
+    resolver.remember(author.pk, note.slug, other.pk)
+    response, _ = request(author_client, 'notes:edit', note.slug)
+    assert response.context['object'] == note
+    assert resolver.get(author.pk, note.slug) == note.pk
+
+
+def test_4_cache_is_bounded(settings):
+    """Тест 4. Кеш хранит не больше NOTES_SLUG_CACHE_SIZE записей."""
+    settings.NOTES_SLUG_CACHE_SIZE = 2
+    for pk in range(1, 5):
+        resolver.remember(1, f'slug-{pk}', pk)
+    resolver.get(1, 'slug-3')
+    resolver.remember(1, 'slug-5', 5)
+    assert list(resolver.entries) == [(1, 'slug-3'), (1, 'slug-5')]
+    assert set(resolver.slugs) == {(1, 3), (1, 5)}
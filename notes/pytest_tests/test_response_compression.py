@@ -0,0 +1,139 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from django.shortcuts import reverse
+
+from notes import compression
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = reverse('notes:list')
+
+
+@pytest.fixture
+def many_notes(author):
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {number}', text='Текст заметки ' * 20,
+             slug=f'note-{number}', author=author)
+        for number in range(100)
+    )
+
+
+@pytest.mark.parametrize('header, expected', (
+    ('gzip', 'gzip'),
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    ('*', next(iter(compression.CODECS))),
+    ('br;q=0.5, gzip;q=0.8', 'gzip'),
+    ('', None),
+))
+def test_1_negotiation(header, expected):
+    """Тест 1. Кодировка выбирается по весам q из Accept-Encoding."""
+    assert compression.negotiate(header) == expected
+
+
+@pytest.mark.parametrize('coding', list(compression.CODECS))
+def test_2_list_is_compressed(author_client, many_notes, coding):
+    """
+    Тест 2. Большой список заметок сжимается выбранной кодировкой,
+    а распакованный ответ совпадает с несжатым.
+    """
+    plain = author_client.get(LIST_URL)
+    response = author_client.get(LIST_URL, HTTP_ACCEPT_ENCODING=coding)
+    assert response['Content-Encoding'] == coding
+    assert 'Accept-Encoding' in response['Vary']
+    assert int(response['Content-Length']) == len(response.content)
+    assert len(response.content) < len(plain.content) / 3
+    assert decompress(coding, response.content) == plain.content
+
+
+def decompress(coding, data):
+    if coding == 'gzip':
+        return gzip.decompress(data)
+    if coding == 'br':
+        return compression.brotli.decompress(data)
+    return compression.zstandard.ZstdDecompressor().decompressobj(
+    ).decompress(data)
+
+
+def test_3_small_and_compressed_responses_are_skipped(
+        author_client, note, many_notes):
+    """
+    Тест 3. Маленький ответ и уже сжатый архив отдаются как есть.
+    """
+    response = author_client.get(
+        reverse('api:detail', args=(note.slug,)), HTTP_ACCEPT_ENCODING='gzip'
+    )
+    assert len(response.content) < 512
+    assert not response.has_header('Content-Encoding')
+    response = author_client.get(
+        reverse('notes:export', args=('zip',)), HTTP_ACCEPT_ENCODING='gzip'
+    )
+    assert not response.has_header('Content-Encoding')
+
+
+def test_4_streaming_export_is_compressed_by_chunk(
+        author_client, many_notes, settings):
+    """
+    Тест 4. Потоковая выгрузка остаётся потоковой: каждый кусок
+    сжимается и отдаётся сразу, без Content-Length.
+    """
+    settings.NOTES_EXPORT_CHUNK_SIZE = 10
+    url = reverse('notes:export', args=('ndjson',))
+    plain = b''.join(author_client.get(url).streaming_content)
+    response = author_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response.streaming
+    assert response['Content-Encoding'] == 'gzip'
+    assert not response.has_header('Content-Length')
+    chunks = list(response.streaming_content)
+    assert len(chunks) > 10
+    # Первый кусок распаковывается сам по себе: он не ждёт остальных.
+    first = zlib.decompressobj(31).decompress(chunks[0])
+    assert first and plain.startswith(first)
+    body = gzip.decompress(b''.join(chunks))
+    assert body == plain
+    assert len([json.loads(line) for line in body.splitlines()]) == 100
+
+
+def test_5_etag_is_weak_and_still_validates(author_client, note, settings):
+    """
+    Тест 5. Сжатый ответ получает слабый ETag, и повторный запрос
+    с ним получает 304 с тем же валидатором.
+    """
+    settings.NOTES_COMPRESS_MIN_SIZE = 0
+    url = reverse('notes:detail', args=(note.slug,))
+    plain = author_client.get(url)
+    assert not plain['ETag'].startswith('W/')
+    response = author_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['ETag'] == f'W/{plain["ETag"]}'
+    response = author_client.get(
+        url, HTTP_ACCEPT_ENCODING='gzip',
+        HTTP_IF_NONE_MATCH=response['ETag'],
+    )
+    assert response.status_code == 304
+    assert response['ETag'] == f'W/{plain["ETag"]}'
+    assert 'Accept-Encoding' in response['Vary']
+
+
+def test_6_pages_with_csrf_token_are_not_compressed(
+        author_client, note, settings):
+    """
+    Тест 6. Страница с CSRF-токеном отдаётся несжатой (защита от BREACH),
+    страница без токена сжимается.
+    """
+    settings.NOTES_COMPRESS_MIN_SIZE = 0
+    response = author_client.get(
+        reverse('notes:edit', args=(note.slug,)), HTTP_ACCEPT_ENCODING='gzip'
+    )
+    assert b'csrfmiddlewaretoken' in response.content
+    assert not response.has_header('Content-Encoding')
+    response = author_client.get(
+        reverse('notes:detail', args=(note.slug,)),
+        HTTP_ACCEPT_ENCODING='gzip',
+    )
+    assert response['Content-Encoding'] == 'gzip'
@@ -0,0 +1,181 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+
+from notes import bulk, search
+from notes.models import Note
+
+URL = reverse('notes:search')
+
+
+def found(client, query):
+    response = client.get(URL, {'q': query})
+    return list(response.context['object_list'])
+
+
+def test_1_search_finds_own_notes_only(author_client, note, admin_client):
+    """
+    Тест 1. Поиск находит заметку по словам из заголовка и текста
+    и не показывает её другому пользователю.
+    """
+    assert found(author_client, 'заметки') == [note]
+    assert found(author_client, 'заго') == [note]
+    assert found(admin_client, 'заметки') == []
+
+
+def test_2_title_match_ranks_higher(author, author_client):
+    """
+    Тест 2. Совпадение в заголовке ранжируется выше совпадения в тексте.
+    """
+    in_text = Note.objects.create(
+        title='Покупки', text='Купить молоко', author=author
+    )
+    in_title = Note.objects.create(
+        title='Молоко', text='Список', author=author
+    )
+    assert found(author_client, 'молоко') == [in_title, in_text]
+
+
+def test_3_index_follows_save_and_delete(author_client, note):
+    """
+    Тест 3. Индекс обновляется при изменении и удалении заметки.
+    """
+    note.title = 'Отпуск'
+    note.save()
+    assert found(author_client, 'отпуск') == [note]
+    assert found(author_client, 'заголовок') == []
+    note.delete()
+    assert found(author_client, 'отпуск') == []
+
+
+@pytest.mark.parametrize('query', ('"', 'AND OR', 'owner:u1', '*'))
+def test_4_special_characters_are_escaped(author_client, note, query):
+    """
+    Тест 4. Служебные символы FTS5 в запросе не приводят к ошибке.
+    """
+    response = author_client.get(URL, {'q': query})
+    assert response.status_code == 200
+
+
+def test_5_rebuild_command(author_client, note):
+    """
+    Тест 5. Команда rebuild_search_index восстанавливает индекс.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {search.FTS_TABLE} ({search.FTS_TABLE}) '
+            "VALUES ('delete-all')"
+        )
+    assert found(author_client, 'заметки') == []
+    call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+    assert found(author_client, 'заметки') == [note]
+
+
+def test_6_query_does_not_match_owner(author, author_client, note):
+    """
+    Тест 6. Слова запроса ищутся только в заголовке и тексте:
+    токен владельца «u<id>» не находит все заметки автора.
+    """
+    assert found(author_client, 'u') == []
+    assert found(author_client, f'u{author.pk}') == []
+    assert found(author_client, 'заметки') == [note]
+
+
+def test_7_failed_rebuild_keeps_old_index(author_client, note, monkeypatch):
+    """
+    Тест 7. Перестройка индекса идёт одной транзакцией: если она
+    прервалась, поиск по-прежнему находит заметки по старому индексу.
+    """
+    def fail(notes, using=None):
+        raise RuntimeError('Сбой перестройки')
+
+    monkeypatch.setattr(search, 'index_notes', fail)
+    with pytest.raises(RuntimeError):
+        search.rebuild_index()
+    assert found(author_client, 'заметки') == [note]
+
+
+def test_8_terms_are_scoped_to_author(author, author_client, note,
+                                      django_user_model):
+    """
+    Тест 8. Термы индекса принадлежат автору: чужая заметка, в которой
+    написан терм автора, не находится его поиском.
+    """
+    other = django_user_model.objects.create(username='Другой')
+    term = f'{search.owner_prefix(author.pk)}заметки'
+    Note.objects.create(title=term, text=term, author=other)
+    assert found(author_client, 'заметки') == [note]
+    assert found(author_client, term) == []
+
+
+def test_9_only_recent_matches_are_ranked(author, author_client, settings):
+    """
+    Тест 9. Ранжируются только NOTES_SEARCH_RANK_WINDOW последних
+    подходящих заметок, среди них совпадение в заголовке выше.
+    """
+    settings.NOTES_SEARCH_RANK_WINDOW = 2
+    old = Note.objects.create(title='Молоко', text='Список', author=author)
+    in_text = Note.objects.create(
+        title='Покупки', text='Купить молоко', author=author
+    )
+    in_title = Note.objects.create(
+        title='Молоко', text='Список', author=author
+    )
+    assert found(author_client, 'молоко') == [in_title, in_text]
+    settings.NOTES_SEARCH_RANK_WINDOW = 3
+    assert old in found(author_client, 'молоко')
+
+
+def test_10_index_keeps_no_copy_of_texts(note):
+    """
+    Тест 10. Индекс бесконтентный: FTS5 не хранит вторую, несжатую
+    копию заголовков и текстов заметок.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE %s",
+            [f'{search.FTS_TABLE}%'],
+        )
+        tables = {row[0] for row in cursor.fetchall()}
+    assert f'{search.FTS_TABLE}_docsize' in tables
+    assert f'{search.FTS_TABLE}_content' not in tables
+
+
+def test_11_index_follows_changes_past_signals(author_client, note):
+    """
+    Тест 11. Триггеры обновляют индекс и при изменениях без сигналов:
+    QuerySet.update(), bulk_update и удаление набором.
+    """
+    Note.objects.filter(pk=note.pk).update(title='Отпуск')
+    assert found(author_client, 'отпуск') == [note]
+    assert found(author_client, 'заголовок') == []
+    note.title = 'Поход'
+    bulk.update_notes([note], ['title'])
+    assert found(author_client, 'поход') == [note]
+    assert found(author_client, 'отпуск') == []
+    Note.objects.filter(pk=note.pk).delete()
+    assert found(author_client, 'поход') == []
+    assert found(author_client, 'заметки') == []
+
+
+def test_12_notes_missing_from_index_stay_missing(author, author_client):
+    """
+    Тест 12. Изменение и удаление заметки, которой нет в индексе, его
+    не портят: заметка остаётся ненайденной до перестройки индекса.
+    """
+    Note.objects.bulk_create([
+        Note(title='Молоко', text='Список', slug='missing', author=author),
+        Note(title='Молоко', text='Список', slug='kept', author=author),
+    ])
+    kept = Note.objects.get(slug='kept')
+    search.index_note(kept)
+    Note.objects.filter(slug='missing').update(text='Купить молоко')
+    assert found(author_client, 'молоко') == [kept]
+    search.rebuild_index()
+    missing = Note.objects.get(slug='missing')
+    assert set(found(author_client, 'молоко')) == {missing, kept}
+    missing.delete()
+    assert found(author_client, 'молоко') == [kept]
@@ -0,0 +1,85 @@
+import io
+import re
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import Client
+from django.utils import timezone
+
+from notes import search, seeding
+from notes.models import Note
+
+pytestmark = pytest.mark.django_db
+
+
+def seed(*args):
+    call_command('seed_notes', *args, stdout=io.StringIO())
+
+
+def test_1_notes_are_seeded(django_user_model):
+    """
+    Тест 1. Команда создаёт пользователей и заметки с кириллическими
+    заголовками, уникальными slug и текстами разного размера; заметки
+    читаются моделью, а удалённые на время записи индексы восстановлены.
+    """
+    seed('--users', '5', '--notes', '500', '--batch-size', '120')
+    assert django_user_model.objects.filter(
+        username__startswith='seed-'
+    ).count() == 5
+    notes = list(Note.objects.all())
+    assert len(notes) == 500
+    assert len({note.slug for note in notes}) == 500
+    assert all(re.search('[а-яё]', note.title) for note in notes)
+    sizes = {len(str(note.text)) for note in notes}
+    assert min(sizes) < 100 and max(sizes) > 1000
+    assert all(note.created_at <= timezone.now() for note in notes)
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, Note._meta.db_table
+        )
+    assert {index.name for index in Note._meta.indexes} <= set(constraints)
+    client = Client()
+    client.force_login(notes[0].author)
+    response = client.get(reverse('notes:detail', args=(notes[0].slug,)))
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_2_repeated_run_reuses_users(django_user_model):
+    """
+    Тест 2. Повторный запуск не создаёт пользователей заново,
+    а новые slug не совпадают с уже созданными.
+    """
+    seed('--users', '3', '--notes', '50')
+    seed('--users', '3', '--notes', '50')
+    assert django_user_model.objects.count() == 3
+    assert Note.objects.values('slug').distinct().count() == 100
+
+
+def test_3_search_index_is_filled_on_request():
+    """
+    Тест 3. С --search-index заметки сразу находятся поиском,
+    без него индекс не заполняется.
+    """
+    seed('--users', '1', '--notes', '20')
+    author_id = Note.objects.first().author_id
+    assert search.search_note_ids(author_id, 'и') == []
+    seed('--users', '1', '--notes', '20', '--search-index')
+    assert len(search.search_note_ids(author_id, 'и')) > 0
+
+
+def test_4_processes_generate_same_notes():
+    """
+    Тест 4. Пачки, подготовленные в процессах, совпадают с пачками
+    из основного процесса при том же начальном значении.
+    """
+    now = timezone.now().replace(tzinfo=None)
+    tasks = [
+        (start, 10, [1, 2, 3], 'test-', 7, now, True)
+        for start in range(0, 40, 10)
+    ]
+    assert list(seeding.generate(tasks, 2)) == list(
+        seeding.generate(tasks, 1)
+    )
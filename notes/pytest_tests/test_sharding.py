@@ -0,0 +1,187 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.shortcuts import reverse
+
+from conftest import SHARDS
+from notes import history, search
+from notes.models import Note, NoteSlug
+from notes.routers import jump_hash, shard_for
+from notes.sharding import misplaced_authors
+
+pytestmark = pytest.mark.django_db(databases='__all__')
+
+
+@pytest.fixture
+def sharded(settings):
+    settings.NOTES_SHARDS = SHARDS
+
+
+def make_author(django_user_model, shard, name):
+    """Пользователь, заметки которого попадают на шард shard."""
+    for number in range(100):
+        user = django_user_model.objects.create(username=f'{name}-{number}')
+        if shard_for(user.pk) == shard:
+            return user
+    raise AssertionError(f'Нет пользователя для шарда {shard}')
+
+
+def login(client, user):
+    client.force_login(user)
+    return client
+
+
+def shards_of(slug):
+    return [
+        alias for alias in SHARDS
+        if Note.objects.using(alias).filter(slug=slug).exists()
+    ]
+
+
+def test_1_jump_hash_moves_few_keys():
+    """
+    Тест 1. При добавлении шарда переезжают только ключи,
+    попавшие на новый шард.
+    """
+    keys = range(1, 5000)
+    before = [jump_hash(key * 7919, 3) for key in keys]
+    after = [jump_hash(key * 7919, 4) for key in keys]
+    moved = [old for old, new in zip(before, after) if old != new]
+    assert all(new == 3 for old, new in zip(before, after) if old != new)
+    assert 0.15 < len(moved) / len(keys) < 0.35
+
+
+@pytest.mark.parametrize('shard', SHARDS)
+def test_2_notes_are_stored_on_author_shard(
+        sharded, client, django_user_model, shard):
+    """
+    Тест 2. Заметка сохраняется только на шарде автора,
+    и все страницы автора читают её оттуда.
+    """
+    user = make_author(django_user_model, shard, 'Автор')
+    client = login(client, user)
+    response = client.post(reverse('notes:add'), data={
+        'title': 'Шардированная заметка', 'text': 'Текст на шарде',
+    })
+    assert response.status_code == HTTPStatus.FOUND
+    note = Note.objects.for_author(user).get()
+    assert shards_of(note.slug) == [shard]
+    assert registry_owner(note.slug) == (shard, note.pk)
+    for name, args in (
+        ('notes:list', ()), ('notes:detail', (note.slug,)),
+        ('notes:history', (note.slug,)), ('api:detail', (note.slug,)),
+    ):
+        assert client.get(reverse(name, args=args)).status_code == (
+            HTTPStatus.OK
+        )
+    response = client.get(reverse('notes:search'), {'q': 'шарде'})
+    assert [item.slug for item in response.context['object_list']] == [
+        note.slug
+    ]
+
+
+def registry_owner(slug):
+    return NoteSlug.objects.filter(slug=slug).values_list(
+        'shard', 'note_id'
+    ).first()
+
+
+def test_3_slug_is_unique_across_shards(sharded, client, django_user_model):
+    """
+    Тест 3. Slug, занятый на одном шарде, нельзя занять на другом;
+    после удаления заметки он освобождается.
+    """
+    first = make_author(django_user_model, SHARDS[1], 'Первый')
+    second = make_author(django_user_model, SHARDS[2], 'Второй')
+    note = Note.objects.create(
+        title='Общий заголовок', text='Текст', author=first
+    )
+    client = login(client, second)
+    response = client.post(reverse('notes:add'), data={
+        'title': 'Другой', 'text': 'Текст', 'slug': note.slug,
+    })
+    assert response.status_code == HTTPStatus.OK
+    assert 'slug' in response.context['form'].errors
+    response = client.post(
+        reverse('api:batch'),
+        [{'op': 'create', 'data': {'title': 'Общий заголовок', 'text': 'Т'}}],
+        content_type='application/json',
+    )
+    assert response.json()['results'][0]['slug'] == f'{note.slug}-2'
+    duplicate = Note.objects.create(
+        title='Общий заголовок', text='Текст', author=second
+    )
+    assert duplicate.slug == f'{note.slug}-3'
+    note.delete()
+    assert registry_owner(note.slug) is None
+    duplicate.slug = note.slug
+    duplicate.save()
+    assert registry_owner(note.slug) == (SHARDS[2], duplicate.pk)
+    assert registry_owner(f'{note.slug}-3') is None
+
+
+def test_4_stale_registry_entry_is_taken_over(sharded, django_user_model):
+    """
+    Тест 4. Запись реестра без заметки, например от откаченной
+    транзакции, не мешает занять slug.
+    """
+    user = make_author(django_user_model, SHARDS[1], 'Автор')
+    NoteSlug.objects.create(slug='lost', shard=SHARDS[2], note_id=999)
+    note = Note.objects.create(
+        title='Заметка', text='Текст', slug='lost', author=user
+    )
+    assert registry_owner('lost') == (SHARDS[1], note.pk)
+
+
+def test_5_rebalance_moves_notes_with_history(settings, django_user_model):
+    """
+    Тест 5. После включения шардов команда переносит заметки авторов
+    на их шарды вместе с историей, датами и поисковым индексом.
+    """
+    settings.NOTES_SHARDS = SHARDS
+    authors = [
+        make_author(django_user_model, shard, f'Автор {shard}')
+        for shard in SHARDS
+    ]
+    settings.NOTES_SHARDS = ['default']
+    notes = []
+    for author in authors:
+        for number in range(3):
+            notes.append(Note.objects.create(
+                title=f'Заметка {author.pk} {number}',
+                text='Исходный текст\n', author=author,
+            ))
+    edited = notes[-1]
+    edited.text = 'Исправленный текст\n'
+    edited.save()
+    created_at = {note.slug: note.created_at for note in notes}
+    settings.NOTES_SHARDS = SHARDS
+    call_command('rebalance_shards', '--batch-size', '2')
+    for note in notes:
+        shard = shard_for(note.author_id)
+        assert shards_of(note.slug) == [shard]
+        moved = Note.objects.using(shard).get(slug=note.slug)
+        assert moved.created_at == created_at[note.slug]
+        assert registry_owner(note.slug) == (shard, moved.pk)
+    moved = Note.objects.for_author(edited.author).get(slug=edited.slug)
+    assert [
+        history.revision_text(revision)
+        for revision in moved.revisions.order_by('number')
+    ] == ['Исходный текст\n', 'Исправленный текст\n']
+    assert search.search_note_ids(moved.author_id, 'Исправленный') == [
+        moved.pk
+    ]
+    assert misplaced_authors() == []
+
+
+def test_6_user_delete_removes_sharded_notes(sharded, django_user_model):
+    """
+    Тест 6. Удаление пользователя удаляет его заметки на шарде
+    и освобождает их slug.
+    """
+    user = make_author(django_user_model, SHARDS[2], 'Автор')
+    note = Note.objects.create(title='Заметка', text='Текст', author=user)
+    user.delete()
+    assert shards_of(note.slug) == []
+    assert registry_owner(note.slug) is None
@@ -0,0 +1,170 @@
+import json
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from django.db import connection, connections
+from django.shortcuts import reverse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from pytils.translit import slugify
+
+from notes import slugs
+from notes.models import Note
+
+THREADS = 12
+NOTES_PER_THREAD = 5
+
+
+def test_1_duplicate_title_gets_suffix(author, note):
+    """
+    Тест 1. Заметки с одинаковым заголовком получают slug с суффиксом.
+    """
+    base = slugify(note.title)
+    created = [
+        Note.objects.create(title=note.title, text='Текст', author=author)
+        for _ in range(3)
+    ]
+    assert [item.slug for item in created] == [
+        base, f'{base}-2', f'{base}-3'
+    ]
+
+
+def test_2_allocation_takes_one_query(author):
+    """
+    Тест 2. Свободный slug подбирается одним запросом.
+    """
+    Note.objects.create(title='Заголовок', text='Текст', author=author)
+    with CaptureQueriesContext(connection) as context:
+        slug = slugs.allocate_slug(slugify('Заголовок'))
+    assert len(context.captured_queries) == 1
+    assert slug == f'{slugify("Заголовок")}-2'
+
+
+def test_3_long_title_suffix_fits(author):
+    """
+    Тест 3. Суффикс помещается в slug максимальной длины.
+    """
+    title = 'щ' * 100
+    first = Note.objects.create(title=title, text='Текст', author=author)
+    second = Note.objects.create(title=title, text='Текст', author=author)
+    assert len(first.slug) == 100
+    assert len(second.slug) <= 100
+    assert second.slug.endswith('-2')
+
+
+def test_4_retry_after_lost_race(author):
+    """
+    Тест 4. Если slug заняли между подбором и вставкой,
+    подбор повторяется без ошибки.
+    """
+    note = Note.objects.create(title='Заголовок', text='Текст', author=author)
+    base = note.slug
+    stale = mock.patch.object(
+        slugs, 'fetch_taken',
+        side_effect=[set(), slugs.fetch_taken([base])],
+    )
+    with stale:
+        created = Note.objects.create(
+            title=note.title, text='Текст', author=author
+        )
+    assert created.slug == f'{base}-2'
+
+
+def test_5_form_without_slug_does_not_fail(author_client, author, form_data):
+    """
+    Тест 5. Форма без slug с уже занятым заголовком сохраняет заметку.
+    """
+    note = Note.objects.create(title='Заголовок', text='Текст', author=author)
+    form_data.pop('slug')
+    form_data['title'] = note.title
+    author_client.post(reverse('notes:add'), data=form_data)
+    assert Note.objects.filter(slug=f'{slugify(note.title)}-2').exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_6_concurrent_creates(django_user_model):
+    """
+    Тест 6. Параллельные потоки, создающие заметки с одинаковым
+    заголовком, не получают ошибок, и все slug уникальны.
+    """
+    author = django_user_model.objects.create(username='Автор')
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def create_notes():
+        try:
+            barrier.wait()
+            for _ in range(NOTES_PER_THREAD):
+                Note.objects.create(
+                    title='Одинаковый', text='Текст', author=author
+                )
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=create_notes) for _ in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    slug_list = list(Note.objects.values_list('slug', flat=True))
+    assert len(slug_list) == THREADS * NOTES_PER_THREAD
+    assert len(set(slug_list)) == len(slug_list)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('name, content_type', (
+    ('notes:add', None),
+    ('api:list', 'application/json'),
+))
+def test_7_concurrent_creates_through_views(
+        django_user_model, name, content_type):
+    """
+    Тест 7. Параллельные запросы к форме и к API, создающие заметки
+    с одинаковым заголовком без slug, не падают на блокировке базы.
+    """
+    author = django_user_model.objects.create(username='Автор')
+    clients = []
+    for _ in range(THREADS):
+        client = Client()
+        client.force_login(author)
+        clients.append(client)
+    barrier = threading.Barrier(THREADS)
+    data = {'title': 'Одинаковый', 'text': 'Текст', 'slug': ''}
+    if content_type:
+        data = json.dumps(data)
+    statuses = []
+    errors = []
+
+    def create_notes(client):
+        try:
+            barrier.wait()
+            for _ in range(NOTES_PER_THREAD):
+                statuses.append(client.post(
+                    reverse(name), data=data,
+                    **({'content_type': content_type} if content_type else {})
+                ).status_code)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=create_notes, args=(client,))
+        for client in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert set(statuses) <= {HTTPStatus.FOUND, HTTPStatus.CREATED}
+    slug_list = list(Note.objects.values_list('slug', flat=True))
+    assert len(slug_list) == THREADS * NOTES_PER_THREAD
+    assert len(set(slug_list)) == len(slug_list)
@@ -0,0 +1,129 @@
+import base64
+import gzip
+import hashlib
+from http import HTTPStatus
+
+import pytest
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import override_settings
+
+from yanote.static import StaticFiles
+
+BOOTSTRAP = 'vendor/bootstrap/css/bootstrap.min.css'
+# SRI-хеш файла из официального дистрибутива Bootstrap 5.1.3.
+BOOTSTRAP_SRI = (
+    'sha384-1BmE4kWBq78iYhFldvKuhfTAU6auU8tT94WrHftjDbrCEXSU1oBoqyl2QvZ6jIW3'
+)
+
+
+@pytest.fixture(scope='module')
+def collected(tmp_path_factory):
+    """Статика, собранная один раз для всех тестов модуля."""
+    root = tmp_path_factory.mktemp('static')
+    with override_settings(STATIC_ROOT=str(root)):
+        call_command('collectstatic', '--noinput', verbosity=0)
+    return root
+
+
+@pytest.fixture
+def static_root(settings, collected):
+    settings.STATIC_ROOT = str(collected)
+    return collected
+
+
+def application(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+def call(app, path, method='GET', **headers):
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, **headers}
+    response = {}
+
+    def start_response(status, response_headers):
+        response['status'] = status
+        response['headers'] = dict(response_headers)
+
+    body = b''.join(app(environ, start_response))
+    return response['status'], response['headers'], body
+
+
+@pytest.mark.django_db
+def test_1_pages_use_self_hosted_hashed_css(static_root, client):
+    """
+    Тест 1. Страницы подключают стили с хешем в имени со своего
+    сервера, а не с CDN; рядом лежат сжатые копии.
+    """
+    content = client.get(reverse('notes:home')).content.decode()
+    url = staticfiles_storage.url(BOOTSTRAP)
+    assert url != f'/static/{BOOTSTRAP}'
+    assert url in content
+    assert 'cdn.jsdelivr.net' not in content
+    hashed = static_root / staticfiles_storage.stored_name(BOOTSTRAP)
+    original = hashed.read_bytes()
+    assert gzip.decompress(
+        hashed.with_name(hashed.name + '.gz').read_bytes()
+    ) == original
+
+
+def test_2_serves_precompressed_variant(static_root):
+    """
+    Тест 2. Обёртка отдаёт лучшую сжатую копию из тех, что принимает
+    клиент, а файл с хешем в имени кешируется навсегда.
+    """
+    app = StaticFiles(application)
+    url = staticfiles_storage.url(BOOTSTRAP)
+    status, headers, body = call(
+        app, url, HTTP_ACCEPT_ENCODING='gzip, deflate'
+    )
+    assert status == '200 OK'
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert headers['Cache-Control'] == (
+        'public, max-age=31536000, immutable'
+    )
+    assert int(headers['Content-Length']) == len(body)
+    original = gzip.decompress(body)
+    _, headers, body = call(app, url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+    assert 'Content-Encoding' not in headers
+    assert body == original
+    _, headers, _ = call(app, f'/static/{BOOTSTRAP}')
+    assert 'immutable' not in headers['Cache-Control']
+
+
+def test_3_conditional_and_fallthrough(static_root):
+    """
+    Тест 3. Повторный запрос с ETag получает 304, а адреса вне
+    собранной статики уходят приложению.
+    """
+    app = StaticFiles(application)
+    url = staticfiles_storage.url(BOOTSTRAP)
+    _, headers, _ = call(app, url, HTTP_ACCEPT_ENCODING='gzip')
+    status, _, body = call(
+        app, url, HTTP_ACCEPT_ENCODING='gzip',
+        HTTP_IF_NONE_MATCH=headers['ETag'],
+    )
+    assert (status, body) == (
+        f'{HTTPStatus.NOT_MODIFIED.value} Not Modified', b''
+    )
+    status, _, _ = call(app, url, HTTP_IF_NONE_MATCH=headers['ETag'])
+    assert status == '200 OK'
+    for path in ('/notes/', '/static/missing.css', '/static/../manage.py'):
+        assert call(app, path)[2] == b'django'
+    assert call(app, url, method='POST')[0].startswith('405')
+
+
+def test_4_vendored_bootstrap_is_unmodified():
+    """
+    Тест 4. Стили Bootstrap лежат в проекте без изменений: хеш совпадает
+    с SRI дистрибутива, а карта исходников из sourceMappingURL на месте.
+    """
+    with open(finders.find(BOOTSTRAP), 'rb') as file:
+        content = file.read()
+    digest = base64.b64encode(hashlib.sha384(content).digest()).decode()
+    assert f'sha384-{digest}' == BOOTSTRAP_SRI
+    assert content.endswith(b'/*# sourceMappingURL=bootstrap.min.css.map */')
+    assert finders.find(f'{BOOTSTRAP}.map')
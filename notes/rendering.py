@@ -0,0 +1,126 @@
+"""
+Markdown в тексте заметок.
+
+Markdown превращается в HTML, а nh3 вычищает из него всё, кроме
+разрешённых тегов и атрибутов: сырой HTML в тексте заметки не может
+встроить скрипт или обработчик события. Разбор длинного текста дорог,
+поэтому готовый HTML хранится в NoteRendering рядом с заметкой вместе
+с хешем текста, из которого он получен. Пока хеш совпадает с хешем
+текущего текста, HTML берётся готовым; изменение текста любым путём —
+формой, API, импортом — меняет хеш, и HTML рисуется заново при первом
+чтении. Команда prerender_notes рисует HTML заранее.
+"""
+import hashlib
+
+import markdown
+import nh3
+from django.db import IntegrityError, transaction
+from django.utils.safestring import mark_safe
+
+from .models import NoteRendering
+from .routers import primary_database
+
+# Версия правил отрисовки входит в хеш: после смены расширений или
+# разрешённых тегов весь сохранённый HTML считается устаревшим.
+RENDERER_VERSION = 1
+EXTENSIONS = ('fenced_code', 'tables', 'sane_lists')
+TAGS = {
+    'a', 'abbr', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'hr', 'img', 'li', 'ol', 'p', 'pre', 'strong',
+    'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+}
+ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'img': {'src', 'alt', 'title'},
+    'td': {'align'},
+    'th': {'align'},
+}
+URL_SCHEMES = {'http', 'https', 'mailto'}
+
+
+def text_hash(text):
+    data = f'{RENDERER_VERSION}\n{text}'.encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def render_markdown(text):
+    """Безопасный HTML из Markdown."""
+    html = markdown.markdown(str(text), extensions=EXTENSIONS)
+    return nh3.clean(
+        html, tags=TAGS, attributes=ATTRIBUTES, url_schemes=URL_SCHEMES,
+        link_rel='nofollow noopener noreferrer',
+    )
+
+
+def cached_rendering(note):
+    """Сохранённый HTML заметки или None, если его ещё нет."""
+    try:
+        return note.rendering
+    except NoteRendering.DoesNotExist:
+        return None
+
+
+def note_html(note):
+    """
+    HTML текста заметки: сохранённый, если текст с тех пор не менялся,
+    иначе отрисованный заново и сохранённый в основной базе шарда.
+    """
+    digest = text_hash(note.text)
+    rendering = cached_rendering(note)
+    if rendering is None or rendering.text_hash != digest:
+        rendering = NoteRendering(
+            note_id=note.pk, text_hash=digest, html=render_markdown(note.text)
+        )
+        save_rendering(rendering, primary_database(note._state.db))
+    return mark_safe(rendering.html)
+
+
+def save_rendering(rendering, using):
+    """
+    Сохраняет HTML отдельными UPDATE или INSERT без транзакции вокруг.
+    update_or_create читает строку и затем пишет в одной транзакции:
+    SQLite не ждёт busy_timeout, когда читающая транзакция пытается
+    стать пишущей, и параллельные просмотры падали с «database is locked».
+    """
+    fields = {'text_hash': rendering.text_hash, 'html': rendering.html}
+    updated = NoteRendering.objects.using(using).filter(
+        note_id=rendering.note_id
+    )
+    if updated.update(**fields):
+        return
+    try:
+        rendering.save(using=using, force_insert=True)
+    except IntegrityError:
+        # HTML этой заметки только что сохранил параллельный запрос.
+        updated.update(**fields)
+
+
+def prerender(notes, using, force=False):
+    """
+    Рисует HTML заметок, у которых его нет или он устарел.
+    Возвращает число отрисованных заметок.
+    """
+    known = dict(
+        NoteRendering.objects.using(using).filter(
+            note_id__in=[note.pk for note in notes]
+        ).values_list('note_id', 'text_hash')
+    )
+    fresh, stale = [], []
+    for note in notes:
+        digest = text_hash(note.text)
+        if not force and known.get(note.pk) == digest:
+            continue
+        rendering = NoteRendering(
+            note_id=note.pk, text_hash=digest,
+            html=render_markdown(note.text),
+        )
+        (stale if note.pk in known else fresh).append(rendering)
+    with transaction.atomic(using=using):
+        NoteRendering.objects.using(using).bulk_create(
+            fresh, ignore_conflicts=True
+        )
+        NoteRendering.objects.using(using).bulk_update(
+            stale, ('text_hash', 'html')
+        )
+    return len(fresh) + len(stale)
@@ -0,0 +1,32 @@
+"""
+Реплики SQLite для локальной проверки чтения с реплик.
+
+Реплика — копия файла основной базы, снятая через backup API SQLite:
+копия согласована, даже если в основную базу в это время пишут.
+Команда replicate_sqlite обновляет реплики раз в lag секунд, поэтому
+они отстают от основной базы, как асинхронные реплики настоящей СУБД.
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def copy_database(source, target):
+    """Копирует базу source поверх target."""
+    source_connection = connections[source]
+    target_connection = connections[target]
+    if (source_connection.settings_dict['NAME']
+            == target_connection.settings_dict['NAME']):
+        return
+    source_connection.ensure_connection()
+    target_connection.ensure_connection()
+    source_connection.connection.backup(target_connection.connection)
+
+
+def replicate():
+    """Обновляет все реплики из NOTES_REPLICAS; возвращает их число."""
+    count = 0
+    for primary, replicas in settings.NOTES_REPLICAS.items():
+        for replica in replicas:
+            copy_database(primary, replica)
+            count += 1
+    return count
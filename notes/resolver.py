@@ -0,0 +1,83 @@
+"""
+Поиск заметки автора по slug через кеш slug -> id.
+
+Страницы заметки, её редактирования, удаления и истории находят
+заметку по (автор, slug) на каждом переходе. Процесс помнит id
+найденных заметок в ограниченном LRU-кеше на NOTES_SLUG_CACHE_SIZE
+записей, и повторный поиск — это выборка по первичному ключу.
+Выборка по id проверяет и slug: запись, устаревшая из-за правки
+в другом процессе, просто не находит заметку, удаляется из кеша,
+и заметка ищется по уникальному индексу slug. Смена slug и удаление
+заметки в этом процессе удаляют запись сразу (см. signals.py).
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class SlugResolver:
+    """LRU-кеш (автор, slug) -> id заметки."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        # (автор, id) -> slug: id заметок на разных шардах совпадают,
+        # а у одного автора все заметки на одном шарде.
+        self.slugs = {}
+        self.lock = threading.Lock()
+
+    def get(self, author_id, slug):
+        with self.lock:
+            pk = self.entries.get((author_id, slug))
+            if pk is not None:
+                self.entries.move_to_end((author_id, slug))
+            return pk
+
+    def remember(self, author_id, slug, pk):
+        with self.lock:
+            previous = self.slugs.pop((author_id, pk), None)
+            if previous is not None:
+                self.entries.pop((author_id, previous), None)
+            self.entries[(author_id, slug)] = pk
+            self.slugs[(author_id, pk)] = slug
+            while len(self.entries) > settings.NOTES_SLUG_CACHE_SIZE:
+                (old_author, _), old_pk = self.entries.popitem(last=False)
+                self.slugs.pop((old_author, old_pk), None)
+
+    def forget(self, author_id, pk, slug=None):
+        """Удаляет запись заметки, если её slug не равен slug."""
+        with self.lock:
+            cached = self.slugs.get((author_id, pk))
+            if cached is None or cached == slug:
+                return
+            del self.slugs[(author_id, pk)]
+            self.entries.pop((author_id, cached), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.slugs.clear()
+
+    def resolve(self, queryset, author_id, slug, *fields):
+        """
+        Заметка автора из queryset по slug или None. С fields
+        возвращается кортеж (id, *fields) вместо экземпляра.
+        """
+        def first(filtered):
+            if fields:
+                return filtered.values_list('pk', *fields).first()
+            return filtered.first()
+
+        pk = self.get(author_id, slug)
+        if pk is not None:
+            found = first(queryset.filter(pk=pk, slug=slug))
+            if found is not None:
+                return found
+            self.forget(author_id, pk)
+        found = first(queryset.filter(slug=slug))
+        if found is not None:
+            self.remember(author_id, slug, found[0] if fields else found.pk)
+        return found
+
+
+resolver = SlugResolver()
@@ -0,0 +1,118 @@
+"""
+Шардирование заметок по автору.
+
+Пользователи, сессии и реестр slug живут в базе default, а заметки
+автора и их история — в одной из баз NOTES_SHARDS, выбранной по хешу
+id автора. Хеш согласованный (jump consistent hash): при добавлении
+шарда переезжает только доля авторов, попавших на новый шард.
+
+Запросы к заметкам без явного using() роутер направить не может:
+в QuerySet нет автора. Поэтому представления берут заметки через
+Note.objects.for_author(), а запись экземпляра роутер направляет
+по его автору.
+
+У каждой базы заметок могут быть реплики для чтения. Читать ли с них
+в текущем запросе, решает ReplicaReadMiddleware; вне запросов, а также
+для записей всегда используется основная база.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+NOTE_MODELS = (
+    'notes.note', 'notes.noterevision', 'notes.noterendering',
+)
+# Модели приложения, которые живут только в default.
+DEFAULT_MODELS = ('notes.noteslug', 'notes.job')
+USER_MODEL = settings.AUTH_USER_MODEL.lower()
+
+# Можно ли в текущем запросе читать заметки с реплик.
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def is_sharded():
+    return len(settings.NOTES_SHARDS) > 1
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash: номер корзины от 0 до buckets - 1."""
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * (1 << 31) / ((key >> 33) + 1))
+    return bucket
+
+
+def shard_for(author_id):
+    """База, в которой должны лежать заметки автора."""
+    shards = settings.NOTES_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+    key = int.from_bytes(
+        hashlib.blake2b(str(author_id).encode(), digest_size=8).digest(),
+        'big',
+    )
+    return shards[jump_hash(key, len(shards))]
+
+
+def read_database(alias):
+    """База для чтения: случайная реплика alias, если чтение с реплик
+    разрешено в этом запросе, иначе сама alias."""
+    replicas = settings.NOTES_REPLICAS.get(alias)
+    if not replicas or not replica_reads.get():
+        return alias
+    return random.choice(replicas)
+
+
+def primary_database(alias):
+    """Основная база для alias, если alias — реплика."""
+    for primary, replicas in settings.NOTES_REPLICAS.items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+class NoteRouter:
+    """
+    Направляет заметки на шард автора, реестр slug и задачи — в default.
+    Запись экземпляра, прочитанного с реплики, идёт в основную базу.
+    """
+
+    def db_for_write(self, model, **hints):
+        alias = self.db_for_read(model, **hints)
+        return alias and primary_database(alias)
+
+    def db_for_read(self, model, **hints):
+        label = model._meta.label_lower
+        if label in DEFAULT_MODELS:
+            return DEFAULT_DB_ALIAS
+        if label not in NOTE_MODELS:
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label_lower == USER_MODEL:
+            return shard_for(instance.pk)
+        if instance._state.db:
+            return instance._state.db
+        if isinstance(getattr(instance, 'author_id', None), int):
+            return shard_for(instance.author_id)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Заметка на шарде может ссылаться на автора из default."""
+        labels = {obj1._meta.label_lower, obj2._meta.label_lower}
+        if labels <= {*NOTE_MODELS, USER_MODEL}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label != 'notes':
+            return db == DEFAULT_DB_ALIAS
+        if f'notes.{model_name}' in DEFAULT_MODELS:
+            return db == DEFAULT_DB_ALIAS
+        return db in settings.NOTES_SHARD_DATABASES
@@ -0,0 +1,227 @@
+"""
+Полнотекстовый поиск по заметкам на основе SQLite FTS5.
+
+Индекс разделён по авторам: каждое слово заголовка и текста хранится
+термом с префиксом владельца, «u42xмолоко». Запрос автора ищет только
+его термы, и стоимость поиска зависит от числа его заметок, а не от
+размера всей базы: общий терм «молоко» с фильтром по владельцу
+заставлял FTS5 читать списки документов всех авторов.
+Заголовок без префикса хранится отдельно для поиска в админке.
+
+Таблица индекса бесконтентная (content=''): FTS5 хранит только сам
+индекс, без второй, несжатой копии заголовка и текста каждой заметки.
+Поэтому запись удаляется командой 'delete' с теми же значениями,
+с которыми была добавлена. Это делают триггеры notes_note на UPDATE
+и DELETE: они вычисляют прежние термы из старой строки функцией
+notes_author_terms и добавляют новые. Новые заметки добавляются
+в индекс кодом, а заметки, которых в индексе нет, триггеры
+пропускают. Изменения в обход Django, например из консоли sqlite3,
+без зарегистрированной функции не пройдут.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from .fields import decompress_text
+from .models import Note
+from .routers import shard_for
+
+FTS_TABLE = 'notes_note_fts'
+FTS_COLUMNS = ('title', 'text', 'plain_title')
+INSERT_SQL = (
+    f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) '
+    'VALUES (%s, %s, %s, %s)'
+)
+# Функция SQLite, которой триггеры миграции 0012 вычисляют термы
+# из строки notes_note при её изменении и удалении.
+AUTHOR_TERMS_FUNCTION = 'notes_author_terms'
+# Веса столбцов title, text, plain_title для bm25: совпадение
+# в заголовке важнее совпадения в тексте, заголовок для админки
+# в поиске автора не участвует.
+RANK = f'bm25({FTS_TABLE}, 10.0, 1.0, 0.0)'
+TITLE_RANK = f'bm25({FTS_TABLE}, 0.0, 0.0, 1.0)'
+# Столбцы с термами автора: без фильтра по столбцам заголовок
+# «u42xмолоко» в plain_title чужой заметки совпал бы с термом автора 42.
+SEARCH_COLUMNS = 'title text'
+# Слово — непрерывная последовательность букв и цифр, как у токенизатора
+# unicode61: терм с префиксом остаётся для FTS5 одним токеном.
+WORD = re.compile(r'[^\W_]+')
+
+
+def _connection(using=None):
+    return connections[using or router.db_for_write(Note)]
+
+
+def is_supported(using=None):
+    """Индекс FTS5 есть только в базах SQLite."""
+    return _connection(using).vendor == 'sqlite'
+
+
+def owner_prefix(author_id):
+    """
+    Префикс термов автора. Номер автора заканчивается буквой x,
+    поэтому термы «u4x2…» и «u42x…» разных авторов не совпадают.
+    """
+    return f'u{author_id}x'
+
+
+def author_terms(author_id, value):
+    """Слова значения термами автора через пробел."""
+    prefix = owner_prefix(author_id)
+    return ' '.join(prefix + word for word in WORD.findall(str(value)))
+
+
+def stored_author_terms(author_id, value):
+    """
+    author_terms для значения столбца notes_note, в котором текст может
+    храниться сжатым. Регистрируется в SQLite как AUTHOR_TERMS_FUNCTION.
+    """
+    if value is None:
+        return ''
+    return author_terms(author_id, decompress_text(value))
+
+
+def index_row(pk, author_id, title, text):
+    """Строка индекса для INSERT_SQL."""
+    return (
+        pk, author_terms(author_id, title), author_terms(author_id, text),
+        title,
+    )
+
+
+def build_match(query, author_id=None):
+    """
+    Превращает пользовательский ввод в выражение MATCH: каждое слово
+    экранируется и ищется по префиксу, слова объединяются через AND.
+    С author_id слова превращаются в термы автора, как при индексации.
+    """
+    terms = query.split()
+    if author_id is not None:
+        terms = [author_terms(author_id, term) for term in terms]
+    return ' '.join(
+        '"{}"*'.format(term.replace('"', '""')) for term in terms if term
+    )
+
+
+def index_note(note, using=None):
+    """Добавляет новую заметку в индекс."""
+    index_notes([note], using=using)
+
+
+def index_notes(notes, using=None):
+    """Пакетно добавляет в индекс ещё не проиндексированные заметки."""
+    if not is_supported(using):
+        return
+    rows = [
+        index_row(note.pk, note.author_id, note.title, note.text)
+        for note in notes
+    ]
+    with _connection(using).cursor() as cursor:
+        cursor.executemany(INSERT_SQL, rows)
+
+
+def rebuild_index(batch_size=5000, using=None):
+    """
+    Полностью перестраивает индекс по таблице заметок пакетами
+    и возвращает количество проиндексированных заметок.
+    Перестройка идёт одной транзакцией: без неё каждая строка индекса
+    фиксировалась отдельно, а поиск до конца перестройки видел
+    пустой индекс вместо прежнего.
+    """
+    if not is_supported(using):
+        return 0
+    connection = _connection(using)
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')"
+            )
+        queryset = Note.objects.using(connection.alias).only(
+            'id', 'author_id', 'title', 'text'
+        )
+        total = 0
+        batch = []
+        for note in queryset.iterator(chunk_size=batch_size):
+            batch.append(note)
+            if len(batch) >= batch_size:
+                index_notes(batch, using=connection.alias)
+                total += len(batch)
+                batch = []
+        index_notes(batch, using=connection.alias)
+        total += len(batch)
+    optimize_index(using=connection.alias)
+    return total
+
+
+def optimize_index(using=None):
+    """
+    Сливает сегменты индекса в один после пакетной записи: иначе
+    каждый терм запроса ищется во всех сегментах, записанных пакетами.
+    """
+    if not is_supported(using):
+        return
+    with _connection(using).cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+        )
+
+
+def search_note_ids(author_id, query, limit=None, using=None):
+    """
+    Возвращает id заметок автора, подходящих под запрос,
+    в порядке убывания релевантности. Индекс читается на шарде автора.
+
+    bm25 считается для каждого совпадения, поэтому ранжируются только
+    NOTES_SEARCH_RANK_WINDOW последних подходящих заметок: граница
+    находится обходом совпадений по убыванию rowid без ранжирования.
+    Так частое слово у автора с десятками тысяч заметок не стоит
+    десятков миллисекунд.
+    """
+    match = build_match(query, author_id)
+    if not match:
+        return []
+    limit = limit or settings.NOTES_SEARCH_LIMIT
+    using = using or shard_for(author_id)
+    if not is_supported(using):
+        return list(
+            Note.objects.using(using).filter(
+                Q(title__icontains=query) | Q(text__icontains=query),
+                author_id=author_id,
+            ).order_by('-pk').values_list('pk', flat=True)[:limit]
+        )
+    match = f'{{{SEARCH_COLUMNS}}} : ({match})'
+    with _connection(using).cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid >= coalesce((SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC '
+            f'LIMIT 1 OFFSET %s), 0) ORDER BY {RANK} LIMIT %s',
+            [match, match, settings.NOTES_SEARCH_RANK_WINDOW - 1, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_title_ids(query, limit=None, using=None):
+    """
+    Возвращает id заметок всех авторов, в заголовке которых есть слова
+    запроса, в порядке убывания релевантности. Используется админкой.
+    """
+    match = build_match(query)
+    if not match:
+        return []
+    limit = limit or settings.NOTES_SEARCH_LIMIT
+    if not is_supported(using):
+        return list(
+            Note.objects.using(using).filter(
+                title__icontains=query
+            ).order_by('-pk').values_list('pk', flat=True)[:limit]
+        )
+    with _connection(using).cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY {TITLE_RANK} LIMIT %s',
+            [f'plain_title : ({match})', limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
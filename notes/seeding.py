@@ -0,0 +1,300 @@
+"""
+Быстрое наполнение базы синтетическими заметками (manage.py seed_notes).
+
+Note.save подбирает slug и пишет заметку отдельным запросом, поэтому
+миллион заметок через ORM создавался бы часами. Здесь заметки
+генерируются пачками — при желании в нескольких процессах — как готовые
+строки таблицы: текст уже сжат, как это сделал бы CompressedTextField,
+slug уникален по построению. Строки пишутся через executemany большими
+транзакциями с заранее назначенными id, поэтому реестр slug шардов
+и поисковый индекс заполняются теми же пачками без обратного чтения.
+Команда рассчитана на базу без параллельных писателей.
+"""
+import contextlib
+import random
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from multiprocessing import get_context
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import page_cache, search
+from .fields import compress_text
+from .models import Note, NoteSlug
+from .routers import is_sharded, shard_for
+from .slugs import base_slug
+
+TOPICS = (
+    'Список покупок', 'Планы на неделю', 'Идеи для отпуска',
+    'Заметки со встречи', 'Рецепт пирога', 'Книги на лето',
+    'Конспект лекции', 'Черновик письма', 'Тренировки', 'Ремонт кухни',
+    'Подарки друзьям', 'Вопросы к врачу', 'Бюджет семьи', 'Дела по дому',
+    'Маршрут поездки', 'Цитаты', 'Фильмы посмотреть', 'Учёба',
+    'Сад и огород', 'Работа над проектом', 'Мысли перед сном',
+    'Покупки к празднику', 'Английский язык', 'Документы',
+)
+QUALIFIERS = (
+    '', 'на понедельник', 'к выходным', 'по работе', 'для дома', 'срочно',
+    'на потом', 'в июле', 'с детьми', 'из поездки', 'до пятницы',
+    'черновик', 'важное',
+)
+WORDS = (
+    'утро день вечер ночь дом город улица дорога поезд вокзал магазин '
+    'хлеб молоко сыр яблоки чай кофе сахар книга письмо встреча проект '
+    'задача срок отчёт план идея вопрос ответ друг семья мама папа '
+    'ребёнок школа урок работа отпуск море лес река поле сад окно дверь '
+    'стол лампа телефон компьютер заметка список новый старый большой '
+    'маленький быстрый тихий важный простой сложный хороший последний '
+    'купить сделать позвонить написать прочитать проверить отправить '
+    'забрать приготовить посмотреть обсудить записать вспомнить '
+    'сегодня завтра вчера обязательно потом снова ещё уже очень и в на '
+    'с по до из к не что как где когда'
+).split()
+# Логнормальный размер текста в символах: медиана около 250 символов,
+# длинный хвост до TEXT_MAX_SIZE.
+TEXT_SIZE_MU = 5.5
+TEXT_SIZE_SIGMA = 1.0
+TEXT_MIN_SIZE = 10
+TEXT_MAX_SIZE = 20000
+# Слов в корпусе: около 1,5 млн символов, много больше самого
+# длинного текста.
+CORPUS_WORDS = 200000
+# Даты создания заметок равномерно распределены по последнему году.
+PERIOD = timedelta(days=365)
+
+
+@lru_cache(maxsize=None)
+def title_slug(title):
+    return base_slug(title)
+
+
+@lru_cache(maxsize=None)
+def corpus():
+    """Длинная строка из случайных слов, из которой вырезаются тексты."""
+    return ' '.join(random.Random(0).choices(WORDS, k=CORPUS_WORDS))
+
+
+def make_text(rng):
+    """
+    Текст логнормального размера — кусок корпуса со случайного слова:
+    это в несколько раз быстрее, чем выбирать каждое слово отдельно.
+    """
+    size = int(rng.lognormvariate(TEXT_SIZE_MU, TEXT_SIZE_SIGMA))
+    size = min(max(size, TEXT_MIN_SIZE), TEXT_MAX_SIZE)
+    words = corpus()
+    start = words.index(' ', rng.randrange(len(words) - size - 100)) + 1
+    text = words[start:start + size].rstrip()
+    return text[0].upper() + text[1:] + '.'
+
+
+def generate_chunk(start, count, author_ids, token, seed, now, with_text):
+    """
+    Строки заметок с номерами start..start + count - 1:
+    (автор, заголовок, сжатый текст, slug, дата, текст или None).
+    Авторы выбираются неравномерно: у первых заметок больше.
+    """
+    rng = random.Random(seed * 1_000_003 + start)
+    rows = []
+    period = PERIOD.total_seconds()
+    for number in range(start, start + count):
+        title = rng.choice(TOPICS)
+        qualifier = rng.choice(QUALIFIERS)
+        if qualifier:
+            title = f'{title} {qualifier}'
+        text = make_text(rng)
+        created = now - timedelta(seconds=rng.random() * period)
+        rows.append((
+            author_ids[int(len(author_ids) * rng.random() ** 2)],
+            title,
+            compress_text(text),
+            f'{title_slug(title)}-{token}{number:x}',
+            created.isoformat(' '),
+            text if with_text else None,
+        ))
+    return rows
+
+
+def generate(tasks, processes):
+    """
+    Пачки строк по порядку задач. В процессах одновременно готовится
+    не больше двух пачек на процесс, чтобы память не росла, пока
+    запись отстаёт от генерации.
+    """
+    if processes <= 1:
+        for task in tasks:
+            yield generate_chunk(*task)
+        return
+    pool = ProcessPoolExecutor(
+        processes, mp_context=get_context('spawn'), initializer=django.setup
+    )
+    with pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(generate_chunk, *task))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def create_users(prefix, count):
+    """Пользователи prefix-0..prefix-N без пароля; существующие не меняются."""
+    User = get_user_model()
+    names = [f'{prefix}-{number}' for number in range(count)]
+    existing = set(
+        User.objects.filter(username__in=names)
+        .values_list('username', flat=True)
+    )
+    password = make_password(None)
+    User.objects.bulk_create(
+        (
+            User(username=name, password=password)
+            for name in names if name not in existing
+        ),
+        batch_size=5000,
+    )
+    return list(
+        User.objects.filter(username__in=names)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def insert_sql(model, fields):
+    meta = model._meta
+    columns = ', '.join(meta.get_field(name).column for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    return f'INSERT INTO {meta.db_table} ({columns}) VALUES ({placeholders})'
+
+
+NOTE_INSERT = insert_sql(
+    Note,
+    ('id', 'author', 'title', 'text', 'slug', 'created_at', 'updated_at'),
+)
+SLUG_INSERT = insert_sql(NoteSlug, ('slug', 'shard', 'note_id'))
+
+
+class Writer:
+    """Пишет пачки строк в шарды авторов, назначая id по порядку."""
+
+    def __init__(self, author_ids, search_index):
+        self.shards = {pk: shard_for(pk) for pk in author_ids}
+        self.search_index = {
+            using: search_index and search.is_supported(using)
+            for using in set(self.shards.values())
+        }
+        self.next_ids = {
+            using: (
+                Note.objects.using(using).aggregate(last=Max('id'))['last']
+                or 0
+            ) + 1
+            for using in self.search_index
+        }
+
+    @contextlib.contextmanager
+    def deferred_indexes(self):
+        """
+        Индексы из Note.Meta.indexes удаляются на время записи и строятся
+        заново в конце: построить индекс по заполненной таблице вдвое
+        быстрее, чем обновлять его при каждой вставке. Уникальный индекс
+        slug остаётся. Индексы, удалённые прерванным запуском,
+        тоже создаются.
+        """
+        for using in self.search_index:
+            present = self.present_indexes(using)
+            with connections[using].cursor() as cursor:
+                for index in Note._meta.indexes:
+                    if index.name in present:
+                        cursor.execute(str(index.remove_sql(
+                            Note, connections[using].schema_editor()
+                        )))
+        try:
+            yield
+        finally:
+            for using in self.search_index:
+                present = self.present_indexes(using)
+                with connections[using].cursor() as cursor:
+                    for index in Note._meta.indexes:
+                        if index.name not in present:
+                            cursor.execute(str(index.create_sql(
+                                Note, connections[using].schema_editor()
+                            )))
+
+    def present_indexes(self, using):
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(
+                cursor, Note._meta.db_table
+            )
+
+    def write(self, rows):
+        by_shard = defaultdict(list)
+        for row in rows:
+            by_shard[self.shards[row[0]]].append(row)
+        for using, rows in by_shard.items():
+            first = self.next_ids[using]
+            self.next_ids[using] += len(rows)
+            ids = range(first, first + len(rows))
+            with transaction.atomic(using=using):
+                with connections[using].cursor() as cursor:
+                    cursor.executemany(NOTE_INSERT, [
+                        (pk, author, title, text, slug, created, created)
+                        for pk, (author, title, text, slug, created, _)
+                        in zip(ids, rows)
+                    ])
+                    if self.search_index[using]:
+                        cursor.executemany(search.INSERT_SQL, [
+                            search.index_row(pk, row[0], row[1], row[5])
+                            for pk, row in zip(ids, rows)
+                        ])
+            if is_sharded():
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                        cursor.executemany(SLUG_INSERT, [
+                            (row[3], using, pk) for pk, row in zip(ids, rows)
+                        ])
+
+
+def seed_notes(users, notes, prefix='seed', batch_size=20000, processes=1,
+               search_index=False, seed=0, progress=None):
+    """
+    Создаёт users пользователей и notes заметок между ними.
+    Поисковый индекс заполняется только с search_index: он втрое
+    замедляет запись, и его можно перестроить позже.
+    progress(созданные заметки) вызывается после каждой пачки.
+    Возвращает (число пользователей, число заметок, секунды).
+    """
+    started = time.perf_counter()
+    author_ids = create_users(prefix, users)
+    writer = Writer(author_ids, search_index)
+    # Метка запуска в slug: повторный запуск не повторяет slug.
+    token = f'{random.Random().getrandbits(32):x}-'
+    # Даты пишутся так, как их сохранил бы Django: при USE_TZ в UTC.
+    now = timezone.now().replace(tzinfo=None)
+    tasks = [
+        (
+            start, min(batch_size, notes - start), author_ids, token, seed,
+            now, search_index,
+        )
+        for start in range(0, notes, batch_size)
+    ]
+    created = 0
+    with writer.deferred_indexes():
+        for rows in generate(tasks, processes):
+            writer.write(rows)
+            created += len(rows)
+            if progress:
+                progress(created)
+    for using, indexed in writer.search_index.items():
+        if indexed:
+            search.optimize_index(using=using)
+    for author_id in author_ids:
+        page_cache.bump_version(author_id)
+    return len(author_ids), created, time.perf_counter() - started
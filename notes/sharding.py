@@ -0,0 +1,263 @@
+"""
+Реестр slug и перенос заметок между шардами.
+
+Пока шардов больше одного, каждая запись заметки отмечает её slug
+в реестре NoteSlug. Реестр пишется внутри транзакции шарда: если slug
+занят заметкой другого шарда, IntegrityError откатывает запись заметки,
+и подбор slug повторяется так же, как при гонке на одном шарде.
+Записи реестра, оставшиеся от откаченных транзакций, не мешают:
+занятый slug проверяется по самой заметке, и запись без заметки
+переходит к новому владельцу.
+"""
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+)
+
+from . import page_cache, search
+from .models import Note, NoteRevision, NoteSlug
+from .routers import is_sharded, shard_for
+
+
+def registry():
+    return NoteSlug.objects.using(DEFAULT_DB_ALIAS)
+
+
+def is_owned(entry):
+    """Лежит ли заметка записи реестра на своём шарде с тем же slug."""
+    if entry.shard not in settings.DATABASES:
+        return False
+    return Note.objects.using(entry.shard).filter(
+        pk=entry.note_id, slug=entry.slug
+    ).exists()
+
+
+def claim_one(entry):
+    """
+    Записывает slug в реестр или перехватывает запись без заметки.
+    Если slug занят другой заметкой, бросает IntegrityError.
+    """
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            entry.save(force_insert=True, using=DEFAULT_DB_ALIAS)
+        return
+    except IntegrityError:
+        owner = registry().filter(slug=entry.slug).first()
+    if owner is None:
+        raise IntegrityError(f'Slug {entry.slug} занят.')
+    if (owner.shard, owner.note_id) == (entry.shard, entry.note_id):
+        return
+    if is_owned(owner) or not registry().filter(
+            slug=owner.slug, shard=owner.shard, note_id=owner.note_id
+    ).update(shard=entry.shard, note_id=entry.note_id):
+        raise IntegrityError(f'Slug {entry.slug} занят.')
+
+
+def claim_slugs(notes, using):
+    """
+    Записывает slug сохранённых заметок шарда using в реестр:
+    все одним INSERT, а при конфликте — по одному.
+    """
+    if not is_sharded() or not notes:
+        return
+    entries = [
+        NoteSlug(slug=note.slug, shard=using, note_id=note.pk)
+        for note in notes
+    ]
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            registry().bulk_create(entries)
+        return
+    except IntegrityError:
+        pass
+    for entry in entries:
+        claim_one(entry)
+
+
+def release_stale_slugs(notes, using):
+    """Удаляет из реестра прежние slug изменённых заметок."""
+    if not is_sharded() or not notes:
+        return
+    registry().filter(
+        shard=using, note_id__in=[note.pk for note in notes]
+    ).exclude(slug__in=[note.slug for note in notes]).delete()
+
+
+def update_slugs(notes, using):
+    """Переписывает slug изменённых заметок в реестре."""
+    release_stale_slugs(notes, using)
+    claim_slugs(notes, using)
+
+
+def sync_saved_slug(note, using, created):
+    """
+    Slug заметки после save(): у новой заметки записывается сразу,
+    у изменённой — только если запись реестра указывает не на неё.
+    """
+    if not is_sharded():
+        return
+    if not created:
+        owner = registry().filter(slug=note.slug).values_list(
+            'shard', 'note_id'
+        ).first()
+        if owner == (using, note.pk):
+            return
+        release_stale_slugs([note], using)
+    claim_slugs([note], using)
+
+
+def release_deleted_slug(note, using):
+    if is_sharded():
+        registry().filter(
+            slug=note.slug, shard=using, note_id=note.pk
+        ).delete()
+
+
+def sync_registry(batch_size=2000):
+    """
+    Дописывает в реестр slug заметок всех баз NOTES_SHARD_DATABASES,
+    например после включения шардирования на существующей базе.
+    Возвращает slug, которые заняты заметками на нескольких шардах.
+    """
+    conflicts = []
+    for alias in settings.NOTES_SHARD_DATABASES:
+        last_pk = 0
+        while True:
+            rows = list(
+                Note.objects.using(alias).filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', 'slug')[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            entries = [
+                NoteSlug(slug=slug, shard=alias, note_id=pk)
+                for pk, slug in rows
+            ]
+            registry().bulk_create(entries, ignore_conflicts=True)
+            owners = dict(
+                (slug, (shard, note_id))
+                for slug, shard, note_id in registry().filter(
+                    slug__in=[entry.slug for entry in entries]
+                ).values_list('slug', 'shard', 'note_id')
+            )
+            for entry in entries:
+                if owners.get(entry.slug) == (entry.shard, entry.note_id):
+                    continue
+                try:
+                    claim_one(entry)
+                except IntegrityError:
+                    conflicts.append(entry.slug)
+    return conflicts
+
+
+def misplaced_authors():
+    """Тройки (автор, база с его заметками, его шард) для переноса."""
+    moves = []
+    for alias in settings.NOTES_SHARD_DATABASES:
+        author_ids = Note.objects.using(alias).order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+        for author_id in author_ids:
+            target = shard_for(author_id)
+            if target != alias:
+                moves.append((author_id, alias, target))
+    return moves
+
+
+def insert_rows(model, objects, using):
+    """
+    Вставляет копии строк одним executemany, сохраняя даты создания
+    и изменения: bulk_create заменил бы их текущим временем.
+    """
+    connection = connections[using]
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [
+                field.get_db_prep_save(getattr(obj, field.attname),
+                                       connection)
+                for field in fields
+            ]
+            for obj in objects
+        ])
+
+
+def copy_notes(notes, target):
+    """
+    Копирует заметки с историей на шард target и индексирует их.
+    Заметки, уже скопированные прерванным переносом, пропускаются.
+    Возвращает {slug: id заметки на target}.
+    """
+    slugs = [note.slug for note in notes]
+    copied = dict(
+        Note.objects.using(target).filter(slug__in=slugs).values_list(
+            'slug', 'pk'
+        )
+    )
+    fresh = [note for note in notes if note.slug not in copied]
+    if not fresh:
+        return copied
+    insert_rows(Note, fresh, target)
+    copied = dict(
+        Note.objects.using(target).filter(slug__in=slugs).values_list(
+            'slug', 'pk'
+        )
+    )
+    new_ids = {note.pk: copied[note.slug] for note in fresh}
+    revisions = list(
+        NoteRevision.objects.using(notes[0]._state.db).filter(
+            note_id__in=list(new_ids)
+        )
+    )
+    for revision in revisions:
+        revision.note_id = new_ids[revision.note_id]
+    if revisions:
+        insert_rows(NoteRevision, revisions, target)
+    search.index_notes(
+        Note.objects.using(target).filter(pk__in=list(new_ids.values())),
+        using=target,
+    )
+    return copied
+
+
+def move_author(author_id, source, target, batch_size=500):
+    """
+    Переносит заметки автора с source на target пакетами.
+    Копия на target фиксируется раньше, чем удаление с source, поэтому
+    прерванный перенос не теряет заметок: повторный запуск доделает его.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic(using=source):
+            notes = list(
+                Note.objects.using(source).filter(
+                    author_id=author_id
+                ).order_by('pk')[:batch_size]
+            )
+            if not notes:
+                break
+            with transaction.atomic(using=target):
+                copied = copy_notes(notes, target)
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                registry().filter(slug__in=list(copied)).delete()
+                registry().bulk_create(
+                    NoteSlug(slug=slug, shard=target, note_id=pk)
+                    for slug, pk in copied.items()
+                )
+            Note.objects.using(source).filter(
+                pk__in=[note.pk for note in notes]
+            ).delete()
+        moved += len(notes)
+    page_cache.bump_version(author_id, using=target)
+    return moved
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import auth, history, page_cache, search, sharding
+from .models import VERSIONED_FIELDS, Note
+from .resolver import resolver
+from .routers import is_sharded
+
+
+@receiver(pre_save, sender=Note)
+def remember_previous_version(sender, instance, raw, using, update_fields,
+                              **kwargs):
+    """Запоминает версию заметки до сохранения для истории правок."""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not (
+            set(update_fields) & set(VERSIONED_FIELDS)):
+        return
+    instance._previous_versions = history.previous_versions(
+        [instance], using=using
+    )
+
+
+@receiver(post_save, sender=Note)
+def record_note_revision(sender, instance, raw, using, **kwargs):
+    """Сохраняет правку заметки в истории."""
+    previous = instance.__dict__.pop('_previous_versions', None)
+    if previous:
+        history.record_revisions([instance], previous, using=using)
+    if not raw:
+        history.remember_loaded([instance])
+
+
+@receiver(post_save, sender=Note)
+def register_note_slug(sender, instance, raw, using, created, **kwargs):
+    """Отмечает slug заметки в реестре шардов."""
+    if not raw:
+        sharding.sync_saved_slug(instance, using, created)
+
+
+@receiver(post_delete, sender=Note)
+def release_note_slug(sender, instance, using, **kwargs):
+    """Освобождает slug удалённой заметки в реестре шардов."""
+    sharding.release_deleted_slug(instance, using)
+
+
+@receiver(post_save, sender=Note)
+def forget_renamed_note(sender, instance, **kwargs):
+    """Сбрасывает прежний slug заметки в кеше поиска по slug."""
+    resolver.forget(instance.author_id, instance.pk, instance.slug)
+
+
+@receiver(post_delete, sender=Note)
+def forget_deleted_note(sender, instance, **kwargs):
+    resolver.forget(instance.author_id, instance.pk)
+
+
+@receiver(post_save, sender=Note)
+def index_created_note(sender, instance, using, created, **kwargs):
+    """
+    Добавляет новую заметку в поисковый индекс. Записи изменённых
+    и удалённых заметок обновляют триггеры базы.
+    """
+    if created:
+        search.index_note(instance, using=using)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def reset_author_pages(sender, instance, using, **kwargs):
+    """Сбрасывает кешированные страницы автора изменённой заметки."""
+    page_cache.bump_version(instance.author_id, using=using)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_sharded_notes(sender, instance, using, **kwargs):
+    """
+    Удаляет заметки пользователя на других шардах: каскад Django
+    удаляет только заметки из базы самого пользователя.
+    """
+    if not is_sharded():
+        return
+    for alias in settings.NOTES_SHARD_DATABASES:
+        if alias != using:
+            Note.objects.using(alias).filter(author_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def reset_user_pages(sender, instance, using, **kwargs):
+    """
+    Сбрасывает страницы пользователя: имя выводится в шапке,
+    а id удалённого пользователя может достаться новому.
+    """
+    page_cache.bump_version(instance.pk, using=using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_changed_user(sender, instance, **kwargs):
+    """Сбрасывает кешированного пользователя, например после смены пароля."""
+    auth.forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    """Сбрасывает кешированного пользователя при выходе из системы."""
+    if user is not None:
+        auth.forget_user(user.pk)
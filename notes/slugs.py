@@ -0,0 +1,164 @@
+"""
+Подбор уникальных slug для заметок.
+
+Свободный slug выбирается одним запросом по диапазону уникального индекса,
+а гонку между проверкой и вставкой разрешает повтор после IntegrityError.
+Один и тот же механизм используют форма, модель и пакетный импорт.
+На шардах занятые slug ищутся в реестре NoteSlug в базе default.
+"""
+from django.apps import apps
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, connections, router, transaction
+)
+
+from pytils.translit import slugify
+
+from .routers import is_sharded
+
+# Сколько символов slug оставляется под суффикс вида -2, -3, ...
+SUFFIX_RESERVE = 8
+# Slug для заголовков, в которых нет ни одного транслитерируемого символа.
+FALLBACK_SLUG = 'note'
+# Сколько раз запись повторяется, если slug занял параллельный запрос.
+SLUG_RETRIES = 5
+
+
+def note_model():
+    return apps.get_model('notes', 'Note')
+
+
+def registry_model():
+    return apps.get_model('notes', 'NoteSlug')
+
+
+def max_slug_length():
+    return note_model()._meta.get_field('slug').max_length
+
+
+def base_slug(title):
+    """Slug, который заметка получает из заголовка по умолчанию."""
+    return slugify(title)[:max_slug_length()] or FALLBACK_SLUG
+
+
+def slug_stem(base):
+    """Основа для суффиксов, укороченная так, чтобы суффикс поместился."""
+    return base[:max_slug_length() - SUFFIX_RESERVE]
+
+
+def fetch_taken(bases, using=None, exclude_pk=None):
+    """
+    Одним запросом выбирает занятые slug, совпадающие с базовыми
+    или начинающиеся с «базовый-» либо «основа-».
+
+    Для каждого префикса p выбирается диапазон [p, p + '.'): в slug
+    из допустимых символов меньше точки только дефис, поэтому в диапазон
+    попадают сам p и p-*, а поиск идёт по уникальному индексу.
+    Заметка exclude_pk из базы using не учитывается, чтобы при
+    редактировании её собственный slug не считался занятым.
+    """
+    prefixes = set()
+    for base in bases:
+        prefixes.add(base)
+        prefixes.add(slug_stem(base))
+    if not prefixes:
+        return set()
+    sharded = is_sharded()
+    model = registry_model() if sharded else note_model()
+    alias = using or router.db_for_write(note_model())
+    values = ', '.join(['(%s)'] * len(prefixes))
+    params = list(prefixes)
+    sql = (
+        f'SELECT DISTINCT n.slug FROM (VALUES {values}) AS p '
+        f'INNER JOIN {model._meta.db_table} AS n '
+        "ON n.slug >= p.column1 AND n.slug < p.column1 || '.'"
+    )
+    if exclude_pk is not None and sharded:
+        sql += ' WHERE NOT (n.shard = %s AND n.note_id = %s)'
+        params.extend((alias, exclude_pk))
+    elif exclude_pk is not None:
+        sql += ' WHERE n.id <> %s'
+        params.append(exclude_pk)
+    if sharded:
+        alias = DEFAULT_DB_ALIAS
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def taken_slugs(slugs, using=None, exclude_pk=None):
+    """
+    QuerySet занятых slug из списка: в реестре на шардах,
+    иначе в таблице заметок. exclude_pk — как в fetch_taken().
+    """
+    if is_sharded():
+        return registry_model().objects.filter(slug__in=slugs).exclude(
+            shard=using or DEFAULT_DB_ALIAS, note_id=exclude_pk
+        ).values_list('slug', flat=True)
+    return note_model().objects.using(using).filter(
+        slug__in=slugs
+    ).exclude(id=exclude_pk).values_list('slug', flat=True)
+
+
+def pick_free(base, taken):
+    """Первый свободный вариант: base, затем основа-2, основа-3, ..."""
+    if base not in taken:
+        return base
+    stem = slug_stem(base)
+    number = 2
+    while f'{stem}-{number}' in taken:
+        number += 1
+    return f'{stem}-{number}'
+
+
+def allocate_slug(base, using=None, exclude_pk=None):
+    """Подбирает один уникальный slug за один запрос к базе."""
+    taken = fetch_taken([base], using=using, exclude_pk=exclude_pk)
+    return pick_free(base, taken)
+
+
+def allocate_slugs(bases, using=None, reserved=(), released=()):
+    """
+    Подбирает уникальные slug для списка базовых значений за один запрос
+    к базе. Совпадения внутри списка тоже разрешаются. reserved — slug,
+    которые займёт тот же пакет; released — slug, которые он освобождает.
+    """
+    taken = fetch_taken(bases, using=using) - set(released) | set(reserved)
+    slugs = []
+    for base in bases:
+        slug = pick_free(base, taken)
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_slug(note, save, using):
+    """
+    Подбирает slug для заметки и вызывает save() в точке сохранения.
+    Если между подбором и вставкой slug занял другой запрос,
+    подбор повторяется; после SLUG_RETRIES попыток ошибка пробрасывается.
+    """
+    base = base_slug(note.title)
+    for attempt in range(SLUG_RETRIES):
+        note.slug = allocate_slug(base, using=using, exclude_pk=note.pk)
+        try:
+            with transaction.atomic(using=using):
+                return save()
+        except IntegrityError:
+            if attempt == SLUG_RETRIES - 1:
+                note.slug = ''
+                raise
+
+
+def save_note(note, save, using=None):
+    """
+    Вызывает save() в транзакции базы заметки, первым запросом которой
+    будет запись. Пустой slug подбирается до начала транзакции: чтение
+    занятых slug внутри неё сделало бы транзакцию читающей, а SQLite
+    не ждёт busy_timeout, когда такая транзакция пытается стать пишущей,
+    и параллельные создания заметок падали с «database is locked».
+    """
+    using = using or router.db_for_write(note_model(), instance=note)
+    if not note.slug:
+        return save_with_slug(note, save, using)
+    with transaction.atomic(using=using):
+        return save()
@@ -0,0 +1,69 @@
+"""Обработчики фоновых задач: тяжёлые операции, вынесенные из запросов."""
+import os
+
+from django.contrib.auth import get_user_model
+
+from . import jobs, search
+from .export import EXPORTERS
+from .importers import READERS, import_notes
+from .models import Note
+
+# Сколько ошибок импорта сохраняется в результате задачи.
+IMPORT_ERRORS_LIMIT = 100
+
+
+@jobs.handler('export')
+def export_notes(job):
+    """Выгрузка заметок пользователя в файл задачи."""
+    exporter, content_type, extension = EXPORTERS[job.payload['format']]
+    name = f'notes.{extension}'
+    path = jobs.job_dir(job) / name
+    partial = jobs.partial_path(job, name)
+    size = 0
+    try:
+        with partial.open('wb') as file:
+            for chunk in exporter(Note.objects.for_author(job.user)):
+                file.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    os.replace(partial, path)
+    return {'file': name, 'size': size, 'content_type': content_type}
+
+
+@jobs.handler('import', max_attempts=1)
+def import_file(job):
+    """
+    Импорт загруженного файла. Пакеты сохраняются отдельными
+    транзакциями, поэтому повтор создал бы копии заметок: одна попытка.
+    """
+    path = job.payload['path']
+    try:
+        with open(path, encoding='utf-8', newline='') as lines:
+            result = import_notes(
+                READERS[job.payload['format']](lines), job.user
+            )
+    finally:
+        os.remove(path)
+    return {
+        'created': result.created,
+        'errors': result.errors[:IMPORT_ERRORS_LIMIT],
+        'error_count': len(result.errors),
+    }
+
+
+@jobs.handler('reindex')
+def rebuild_search_index(job):
+    return {
+        'indexed': search.rebuild_index(using=job.payload.get('database'))
+    }
+
+
+@jobs.handler('delete_account')
+def delete_account(job):
+    """Удаление пользователя со всеми заметками на всех шардах."""
+    deleted, _ = get_user_model().objects.filter(
+        pk=job.payload['user_id']
+    ).delete()
+    return {'deleted': bool(deleted)}
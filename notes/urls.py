@@ -10,6 +10,34 @@ urlpatterns = [
     path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
     path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
+    path(
+        'history/<slug:slug>/',
+        views.NoteHistory.as_view(),
+        name='history'
+    ),
+    path(
+        'history/<slug:slug>/<int:number>/',
+        views.NoteRevisionDetail.as_view(),
+        name='revision'
+    ),
+    path(
+        'history/<slug:slug>/<int:number>/restore/',
+        views.NoteRestore.as_view(),
+        name='restore'
+    ),
     path('notes/', views.NotesList.as_view(), name='list'),
+    path(
+        'notes/export/<str:fmt>/',
+        views.NotesExport.as_view(),
+        name='export'
+    ),
+    path('notes/import/', views.NotesImport.as_view(), name='import'),
+    path('search/', views.NoteSearch.as_view(), name='search'),
+    path(
+        'cache/stats/',
+        views.PageCacheStats.as_view(),
+        name='cache_stats'
+    ),
+    path('metrics/', views.Metrics.as_view(), name='metrics'),
     path('done/', views.NoteSuccess.as_view(), name='success'),
 ]
@@ -1,9 +1,36 @@
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+import calendar
+import hashlib
+import io
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.http import (
+    Http404, HttpResponse, HttpResponseRedirect, JsonResponse,
+    StreamingHttpResponse
+)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
 from django.views import generic
+from django.views.generic.detail import SingleObjectMixin
 
-from .forms import NoteForm
+from . import history, page_cache, rendering, search
+from .metrics import get_registry
+from .export import EXPORTERS
+from .forms import WARNING, NoteForm, NoteImportForm
+from .importers import READERS, import_notes
 from .models import Note
+from .pagination import get_page_size, keyset_paginate, parse_cursor
+from .resolver import resolver
+from .routers import primary_database, read_database
+from .slugs import save_note
 
 
 class Home(generic.TemplateView):
@@ -22,26 +49,131 @@ class NoteBase(LoginRequiredMixin):
     success_url = reverse_lazy('notes:success')
 
     def get_queryset(self):
-        """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими заметками;
+        они читаются из базы его шарда или её реплики.
+        """
+        queryset = self.model.objects.for_author(self.request.user)
+        return queryset.using(read_database(queryset.db))
 
+    def get_object(self, queryset=None):
+        """Заметка по slug из адреса: по id из кеша или по индексу."""
+        if queryset is None:
+            queryset = self.get_queryset()
+        note = resolver.resolve(
+            queryset, self.request.user.pk, self.kwargs['slug']
+        )
+        if note is None:
+            raise Http404('Заметка не найдена.')
+        return note
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+
+class SummaryListMixin:
+    """
+    Список выбирает из базы только id, заголовок и slug: текст заметок
+    может быть большим, а шаблону списка он не нужен.
+    """
+    summary = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.summaries() if self.summary else queryset
+
+
+class ConditionalPageMixin:
+    """
+    Отвечает 304 Not Modified, если страница не менялась с прошлого
+    запроса клиента. Проверка не загружает заметки и не рисует шаблон.
+    """
+
+    def get_validators(self):
+        """Возвращает (etag, last_modified); None — валидатора нет."""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        etag = etag and quote_etag(etag)
+        timestamp = last_modified and calendar.timegm(
+            last_modified.utctimetuple()
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag:
+                response.setdefault('ETag', etag)
+            if timestamp:
+                response.setdefault('Last-Modified', http_date(timestamp))
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class CachedPageMixin:
+    """
+    Кеширует отрисованную страницу пользователя целиком.
+    Страница сбрасывается при любом изменении его заметок.
+    """
+    cache_name = None
+
+    def get(self, request, *args, **kwargs):
+        if not settings.NOTES_PAGE_CACHE_TIMEOUT:
+            return super().get(request, *args, **kwargs)
+        key = page_cache.page_key(
+            request.user.pk, self.cache_name, request.get_full_path()
+        )
+        content = page_cache.get_page(key, self.cache_name)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        if response.status_code == 200 and self.is_cacheable():
+            page_cache.set_page(key, response.content)
+        return response
+
+    def is_cacheable(self):
+        """
+        Страница, прочитанная с реплики вскоре после изменения заметок,
+        не кешируется: реплика могла ещё не получить это изменение,
+        а в кеше устаревшая страница жила бы с новой версией.
+        """
+        alias = self.get_queryset().db
+        return alias == primary_database(alias) or (
+            page_cache.version_age(self.request.user.pk)
+            >= settings.NOTES_REPLICA_STICKY_SECONDS
+        )
+
+
+class NoteFormMixin:
+    """Сохранение формы заметки с учётом гонки за уникальный slug."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """
+        Если slug заняли между проверкой формы и записью,
+        пользователь снова видит форму с ошибкой вместо ответа 500.
+        """
+        try:
+            return save_note(
+                form.instance, partial(super().form_valid, form)
+            )
+        except IntegrityError:
+            form.add_error('slug', form.instance.slug + WARNING)
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteBase, NoteFormMixin, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +181,214 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NoteHistory(NoteBase, generic.DetailView):
+    """
+    История правок заметки, новые версии первыми. Страницы листаются
+    курсором ?before=<номер версии>.
+    """
+    template_name = 'notes/history.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page_size = get_page_size(self.request.GET.get('size'))
+        revisions = self.object.revisions.defer('data').order_by('-number')
+        before = parse_cursor(self.request.GET.get('before'))
+        if before is not None:
+            revisions = revisions.filter(number__lt=before)
+        revisions = list(revisions[:page_size + 1])
+        context['revisions'] = revisions[:page_size]
+        if len(revisions) > page_size:
+            context['next_before'] = revisions[page_size - 1].number
+        return context
+
+
+class RevisionMixin(NoteBase, SingleObjectMixin):
+    """Версия заметки пользователя по slug и номеру."""
+
+    def get_revision(self):
+        self.object = self.get_object()
+        return get_object_or_404(
+            self.object.revisions, number=self.kwargs['number']
+        )
+
+
+class NoteRevisionDetail(RevisionMixin, generic.TemplateView):
+    """Текст выбранной версии заметки."""
+    template_name = 'notes/revision.html'
+
+    def get_context_data(self, **kwargs):
+        revision = self.get_revision()
+        kwargs['revision'] = revision
+        kwargs['revision_text'] = history.revision_text(revision)
+        return super().get_context_data(**kwargs)
+
+
+class NoteRestore(RevisionMixin, generic.View):
+    """
+    Возвращает заметке заголовок и текст выбранной версии.
+    Восстановление само становится новой версией в истории.
+    """
+
+    def post(self, request, slug, number):
+        revision = self.get_revision()
+        note = self.object
+        note.title = revision.title
+        note.text = history.revision_text(revision)
+        with transaction.atomic():
+            note.save(update_fields=('title', 'text', 'updated_at'))
+        return HttpResponseRedirect(
+            reverse('notes:detail', args=(note.slug,))
+        )
+
+
+class NotesList(
+    SummaryListMixin, NoteBase, ConditionalPageMixin, CachedPageMixin,
+    generic.ListView
+):
+    """
+    Список заметок пользователя с постраничным выводом по курсору:
+    ?after=<id> и ?before=<id>, размер страницы задаётся параметром ?size=.
+    """
     template_name = 'notes/list.html'
+    cache_name = 'list'
+
+    def get_validators(self):
+        """
+        Время изменения списка — позднейшее из последнего изменения
+        заметок и последнего сброса страниц пользователя: удаление
+        заметки не меняет максимум updated_at, но сбрасывает версию.
+        """
+        user_id = self.request.user.pk
+        last_updated = self.get_queryset().aggregate(
+            last=Max('updated_at')
+        )['last']
+        version = page_cache.get_version(user_id)
+        last_modified = page_cache.changed_at(user_id)
+        if last_updated is not None:
+            last_modified = max(last_modified, last_updated)
+        etag = hashlib.md5(
+            f'{self.request.get_full_path()}:{version}:{last_updated}'
+            .encode()
+        ).hexdigest()
+        return etag, last_modified
+
+    def get_context_data(self, **kwargs):
+        params = self.request.GET
+        page = keyset_paginate(
+            self.object_list,
+            after=parse_cursor(params.get('after')),
+            before=parse_cursor(params.get('before')),
+            page_size=get_page_size(params.get('size')),
+        )
+        kwargs['object_list'] = page.object_list
+        context = super().get_context_data(**kwargs)
+        context['page_obj'] = page
+        context['is_paginated'] = page.has_next or page.has_previous
+        return context
+
+
+class NotesExport(NoteBase, generic.View):
+    """Потоковая выгрузка всех заметок пользователя в файл."""
 
+    def get(self, request, fmt):
+        if fmt not in EXPORTERS:
+            raise Http404
+        exporter, content_type, extension = EXPORTERS[fmt]
+        response = StreamingHttpResponse(
+            exporter(self.get_queryset()), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{extension}"'
+        )
+        return response
 
-class NoteDetail(NoteBase, generic.DetailView):
-    """Заметка подробно."""
+
+class NotesImport(NoteBase, generic.FormView):
+    """Импорт заметок из загруженного файла."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+
+    def form_valid(self, form):
+        lines = io.TextIOWrapper(
+            form.cleaned_data['file'].file, encoding='utf-8', newline=''
+        )
+        reader = READERS[form.cleaned_data['format']]
+        result = import_notes(reader(lines), self.request.user)
+        return self.render_to_response(
+            self.get_context_data(form=form, result=result)
+        )
+
+
+class NoteDetail(
+    NoteBase, ConditionalPageMixin, CachedPageMixin, generic.DetailView
+):
+    """Заметка подробно, текст — в HTML из Markdown."""
     template_name = 'notes/detail.html'
+    cache_name = 'detail'
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('rendering')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['note_html'] = rendering.note_html(self.object)
+        return context
+
+    def get_validators(self):
+        """Валидаторы по времени изменения заметки."""
+        row = resolver.resolve(
+            self.get_queryset(), self.request.user.pk, self.kwargs['slug'],
+            'updated_at',
+        )
+        if row is None:
+            return None, None
+        pk, updated_at = row
+        return f'{pk}-{updated_at.timestamp()}', updated_at
+
+
+class PageCacheStats(UserPassesTestMixin, generic.View):
+    """Счётчики попаданий и промахов кеша страниц для мониторинга."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse(page_cache.stats())
+
+
+class Metrics(UserPassesTestMixin, generic.View):
+    """Метрики времени обработки запросов в формате Prometheus."""
+
+    def test_func(self):
+        token = settings.NOTES_METRICS_TOKEN
+        if token and constant_time_compare(
+                self.request.headers.get('Authorization', ''),
+                f'Bearer {token}'):
+            return True
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return HttpResponse(
+            get_registry().render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+class NoteSearch(SummaryListMixin, NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        """Заметки в порядке релевантности запросу ?q=."""
+        self.query = self.request.GET.get('q', '').strip()
+        queryset = super().get_queryset()
+        ids = search.search_note_ids(
+            self.request.user.pk, self.query, using=queryset.db
+        )
+        notes = queryset.in_bulk(ids)
+        return [notes[pk] for pk in ids if pk in notes]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.middleware.TimingMiddleware',
+    'notes.middleware.CompressionMiddleware',
+    'notes.middleware.ReplicaReadMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,17 +59,135 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        # Соединение живёт между запросами, поэтому PRAGMA ниже
+        # выполняются один раз на соединение, а не на каждый запрос.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
     }
 }
 
+# Шардирование заметок: NOTES_SHARDS=3 раскладывает заметки авторов
+# по default и файлам notes_1.sqlite3, notes_2.sqlite3 по хешу id автора.
+# Пользователи, сессии и реестр slug остаются в default. Новые базы
+# создаются командой migrate --database notes_N, после изменения числа
+# шардов заметки переносит manage.py rebalance_shards.
+NOTES_SHARD_COUNT = int(os.getenv('NOTES_SHARDS', 1))
+NOTES_SHARD_DIR = os.getenv('NOTES_SHARD_DIR', BASE_DIR)
+NOTES_SHARDS = ['default'] + [
+    f'notes_{number}' for number in range(1, NOTES_SHARD_COUNT)
+]
+# Все базы, где могут лежать заметки. База, убранная из NOTES_SHARDS,
+# остаётся здесь, пока rebalance_shards не перенесёт с неё заметки.
+NOTES_SHARD_DATABASES = [
+    *NOTES_SHARDS,
+    *filter(None, os.getenv('NOTES_RETIRED_SHARDS', '').split(',')),
+]
+for alias in NOTES_SHARD_DATABASES[1:]:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(NOTES_SHARD_DIR, f'{alias}.sqlite3'),
+    }
+DATABASE_ROUTERS = ['notes.routers.NoteRouter']
+
+# Реплики для чтения: NOTES_REPLICAS=2 добавляет каждой базе заметок
+# копии <база>_replica_1 и <база>_replica_2. GET-запросы к заметкам
+# читают с реплик, записи идут в основную базу. Пользователь, который
+# только что изменил заметки, ещё NOTES_REPLICA_STICKY_SECONDS секунд
+# читает с основной базы: реплика могла не успеть получить изменения.
+# Локально реплики — копии файлов SQLite, их обновляет с задержкой
+# команда manage.py replicate_sqlite.
+NOTES_REPLICA_COUNT = int(os.getenv('NOTES_REPLICAS', 0))
+NOTES_REPLICA_DIR = os.getenv('NOTES_REPLICA_DIR', NOTES_SHARD_DIR)
+NOTES_REPLICAS = {
+    alias: [
+        f'{alias}_replica_{number}'
+        for number in range(1, NOTES_REPLICA_COUNT + 1)
+    ]
+    for alias in NOTES_SHARD_DATABASES
+}
+for alias, replicas in NOTES_REPLICAS.items():
+    for replica in replicas:
+        DATABASES[replica] = {
+            **DATABASES[alias],
+            'NAME': os.path.join(NOTES_REPLICA_DIR, f'{replica}.sqlite3'),
+            'TEST': {'MIRROR': alias},
+        }
+NOTES_REPLICA_STICKY_SECONDS = int(
+    os.getenv('NOTES_REPLICA_STICKY_SECONDS', 5)
+)
+NOTES_REPLICA_COOKIE = 'notes_primary_until'
+
+# PRAGMA, выполняемые при открытии каждого соединения с SQLite.
+# WAL позволяет читать во время записи, busy_timeout заставляет писателей
+# ждать освобождения блокировки вместо ошибки «database is locked».
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)),
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'memory'),
+}
+
+# Бэкенд кеша страниц заметок: locmem — LRU в памяти одного процесса,
+# file — общий для нескольких процессов кеш в файлах.
+NOTES_CACHE_BACKEND = os.getenv('NOTES_CACHE_BACKEND', 'locmem')
+
+NOTES_CACHE_LOCATION = os.getenv(
+    'NOTES_CACHE_LOCATION', str(BASE_DIR / 'cache')
+)
+
+
+def notes_cache(name, max_entries):
+    """Настройки кеша name для выбранного NOTES_CACHE_BACKEND."""
+    if NOTES_CACHE_BACKEND == 'file':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(NOTES_CACHE_LOCATION, name),
+            'OPTIONS': {'MAX_ENTRIES': max_entries * 10},
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'notes-{name}',
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    }
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': notes_cache('pages', 10000),
+    'sessions': notes_cache('sessions', 10000),
+}
+
+# Сессии и пользователи из кеша: аутентифицированный запрос не читает
+# django_session и auth_user. Сессии cached_db пишутся и в базу, поэтому
+# переживают очистку кеша. По умолчанию включено только с общим кешем
+# (NOTES_CACHE_BACKEND=file): с locmem у каждого процесса своя копия,
+# и выход или смена пароля в одном процессе не сбросили бы сессию
+# в кеше другого до конца её срока.
+NOTES_AUTH_CACHE = os.getenv(
+    'NOTES_AUTH_CACHE', '1' if NOTES_CACHE_BACKEND == 'file' else '0'
+) == '1'
+NOTES_USER_CACHE = 'sessions'
+NOTES_USER_CACHE_TIMEOUT = 300
+if NOTES_AUTH_CACHE:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+    AUTHENTICATION_BACKENDS = ['notes.auth.CachedModelBackend']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+        'NAME': (
+            'django.contrib.auth.password_validation.MinimumLengthValidator'
+        ),
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+        'NAME': (
+            'django.contrib.auth.password_validation.NumericPasswordValidator'
+        ),
     },
 ]
 
@@ -82,8 +204,69 @@ USE_TZ = True
 
 
 STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = os.getenv('NOTES_STATIC_ROOT', str(BASE_DIR / 'static_root'))
+
+# collectstatic добавляет к именам хеш содержимого и кладёт рядом
+# сжатые копии (.gz, .br при установленном brotli); yanote.wsgi отдаёт
+# их сам. Файлы без хеша в имени кешируются NOTES_STATIC_MAX_AGE секунд.
+STATICFILES_STORAGE = 'yanote.storage.CompressedManifestStaticFilesStorage'
+NOTES_STATIC_MAX_AGE = 60 * 60
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_PAGE_SIZE = 50
+NOTES_MAX_PAGE_SIZE = 500
+NOTES_SEARCH_LIMIT = 50
+# Сколько последних подходящих заметок автора ранжируется по bm25.
+NOTES_SEARCH_RANK_WINDOW = 500
+NOTES_EXPORT_CHUNK_SIZE = 2000
+NOTES_IMPORT_BATCH_SIZE = 500
+NOTES_PAGE_CACHE = 'pages'
+NOTES_PAGE_CACHE_TIMEOUT = 300
+NOTES_API_BATCH_LIMIT = 1000
+# Сколько пар (автор, slug) -> id заметки помнит каждый процесс.
+NOTES_SLUG_CACHE_SIZE = 10000
+
+# Замеры времени запросов: заголовок Server-Timing и /metrics/.
+NOTES_METRICS_ENABLED = os.getenv('NOTES_METRICS', '1') == '1'
+
+# Сжатие ответов: zstd, br или gzip по Accept-Encoding. Ответы меньше
+# NOTES_COMPRESS_MIN_SIZE байт не сжимаются.
+NOTES_COMPRESSION_ENABLED = os.getenv('NOTES_COMPRESSION', '1') == '1'
+NOTES_COMPRESS_MIN_SIZE = 512
+# Токен для сборщика метрик: Authorization: Bearer <токен>.
+# Без токена /metrics/ доступен только персоналу.
+NOTES_METRICS_TOKEN = os.getenv('NOTES_METRICS_TOKEN', '')
+NOTES_METRICS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+# Сжатие текста заметок: zlib, lzma или none. Текст короче
+# NOTES_TEXT_COMPRESS_MIN_SIZE байт хранится без сжатия.
+NOTES_TEXT_COMPRESSION = os.getenv('NOTES_TEXT_COMPRESSION', 'zlib')
+NOTES_TEXT_COMPRESS_MIN_SIZE = int(
+    os.getenv('NOTES_TEXT_COMPRESS_MIN_SIZE', 1024)
+)
+# История правок: полный снимок текста не реже чем раз в столько версий.
+NOTES_HISTORY_SNAPSHOT_INTERVAL = 50
+# Админка считает строки списка точно только до этого предела.
+NOTES_ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Фоновые задачи: manage.py run_workers. Упавшая задача повторяется
+# через NOTES_JOB_BACKOFF * 2 ** (попытка - 1) секунд, но не позже
+# NOTES_JOB_BACKOFF_MAX. Пока задача выполняется, воркер раз
+# в NOTES_JOB_HEARTBEAT секунд продлевает её аренду; задача, аренду
+# которой не продлевали NOTES_JOB_TIMEOUT секунд, снова выдаётся
+# воркерам. Файлы задач хранятся в NOTES_JOB_DIR.
+NOTES_JOB_WORKERS = int(os.getenv('NOTES_JOB_WORKERS', 4))
+NOTES_JOB_MAX_ATTEMPTS = 5
+NOTES_JOB_BACKOFF = 2
+NOTES_JOB_BACKOFF_MAX = 600
+NOTES_JOB_TIMEOUT = 600
+NOTES_JOB_HEARTBEAT = 60
+NOTES_JOB_POLL_INTERVAL = 1.0
+NOTES_JOB_DIR = os.getenv('NOTES_JOB_DIR', str(BASE_DIR / 'jobs'))
@@ -0,0 +1,151 @@
+"""
+Раздача собранной статики из WSGI-приложения, без отдельного веб-сервера.
+
+Список файлов STATIC_ROOT читается один раз при запуске: запрос
+к статике не проверяет диск и не доходит до Django. Клиенту уходит
+сжатая заранее копия (.br или .gz), если он её принимает, с заголовком
+Vary: Accept-Encoding. Файлы с хешем в имени из манифеста collectstatic
+кешируются на год с immutable, остальные — на NOTES_STATIC_MAX_AGE
+секунд. Повторный запрос с If-None-Match получает 304.
+"""
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from http import HTTPStatus
+
+from django.conf import settings
+
+from notes.compression import encoding_qualities
+
+# Срок кеширования файлов с хешем в имени: их содержимое не меняется.
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Сжатые копии в порядке предпочтения: (кодировка, расширение).
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MANIFEST_NAME = 'staticfiles.json'
+BLOCK_SIZE = 64 * 1024
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json')
+
+
+def status_line(status):
+    return f'{status.value} {status.phrase}'
+
+
+class Asset:
+    """Файл статики и его сжатые копии."""
+    __slots__ = ('path', 'content_type', 'headers', 'variants')
+
+    def __init__(self, path, immutable):
+        self.path = path
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith(TEXT_TYPES):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        stat = os.stat(path)
+        max_age = (
+            IMMUTABLE_MAX_AGE if immutable else settings.NOTES_STATIC_MAX_AGE
+        )
+        cache_control = f'public, max-age={max_age}'
+        if immutable:
+            cache_control += ', immutable'
+        self.headers = [
+            ('Cache-Control', cache_control),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+        ]
+        tag = f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+        self.variants = {None: (path, stat.st_size, f'"{tag}"')}
+        for coding, suffix in ENCODINGS:
+            try:
+                size = os.stat(path + suffix).st_size
+            except FileNotFoundError:
+                continue
+            self.variants[coding] = (path + suffix, size, f'"{tag}-{coding}"')
+        if len(self.variants) > 1:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+    def choose(self, accept_encoding):
+        """Кодировка ответа: лучшая сжатая копия, которую примет клиент."""
+        quality = encoding_qualities(accept_encoding)
+        for coding, _ in ENCODINGS:
+            if coding in self.variants and quality(coding) > 0:
+                return coding
+        return None
+
+
+def scan(root):
+    """Файлы root по адресу относительно root, кроме сжатых копий."""
+    manifest = os.path.join(root, MANIFEST_NAME)
+    try:
+        with open(manifest, encoding='utf-8') as file:
+            hashed = set(json.load(file).get('paths', {}).values())
+    except (OSError, ValueError):
+        hashed = set()
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    assets = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if name.endswith(suffixes) or path == manifest:
+                continue
+            url = os.path.relpath(path, root).replace(os.sep, '/')
+            assets[url] = Asset(path, url in hashed)
+    return assets
+
+
+class StaticFiles:
+    """WSGI-обёртка: статику отдаёт сама, остальное — приложению."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.prefix = prefix or settings.STATIC_URL
+        root = root or settings.STATIC_ROOT
+        self.assets = scan(str(root)) if root and os.path.isdir(root) else {}
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        asset = None
+        if path.startswith(self.prefix):
+            asset = self.assets.get(path[len(self.prefix):])
+        if asset is None:
+            return self.application(environ, start_response)
+        return self.serve(asset, environ, start_response)
+
+    def serve(self, asset, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response(
+                status_line(HTTPStatus.METHOD_NOT_ALLOWED),
+                [('Allow', 'GET, HEAD'), ('Content-Length', '0')],
+            )
+            return []
+        coding = asset.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        path, size, etag = asset.variants[coding]
+        headers = [*asset.headers, ('ETag', etag)]
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH', '')
+        if etag in if_none_match or if_none_match.strip() == '*':
+            start_response(status_line(HTTPStatus.NOT_MODIFIED), headers)
+            return []
+        headers += [
+            ('Content-Type', asset.content_type),
+            ('Content-Length', str(size)),
+        ]
+        if coding:
+            headers.append(('Content-Encoding', coding))
+        start_response(status_line(HTTPStatus.OK), headers)
+        if method == 'HEAD':
+            return []
+        file = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper:
+            return file_wrapper(file, BLOCK_SIZE)
+        return read_blocks(file)
+
+
+def read_blocks(file):
+    with file:
+        while True:
+            block = file.read(BLOCK_SIZE)
+            if not block:
+                break
+            yield block
@@ -0,0 +1,94 @@
+"""
+Хранилище статики для collectstatic.
+
+Имена файлов получают хеш содержимого (ManifestStaticFilesStorage),
+поэтому файл по такому адресу никогда не меняется и кешируется
+навсегда. Рядом с каждым текстовым файлом collectstatic кладёт сжатые
+копии: .gz и, если установлен пакет brotli, .br. Сервер статики
+в yanote/static.py отдаёт их без сжатия на лету.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+)
+# Файлы меньше порога не сжимаются: выигрыш меньше заголовков ответа.
+COMPRESS_MIN_SIZE = 256
+
+
+def gzip_compress(data):
+    # mtime=0: повторная сборка даёт побайтно тот же файл.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+ENCODINGS = (('.gz', gzip_compress),) + (
+    (('.br', brotli_compress),) if brotli else ()
+)
+
+
+def precompress(path):
+    """
+    Пишет сжатые копии файла path, если сжатие его уменьшает.
+    Копия, которая новее файла, не пересобирается.
+    """
+    if not path.endswith(COMPRESSIBLE):
+        return
+    stat = os.stat(path)
+    if stat.st_size < COMPRESS_MIN_SIZE:
+        return
+    data = None
+    for suffix, compress in ENCODINGS:
+        target = path + suffix
+        try:
+            if os.stat(target).st_mtime >= stat.st_mtime:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, 'rb') as file:
+                data = file.read()
+        packed = compress(data)
+        if len(packed) >= len(data):
+            continue
+        temporary = target + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(packed)
+        os.replace(temporary, target)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем в имени и заранее сжатыми копиями."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed = set()
+        for name, hashed_name, result in super().post_process(
+                paths, dry_run, **options):
+            yield name, hashed_name, result
+            if dry_run or isinstance(result, Exception):
+                continue
+            for path in (name, hashed_name):
+                if path and path not in processed:
+                    processed.add(path)
+                    precompress(self.path(path))
+
+    def stored_name(self, name):
+        """
+        Без collectstatic манифеста нет, и ссылки ведут на исходные
+        имена: так работают тесты и запуск без сборки статики.
+        """
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -6,6 +6,7 @@ from django.views.generic import CreateView
 
 urlpatterns = [
     path('', include('notes.urls')),
+    path('api/', include('notes.api_urls')),
     path('admin/', admin.site.urls),
 ]
 
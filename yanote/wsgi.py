@@ -11,6 +11,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from yanote.static import StaticFiles
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
 
-application = get_wsgi_application()
+# Статику из STATIC_ROOT отдаёт обёртка, не доходя до Django.
+application = StaticFiles(get_wsgi_application())